@@ -0,0 +1,16 @@
+"""Helpers shared by the benchmarks."""
+
+import contextlib
+import os
+import sys
+
+@contextlib.contextmanager
+def silenced():
+  """Sends stdout to /dev/null, so printing doesn't count as terminal time."""
+  stdout = sys.stdout
+  with open(os.devnull, 'w') as devnull:
+    sys.stdout = devnull
+    try:
+      yield
+    finally:
+      sys.stdout = stdout
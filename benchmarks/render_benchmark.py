@@ -0,0 +1,79 @@
+"""Benchmarks printing a long fills listing.
+
+Compares building colored OrderedDicts for tabulate, as older versions did,
+with render.Table. Run from the repository root:
+
+  python -m benchmarks.render_benchmark
+"""
+
+from __future__ import print_function
+
+from collections import OrderedDict
+import os
+import random
+import time
+
+from gdaxcli import gdax_utils
+from gdaxcli import render
+
+ROW_COUNTS = [1000, 10000, 100000]
+
+def make_fills(count):
+  fills = []
+  for index in range(count):
+    side = random.choice(['buy', 'sell'])
+    fills.append({
+      'product_id': random.choice(['BTC-USD', 'ETH-USD', 'LTC-BTC']),
+      'side': side,
+      'price': '%.2f' % random.uniform(100, 5000),
+      'size': '%.8f' % random.uniform(0.001, 2),
+      'fee': random.choice(['0.0000000000000000', '0.25']),
+      'settled': index % 10 != 0,
+      'created_at': '2017-09-01T12:%02d:%02d.000000Z' % (
+          index // 60 % 60, index % 60),
+    })
+  return fills
+
+def legacy_row(fill):
+  size, price = float(fill['size']), float(fill['price'])
+  return OrderedDict([
+    ('product_id', fill['product_id']),
+    ('side', gdax_utils.colorize(fill['side'], lambda side: side == 'buy')),
+    ('price', price),
+    ('size', size),
+    ('size_usd', size * price),
+    ('fee', gdax_utils.red(fill['fee'])
+            if not gdax_utils.is_str_zero(fill['fee']) else fill['fee']),
+    ('settled', 'yes' if fill['settled'] else gdax_utils.red('no')),
+    ('created_at', fill['created_at']),
+  ])
+
+def time_legacy(client, fills, out):
+  start = time.time()
+  rows = [legacy_row(fill) for fill in fills]
+  out.write(gdax_utils.tabulate(rows, floatfmt='.4f') + '\n')
+  return time.time() - start
+
+def time_table(client, fills, out):
+  start = time.time()
+  table = render.Table([name for name, _ in gdax_utils.FILL_COLUMNS])
+  for fill in fills:
+    table.add_row(*client._parse_fill(fill))
+  table.render(out)
+  return time.time() - start
+
+def main():
+  # Row builders don't use the API; skip creating a gdax client.
+  client = gdax_utils.Client.__new__(gdax_utils.Client)
+  print('%-10s %-12s %-12s %s' % ('rows', 'tabulate_s', 'table_s',
+                                  'speedup'))
+  with open(os.devnull, 'w') as out:
+    for count in ROW_COUNTS:
+      fills = make_fills(count)
+      legacy = time_legacy(client, fills, out)
+      table = time_table(client, fills, out)
+      print('%-10d %-12.3f %-12.3f %.1fx' % (
+          count, legacy, table, legacy / table))
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,258 @@
+"""Benchmarks Client commands against a local mock exchange.
+
+Each command runs against a fresh mock exchange with synthetic data at the
+chosen scale and a fixed latency per request, so results don't depend on the
+network and can be compared across commits. Run from the repository root:
+
+  python -m benchmarks.suite --scale medium --output results.json
+  python -m benchmarks.suite --scale medium --compare results.json
+
+With --compare, exits with status 1 if any benchmark got slower than the
+baseline by more than --tolerance.
+"""
+
+from __future__ import print_function
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks import helpers
+from gdaxcli import cache
+from gdaxcli import candles
+from gdaxcli import gdax_utils
+from gdaxcli import utils
+from gdaxcli.tests import mock_exchange
+
+SCALES = {
+    'small': {'products': 5, 'accounts': 4, 'history_items': 200,
+              'fills': 500, 'orders': 50, 'cancels': 5, 'feed_updates': 200,
+              'candles': 2000},
+    'medium': {'products': 20, 'accounts': 8, 'history_items': 1000,
+               'fills': 5000, 'orders': 500, 'cancels': 20,
+               'feed_updates': 1000, 'candles': 20000},
+    'large': {'products': 40, 'accounts': 16, 'history_items': 5000,
+              'fills': 20000, 'orders': 2000, 'cancels': 50,
+              'feed_updates': 5000, 'candles': 100000},
+}
+
+# Simulated round trip time per request, in seconds.
+DEFAULT_LATENCY = 0.005
+
+@contextlib.contextmanager
+def _client(scale, latency):
+  """Yields (client, exchange) for a fresh mock exchange."""
+  exchange = mock_exchange.Exchange(
+      num_products=scale['products'], latency=latency,
+      num_accounts=scale['accounts'], history_items=scale['history_items'],
+      num_fills=scale['fills'], num_orders=scale['orders'])
+  tmp_dir = tempfile.mkdtemp()
+  try:
+    with mock_exchange.MockExchangeServer(exchange) as server:
+      # Throttling would measure the rate limit, not the client.
+      client = gdax_utils.Client(
+          config=mock_exchange.CONFIG, api_url=server.url, rate_limit=None,
+          product_cache=cache.ProductCache(
+              path=os.path.join(tmp_dir, 'products.json')),
+          candle_store=candles.CandleStore(os.path.join(tmp_dir, 'candles')))
+      yield client, exchange
+  finally:
+    shutil.rmtree(tmp_dir)
+
+def _time_command(command):
+  """Returns a benchmark running command(client, exchange, scale)."""
+  def run(scale, latency):
+    with _client(scale, latency) as (client, exchange):
+      with helpers.silenced():
+        start = time.time()
+        command(client, exchange, scale)
+        seconds = time.time() - start
+      return seconds, exchange.request_count
+  return run
+
+def _history(client, exchange, scale):
+  client.history([account['currency'] for account in exchange.accounts])
+
+def _order_cancel(client, exchange, scale):
+  prefixes = [order['id'] for order in exchange.orders[:scale['cancels']]]
+  client.order_cancel(prefixes, skip_confirmation=True)
+
+def _candles(client, exchange, scale):
+  # One minute candles ending at 2017-09-01, all of them missing.
+  end = utils.parse_time('2017-09-01')
+  client.candles(exchange.products[0]['id'], 60,
+                 start=utils.format_time(end - 60 * scale['candles']),
+                 end=utils.format_time(end), summary=True)
+
+def _feed(scale, latency):
+  """Time for the feed to apply every update of a generated session."""
+  from gdaxcli import feed as feed_lib
+  product_ids = [p['id'] for p in
+                 mock_exchange.make_products(scale['products'])]
+  messages = mock_exchange.feed_session(
+      product_ids, updates=scale['feed_updates'] // len(product_ids))
+  done = threading.Event()
+  count = [0]
+  def on_update(product_id):
+    count[0] += 1
+    if count[0] >= len(messages):
+      done.set()
+  with mock_exchange.WebSocketReplayServer([messages]) as server:
+    start = time.time()
+    f = feed_lib.Feed(product_ids, url=server.url, on_update=on_update)
+    f.start()
+    try:
+      done.wait(60)
+      seconds = time.time() - start
+    finally:
+      f.stop()
+  return seconds, len(messages)
+
+def _replay(scale, latency):
+  """Time for a max speed replay of a recorded session to be applied."""
+  from gdaxcli import feed as feed_lib
+  from gdaxcli import feedlog
+  from gdaxcli import replay
+  product_ids = [p['id'] for p in
+                 mock_exchange.make_products(scale['products'])]
+  messages = mock_exchange.feed_session(
+      product_ids, updates=scale['feed_updates'] // len(product_ids))
+  tmp_dir = tempfile.mkdtemp()
+  path = os.path.join(tmp_dir, 'feed.log')
+  with feedlog.LogWriter(path) as log:
+    for i, message in enumerate(messages):
+      log.write(json.dumps(message), received_at=i * 0.001)
+  done = threading.Event()
+  count = [0]
+  def on_update(product_id):
+    count[0] += 1
+    if count[0] >= len(messages):
+      done.set()
+  try:
+    with replay.ReplayServer(path, speed=None) as server:
+      start = time.time()
+      f = feed_lib.Feed(product_ids, url=server.url, on_update=on_update)
+      f.start()
+      try:
+        done.wait(60)
+        seconds = time.time() - start
+      finally:
+        f.stop()
+  finally:
+    shutil.rmtree(tmp_dir)
+  return seconds, len(messages)
+
+BENCHMARKS = [
+    ('ticker', _time_command(lambda c, e, s: c.ticker())),
+    ('balance', _time_command(lambda c, e, s: c.balance())),
+    ('history', _time_command(_history)),
+    ('fills', _time_command(lambda c, e, s: c.fills())),
+    ('orders', _time_command(lambda c, e, s: c.orders())),
+    ('order_cancel', _time_command(_order_cancel)),
+    ('candles', _time_command(_candles)),
+    ('feed', _feed),
+    ('replay', _replay),
+]
+
+def _commit():
+  try:
+    return subprocess.check_output(
+        ['git', 'rev-parse', '--short', 'HEAD'],
+        stderr=subprocess.STDOUT).decode('ascii').strip()
+  except (OSError, subprocess.CalledProcessError):
+    return None
+
+def run(scale_name, latency, repeat, only=None):
+  """Runs the benchmarks. Returns the results as a JSON-serializable dict.
+
+  Seconds are the fastest of repeat runs, which is the least noisy figure
+  to compare; median is kept for reference. count is the number of requests
+  made, or feed messages applied.
+  """
+  scale = SCALES[scale_name]
+  results = {}
+  for name, benchmark in BENCHMARKS:
+    if only and name not in only:
+      continue
+    times, count = [], None
+    for _ in range(repeat):
+      seconds, count = benchmark(scale, latency)
+      times.append(seconds)
+    times.sort()
+    results[name] = {
+        'seconds': times[0],
+        'median_seconds': times[len(times) // 2],
+        'count': count,
+    }
+    print('%-14s %8.3fs  (median %.3fs, %d)' % (
+        name, times[0], times[len(times) // 2], count), file=sys.stderr)
+  return {
+      'commit': _commit(),
+      'python': platform.python_version(),
+      'scale': scale_name,
+      'scale_params': scale,
+      'latency': latency,
+      'repeat': repeat,
+      'results': results,
+  }
+
+def compare(baseline, current, tolerance):
+  """Prints the change of each benchmark. Returns names that regressed."""
+  regressed = []
+  print('%-14s %10s %10s %8s' % ('benchmark', 'baseline', 'current',
+                                 'change'))
+  for name, result in sorted(current['results'].items()):
+    base = baseline['results'].get(name)
+    if base is None:
+      continue
+    change = result['seconds'] / base['seconds'] - 1
+    flag = ''
+    if change > tolerance:
+      regressed.append(name)
+      flag = '  REGRESSION'
+    print('%-14s %9.3fs %9.3fs %+7.1f%%%s' % (
+        name, base['seconds'], result['seconds'], change * 100, flag))
+  return regressed
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+  parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+  parser.add_argument('--latency', type=float, default=DEFAULT_LATENCY,
+                      help='Seconds of latency per request.')
+  parser.add_argument('--repeat', type=int, default=3)
+  parser.add_argument('--only', help='Comma separated benchmarks to run.')
+  parser.add_argument('--output', help='Write results as JSON to this file.')
+  parser.add_argument('--compare', help='Baseline results JSON file.')
+  parser.add_argument('--tolerance', type=float, default=0.2,
+                      help='Allowed slowdown against the baseline, e.g. 0.2.')
+  args = parser.parse_args()
+
+  if args.compare:
+    with open(args.compare) as f:
+      baseline = json.load(f)
+    if (baseline['scale'], baseline['latency']) != (args.scale, args.latency):
+      parser.error('baseline was run with --scale %s --latency %s' % (
+          baseline['scale'], baseline['latency']))
+
+  only = set(args.only.split(',')) if args.only else None
+  results = run(args.scale, args.latency, args.repeat, only)
+  if args.output:
+    with open(args.output, 'w') as f:
+      json.dump(results, f, indent=2, sort_keys=True)
+  elif not args.compare:
+    json.dump(results, sys.stdout, indent=2, sort_keys=True)
+    print()
+
+  if args.compare and compare(baseline, results, args.tolerance):
+    sys.exit(1)
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,49 @@
+"""Benchmarks Client.ticker against a local mock exchange.
+
+Compares serial fetching (1 worker) with the concurrent fan-out as the number
+of listed products grows. Run from the repository root:
+
+  python -m benchmarks.ticker_benchmark
+"""
+
+from __future__ import print_function
+
+import os
+import tempfile
+import time
+
+from benchmarks import helpers
+from gdaxcli import cache
+from gdaxcli import gdax_utils
+from gdaxcli.tests import mock_exchange
+
+PRODUCT_COUNTS = [5, 10, 20, 40]
+
+# Simulated round trip time per request, in seconds.
+LATENCY = 0.02
+
+def time_ticker(url, workers):
+  # Keep the mock catalog out of the user's real product cache.
+  product_cache = cache.ProductCache(
+      path=os.path.join(tempfile.mkdtemp(), 'products.json'))
+  client = gdax_utils.Client(
+      config=mock_exchange.CONFIG, api_url=url, workers=workers,
+      rate_limit=None, product_cache=product_cache)
+  start = time.time()
+  with helpers.silenced():
+    client.ticker()
+  return time.time() - start
+
+def main():
+  print('%-10s %-12s %-12s %s' % ('products', 'serial_s', 'parallel_s',
+                                  'speedup'))
+  for count in PRODUCT_COUNTS:
+    exchange = mock_exchange.Exchange(num_products=count, latency=LATENCY)
+    with mock_exchange.MockExchangeServer(exchange) as server:
+      serial = time_ticker(server.url, workers=1)
+      parallel = time_ticker(server.url, workers=gdax_utils.DEFAULT_WORKERS)
+    print('%-10d %-12.3f %-12.3f %.1fx' % (
+        count, serial, parallel, serial / parallel))
+
+if __name__ == '__main__':
+  main()
@@ -1,96 +1,422 @@
 import logging
 import sys
+import time
 
-import gdax_utils
-import utils
+# Keep imports here to the minimum; commands import what they need so that
+# help and forwarding to the daemon start fast.
+from gdaxcli import utils
+
+HELP_COMMANDS = set(['help', '-h', '--help'])
+
+# Commands taking --profiles and --all-profiles.
+PROFILE_COMMANDS = ('balance', 'orders', 'fills')
 
 def usage():
   # TODO: Maybe add short commands e.g. t, h, o, ...
   """Usage: gdaxcli <command> [arguments]
-      products                      Lists products available for trading.
+      products [--refresh]          Lists products available for trading.
+                                        Cached locally; --refresh fetches again.
       ticker [product1 product2..]  Get current market ticker.
+      watch [product1 product2..]   Show live order books until Ctrl-C.
+                                        --url <ws url> Watch another feed, e.g. a replay.
+      record <file> [product1 product2..]
+                                    Record the websocket feed to a compressed,
+                                        append-only log until Ctrl-C. Default
+                                        all products. --duration <seconds>
+                                        stops after that long.
+      replay <file>                 Serve a recorded log on a local websocket
+                                        for watch --url, from the start for
+                                        each connection, until Ctrl-C.
+                                        --speed <factor|max>
+                                                       Pace relative to the recording
+                                                       e.g. 10, 0.5; max doesn't wait.
+                                                       Default 1.
+                                        --start <time> Skip to the first message at
+                                                       or after time, e.g.
+                                                       2017-08-01T12:00 (UTC).
+                                        --end <time>   Stop before time.
+                                        --port <port>  Default a free port.
 
-      balance                       Get account balance.
+      balance [--quote <currency>]  Get account balance, valued in USD or the
+                                        given currency.
       history [account1 account2..] Get account history (transfer, match, fee, rebate).
                                         Default USD.
+                                        Accounts are fetched concurrently. --merge
+                                        shows them in one table, newest first.
 
       fills [product]               Get recent fills.
 
+      stats [product] [--daily]     Summarize fills per product: VWAP per side,
+                                        position, FIFO realized and unrealized P&L
+                                        and fees. --daily adds volume per day.
+                                        Takes --since, --local and --until.
+
+      candles <product>             Backfill historic candles into a local store
+                                        and list them. Only ranges not fetched
+                                        before are requested, concurrently.
+                                        --granularity <seconds>
+                                                       60, 300, 900, 3600 (default),
+                                                       21600 or 86400.
+                                        --start <time> Default 200 candles before end.
+                                        --end <time>   Default now.
+                                        --summary      Only show counts.
+
       order list                    List open orders
       orders
 
+                                    history, fills and orders also take:
+                                        --limit <n>    Show at most n rows.
+                                        --since <time> Stop at rows older than time
+                                                       e.g. 2017-08-01T12:00 (UTC).
+                                        --stream       Print rows as they arrive.
+
+      sync [account1 account2..]    Download new history and fills into a local
+                                        database. Default all accounts.
+                                    history and fills then also take:
+                                        --local        Read from the local database.
+                                        --until <time> Only rows older than time.
+                                    and history takes:
+                                        --product <id> Only rows for a product.
+                                        --type <type>  Only transfer, match, fee or
+                                                       rebate rows.
+
       orders cancel <product>       Cancel all orders.
       order cancel all <product>
 
-      order cancel <id>             Cancel order. Id can be a short prefix.
+      order cancel <id> [id2..]     Cancel orders. Ids can be short prefixes.
 
       order <limit/market/stop> <buy/sell> <product> <size> [price]
                                     Place an order. Limit price can be absolute or
                                         relative such as 180, 180.23, -1, +.5
                                         Product can be uppercased or lowercased.
                                         For example: eth-usd, BTC-GBP, ..
+
+      order batch <file|->          Place orders listed in a CSV or json lines file,
+                                        or stdin, one order per line with
+                                        order_type,side,product,size,price.
+                                        Asks for confirmation once, then submits
+                                        all orders concurrently.
+
+                                    Orders and cancels take -y/--yes to skip
+                                        confirmation.
+
+                                    order and order batch take --fast to submit
+                                        on a warm connection with a signer
+                                        keyed once, and print the time to the
+                                        exchange's ack. A limit order at an
+                                        absolute price then skips the ticker and
+                                        isn't checked against the current price.
+
+      order latency                 Histogram of ack latencies of --fast orders
+                                        placed in this shell.
+
+                                    Tables take --tabulate to print with tabulate, as
+                                        older versions did. Slower on long listings.
+
+                                    ticker, balance and orders take --watch <seconds> to
+                                        redraw in place until Ctrl-C. Only values that
+                                        changed are rewritten, green if up, red if down.
+
+                                    balance, orders and fills take --profiles <a,b,..>
+                                        or --all-profiles to show the accounts of
+                                        profiles in the config file, fetched
+                                        concurrently, in one table with a subtotal
+                                        per profile.
+
+                                    Any listing or table takes --format <jsonl|csv|tsv|msgpack>
+                                        to write one record per row instead, with the
+                                        exchange's values as is, as pages arrive.
+
+      daemon                        Run in the foreground, keeping a warm
+                                        connection. Other commands are sent
+                                        to it while it runs, except ones that
+                                        ask for confirmation. Prices it
+                                        fetched are then read from the
+                                        websocket feed.
+      daemon stop                   Stop the running daemon.
+
+      shell                         Run commands at a prompt on one warm client,
+                                        with history and tab completion of
+                                        products and order ids. Prices of
+                                        products used are then read from the
+                                        websocket feed.
+
+                                    Any command takes:
+                                        --profile      Print time spent per phase
+                                                       and per endpoint to stderr.
+                                        --profile-jsonl <file|->
+                                                       Append the timings as json
+                                                       lines to file, or stderr.
+                                        --cprofile <file>
+                                                       Dump cProfile stats of the
+                                                       command to file.
   """
 
-def main():
+def _pop_flag(args, flag):
+  """Removes flag from args. Returns True if it was there."""
+  if flag in args:
+    args.remove(flag)
+    return True
+  return False
+
+def _pop_option(args, option, default=None):
+  """Removes `option value` from args and returns the value."""
+  if option not in args:
+    return default
+  index = args.index(option)
+  value = args[index + 1]
+  del args[index:index + 2]
+  return value
+
+def _pop_listing_options(args):
+  """Removes the options shared by history, fills and orders."""
+  limit = _pop_option(args, '--limit')
+  return {
+      'limit': int(limit) if limit else None,
+      'since': _pop_option(args, '--since'),
+      'stream': _pop_flag(args, '--stream'),
+  }
+
+def _pop_local_options(args):
+  """Removes the options for reading from the local ledger."""
+  return {
+      'local': _pop_flag(args, '--local'),
+      'until': _pop_option(args, '--until'),
+  }
+
+def _read_order_specs(path):
+  """Reads a batch of orders from path, or stdin if path is -."""
+  from gdaxcli import batch
+  if path != '-':
+    with open(path) as f:
+      return batch.read_order_specs(f)
+  specs = batch.read_order_specs(sys.stdin)
+  # Stdin is used up by the orders; ask for confirmation on the terminal.
   try:
-    cmd = sys.argv[1]
-  except IndexError:
+    sys.stdin = open('/dev/tty')
+  except (IOError, OSError):
+    pass
+  return specs
+
+def _pop_profiles(client, args):
+  """Removes --profiles <a,b> and --all-profiles from args. Returns the
+  (name, Client) of the profiles they name, or None if neither was given."""
+  names = _pop_option(args, '--profiles')
+  if _pop_flag(args, '--all-profiles'):
+    return client.profile_clients()
+  if names:
+    return client.profile_clients(
+        [name.strip() for name in names.split(',') if name.strip()])
+  return None
+
+def run(client, args):
+  """Runs the command given by args (without the program name) on client."""
+  args = list(args)
+  client.use_tabulate = _pop_flag(args, '--tabulate')
+  client.output_format = _pop_option(args, '--format')
+  if client.output_format:
+    from gdaxcli import output
+    # Fails on an unknown format before any request is made.
+    output.writer(client.output_format)
+  watch = _pop_option(args, '--watch')
+  watch = float(watch) if watch else None
+  cmd = args[0]
+  profiles = None
+  if '--profiles' in args or '--all-profiles' in args:
+    if cmd not in PROFILE_COMMANDS or args[1:2] == ['cancel']:
+      logging.error('Only %s take --profiles', ', '.join(PROFILE_COMMANDS))
+      sys.exit(1)
+    profiles = _pop_profiles(client, args)
+  if cmd in HELP_COMMANDS:
+    print(usage.__doc__)
+  elif cmd == 'products':
+    client.products(refresh=_pop_flag(args, '--refresh'))
+  elif cmd == 'ticker':
+    products = args[1:] if len(args) > 1 else None
+    client.ticker(products, watch=watch)
+  elif cmd == 'balance':
+    client.balance(quote=_pop_option(args, '--quote', 'USD'), watch=watch,
+                   profiles=profiles)
+  elif cmd == 'history':
+    options = _pop_listing_options(args)
+    options.update(_pop_local_options(args))
+    options['product'] = _pop_option(args, '--product')
+    options['type_'] = _pop_option(args, '--type')
+    options['merge'] = _pop_flag(args, '--merge')
+    accounts = args[1:] if len(args) > 1 else ['USD']
+    client.history(accounts, **options)
+  elif cmd == 'orders':
+    if len(args) > 1 and args[1] == 'cancel':
+      product = args[2]
+      client.cancel_all(product)
+    else:
+      client.orders(watch=watch, profiles=profiles,
+                    **_pop_listing_options(args))
+  elif cmd == 'order':
+    skip_confirmation = _pop_flag(args, '-y') | _pop_flag(args, '--yes')
+    fast = _pop_flag(args, '--fast')
+    try:
+      order_type = args[1]
+      if order_type == 'cancel':
+        order_id = args[2]
+        if order_id == 'all':
+          product = args[3]
+          client.cancel_all(product, skip_confirmation)
+        else:
+          client.order_cancel(args[2:], skip_confirmation)
+      elif order_type == 'latency':
+        client.order_latency()
+      elif order_type == 'list':
+        client.orders(watch=watch, **_pop_listing_options(args))
+      elif order_type == 'batch':
+        specs = _read_order_specs(args[2])
+        client.order_batch(specs, skip_confirmation, fast)
+      else:
+        side = args[2]
+        product = args[3]
+        size = args[4]
+        price = args[5] if len(args) == 6 else None
+        client.order(order_type, side, product, size, price,
+                     skip_confirmation, fast)
+    except IndexError:
+      logging.error('Missing required value.')
+      print(usage.__doc__)
+      sys.exit()
+  elif cmd == 'fills':
+    options = _pop_listing_options(args)
+    options.update(_pop_local_options(args))
+    product = args[1] if len(args) > 1 else None
+    client.fills(product, profiles=profiles, **options)
+  elif cmd == 'stats':
+    options = _pop_local_options(args)
+    options['since'] = _pop_option(args, '--since')
+    options['daily'] = _pop_flag(args, '--daily')
+    product = args[1] if len(args) > 1 else None
+    client.stats(product, **options)
+  elif cmd == 'candles':
+    options = {
+        'granularity': int(_pop_option(args, '--granularity', 3600)),
+        'start': _pop_option(args, '--start'),
+        'end': _pop_option(args, '--end'),
+        'summary': _pop_flag(args, '--summary'),
+    }
+    if len(args) < 2:
+      logging.error('Missing required value.')
+      print(usage.__doc__)
+      sys.exit()
+    client.candles(args[1], **options)
+  elif cmd == 'watch':
+    url = _pop_option(args, '--url')
+    client.watch(args[1:] or None, url=url)
+  elif cmd == 'record':
+    duration = _pop_option(args, '--duration')
+    if len(args) < 2:
+      logging.error('Missing required value.')
+      print(usage.__doc__)
+      sys.exit()
+    client.record(args[1], args[2:] or None,
+                  duration=float(duration) if duration else None)
+  elif cmd == 'replay':
+    from gdaxcli import replay
+    try:
+      speed = replay.parse_speed(_pop_option(args, '--speed', '1'))
+    except ValueError as e:
+      logging.error('%s', e)
+      sys.exit(1)
+    options = {
+        'start': _pop_option(args, '--start'),
+        'end': _pop_option(args, '--end'),
+        'port': int(_pop_option(args, '--port', 0)),
+    }
+    if len(args) < 2:
+      logging.error('Missing required value.')
+      print(usage.__doc__)
+      sys.exit()
+    client.replay(args[1], speed, **options)
+  elif cmd == 'sync':
+    client.sync(args[1:] or None)
+  else:
+    logging.error('Invalid command: %s', cmd)
+    sys.exit(1)
+
+def _write_profile(recorder, client, command, options):
+  """Prints the --profile summary and writes --profile-jsonl lines."""
+  counters = client.request_counters() if client else None
+  if options['profile']:
+    sys.stderr.write('\n')
+    recorder.print_summary(sys.stderr, counters)
+  path = options['profile_jsonl']
+  if path:
+    lines = recorder.json_lines(command, counters)
+    if path == '-':
+      for line in lines:
+        sys.stderr.write(line + '\n')
+    else:
+      with open(path, 'a') as f:
+        for line in lines:
+          f.write(line + '\n')
+
+def main():
+  args = sys.argv[1:]
+  profile_options = {
+      'profile': _pop_flag(args, '--profile'),
+      'profile_jsonl': _pop_option(args, '--profile-jsonl'),
+      'cprofile': _pop_option(args, '--cprofile'),
+  }
+  if not args or args[0] in HELP_COMMANDS:
     print(usage.__doc__)
     sys.exit()
 
-  client = gdax_utils.Client()
+  from gdaxcli import daemon
+  if args[0] == 'daemon':
+    if args[1:] == ['stop']:
+      daemon.stop()
+    else:
+      daemon.serve()
+    return
+
+  recorder = profiler = None
+  if any(profile_options.values()):
+    from gdaxcli import timing
+    recorder = timing.Recorder()
+  elif daemon.can_serve(args) and daemon.forward(args):
+    # Handed the command to a running daemon, so we didn't pay for imports
+    # and a cold connection. Profiling always runs the command here.
+    return
+
+  start = time.time()
+  from gdaxcli import gdax_utils
+  if recorder:
+    recorder.add_phase('import', time.time() - start)
+  client = gdax_utils.Client(recorder=recorder)
+  if args[0] == 'shell':
+    from gdaxcli import shell
+    shell.run(client)
+    return
+  if profile_options['cprofile']:
+    import cProfile
+    profiler = cProfile.Profile()
 
+  from gdaxcli import exceptions
+  start = time.time()
+  if profiler:
+    profiler.enable()
   try:
-    if cmd == 'help':
-      print(usage.__doc__)
-    elif cmd == 'products':
-      client.products()
-    elif cmd == 'ticker':
-      products = sys.argv[2:] if len(sys.argv) > 2 else None
-      client.ticker(products)
-    elif cmd == 'balance':
-      client.balance()
-    elif cmd == 'history':
-      accounts = sys.argv[2:] if len(sys.argv) > 2 else ['USD']
-      client.history(accounts)
-    elif cmd == 'orders':
-      if len(sys.argv) > 2 and sys.argv[2] == 'cancel':
-        product = sys.argv[3]
-        client.cancel_all(product)
-      else:
-        client.orders()
-    elif cmd == 'order':
-      # TODO: add confirmation and option to skip -y/--yes
-      try:
-        order_type = sys.argv[2]
-        if order_type == 'cancel':
-          order_id = sys.argv[3]
-          if order_id == 'all':
-            product = sys.argv[4]
-            client.cancel_all(product)
-          else:
-            client.order_cancel(order_id)
-        elif order_type == 'list':
-          client.orders()
-        else:
-          side = sys.argv[3]
-          product = sys.argv[4]
-          size = sys.argv[5]
-          price = sys.argv[6] if len(sys.argv) == 7 else None
-          client.order(order_type, side, product, size, price)
-      except IndexError:
-        logging.error('Missing required value.')
-        print(usage.__doc__)
-        sys.exit()
-    elif cmd == 'fills':
-      client.fills()
-    else:
-      logging.error('Invalid command: %s', cmd)
-      sys.exit(1)
+    run(client, args)
+  except exceptions.Error as e:
+    logging.error('%s', e)
+    sys.exit(1)
   except Exception as e:
     import traceback
     traceback.print_exc()
     print('GETTING AN ERROR? File it at https://github.com/sonph/gdaxcli/issues')
+  finally:
+    if profiler:
+      profiler.disable()
+      profiler.dump_stats(profile_options['cprofile'])
+    if recorder:
+      recorder.add_phase('command', time.time() - start)
+      _write_profile(recorder, client, args[0], profile_options)
 
 if __name__ == '__main__':
   utils.configure_logging(to_file=False)
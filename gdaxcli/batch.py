@@ -0,0 +1,52 @@
+"""Reading order specs for batch placement.
+
+Orders are given one per line, either as CSV:
+
+  order_type,side,product,size,price
+  limit,buy,ETH-USD,0.1,280.50
+  market,sell,BTC-USD,0.01,
+
+or as json lines:
+
+  {"order_type": "limit", "side": "buy", "product": "ETH-USD", "size": "0.1",
+   "price": "-2"}
+
+The CSV header is optional. Blank lines and lines starting with # are skipped.
+Prices can be relative, like in a single order.
+"""
+
+import csv
+import json
+
+FIELDS = ('order_type', 'side', 'product', 'size', 'price')
+
+def _normalize(spec):
+  """Fills in a missing price and converts values to strings."""
+  result = {}
+  for field in FIELDS:
+    value = spec.get(field)
+    result[field] = '' if value is None else str(value).strip()
+  return result
+
+def read_order_specs(f):
+  """Reads order specs from a file object.
+
+  Returns:
+    List of dicts with the keys in FIELDS, all values strings.
+
+  Raises:
+    ValueError: if a line can't be parsed.
+  """
+  lines = [line for line in f.read().splitlines()
+           if line.strip() and not line.lstrip().startswith('#')]
+  if lines and lines[0].lstrip().startswith('{'):
+    return [_normalize(json.loads(line)) for line in lines]
+
+  specs = []
+  for row in csv.reader(lines):
+    if row[0].strip() == FIELDS[0]:
+      continue
+    if len(row) < len(FIELDS) - 1:
+      raise ValueError('Expected %s: %s' % (','.join(FIELDS), ','.join(row)))
+    specs.append(_normalize(dict(zip(FIELDS, row))))
+  return specs
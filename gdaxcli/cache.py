@@ -0,0 +1,54 @@
+"""On-disk cache of the product catalog.
+
+Products are listed on every command that needs to validate or enumerate
+product ids, but they rarely change. Caching them saves a round trip.
+"""
+
+import json
+import logging
+import os
+import time
+
+DEFAULT_PATH = '~/.gdaxcli_products.json'
+
+# Seconds before the cached catalog is considered stale. Can be overridden
+# with the GDAXCLI_PRODUCTS_TTL environment variable.
+DEFAULT_TTL = 24 * 60 * 60
+
+class ProductCache(object):
+  """Product catalog stored as json, with a time to live."""
+
+  def __init__(self, path=DEFAULT_PATH, ttl=None):
+    self._path = os.path.expanduser(path)
+    if ttl is None:
+      ttl = float(os.environ.get('GDAXCLI_PRODUCTS_TTL', DEFAULT_TTL))
+    self._ttl = ttl
+
+  def get(self):
+    """Returns the cached list of products, or None if missing or stale."""
+    try:
+      with open(self._path) as f:
+        data = json.load(f)
+    except (IOError, OSError, ValueError):
+      return None
+    if time.time() - data.get('fetched_at', 0) > self._ttl:
+      return None
+    return data.get('products')
+
+  def set(self, products):
+    """Saves the list of products, replacing the file atomically."""
+    data = {'fetched_at': time.time(), 'products': products}
+    tmp_path = self._path + '.tmp'
+    try:
+      with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+      os.rename(tmp_path, self._path)
+    except (IOError, OSError):
+      logging.warning('Unable to write product cache to %s', self._path)
+
+  def invalidate(self):
+    """Removes the cached catalog."""
+    try:
+      os.remove(self._path)
+    except OSError:
+      pass
@@ -0,0 +1,182 @@
+"""Local store of historic candles, in fixed size binary records.
+
+Each product and granularity has its own file of CANDLE_DTYPE records sorted
+by time, next to a small json file of the time ranges already fetched. Reads
+memory map the file and slice it with a binary search, so a range comes back
+as a NumPy array viewing the file without copying or parsing. Backfills only
+fetch the ranges not fetched before.
+
+https://docs.scipy.org/doc/numpy/reference/generated/numpy.memmap.html
+"""
+
+import json
+import os
+
+import numpy as np
+
+from gdaxcli import utils
+
+DEFAULT_DIR = '~/.gdaxcli_candles'
+
+# Candle sizes the exchange supports, in seconds.
+GRANULARITIES = (60, 300, 900, 3600, 21600, 86400)
+
+# Most candles the exchange returns for one request.
+MAX_CANDLES = 200
+
+# Windows fetched between writes to the store, so an interrupted backfill
+# keeps what it got.
+WRITE_BATCH = 50
+
+# One record per candle: 48 bytes, in the order the API returns the fields.
+CANDLE_DTYPE = np.dtype([
+    ('time', '<i8'), ('low', '<f8'), ('high', '<f8'), ('open', '<f8'),
+    ('close', '<f8'), ('volume', '<f8')])
+
+def to_array(rows):
+  """Converts candles as returned by the API to a CANDLE_DTYPE array."""
+  if not rows:
+    return np.empty(0, dtype=CANDLE_DTYPE)
+  return np.array([tuple(row) for row in rows], dtype=CANDLE_DTYPE)
+
+def _merge_ranges(ranges):
+  """Sorted, non-overlapping union of (start, end) ranges."""
+  merged = []
+  for start, end in sorted(ranges):
+    if merged and start <= merged[-1][1]:
+      merged[-1][1] = max(merged[-1][1], end)
+    else:
+      merged.append([start, end])
+  return [tuple(r) for r in merged]
+
+def windows(ranges, granularity):
+  """Splits (start, end) ranges into windows of at most MAX_CANDLES."""
+  size = granularity * MAX_CANDLES
+  result = []
+  for start, end in ranges:
+    for window_start in range(start, end, size):
+      result.append((window_start, min(window_start + size, end)))
+  return result
+
+class CandleStore(object):
+  """Candle files in a directory, one per product and granularity."""
+
+  def __init__(self, directory=DEFAULT_DIR):
+    self._directory = os.path.expanduser(directory)
+
+  def _path(self, product_id, granularity, extension):
+    return os.path.join(self._directory, '%s-%d.%s' % (
+        product_id, granularity, extension))
+
+  def fetched(self, product_id, granularity):
+    """Returns the sorted (start, end) ranges fetched so far."""
+    try:
+      with open(self._path(product_id, granularity, 'json')) as f:
+        return [tuple(r) for r in json.load(f)['fetched']]
+    except (IOError, OSError, ValueError):
+      return []
+
+  def missing(self, product_id, granularity, start, end):
+    """Returns the parts of [start, end) not fetched yet, aligned to the
+    granularity."""
+    start -= start % granularity
+    end += -end % granularity
+    gaps = []
+    for fetched_start, fetched_end in self.fetched(product_id, granularity):
+      if fetched_end <= start or fetched_start >= end:
+        continue
+      if fetched_start > start:
+        gaps.append((start, fetched_start))
+      start = max(start, fetched_end)
+    if start < end:
+      gaps.append((start, end))
+    return gaps
+
+  def read(self, product_id, granularity, start=None, end=None):
+    """Returns candles with start <= time < end, oldest first.
+
+    The array is a read-only view of the memory mapped file.
+    """
+    path = self._path(product_id, granularity, 'bin')
+    if not os.path.exists(path) or not os.path.getsize(path):
+      return np.empty(0, dtype=CANDLE_DTYPE)
+    candles = np.memmap(path, dtype=CANDLE_DTYPE, mode='r')
+    times = candles['time']
+    first = 0 if start is None else np.searchsorted(times, start, 'left')
+    last = len(candles) if end is None else np.searchsorted(times, end, 'left')
+    return candles[first:last]
+
+  def write(self, product_id, granularity, candles, ranges):
+    """Adds candles and marks ranges as fetched.
+
+    Candles after the last stored one are appended to the file; otherwise
+    the file is merged and rewritten.
+
+    Args:
+      candles: CANDLE_DTYPE array, in any order.
+      ranges: (start, end) ranges the candles were fetched for, including
+          ones without candles.
+    """
+    if not os.path.isdir(self._directory):
+      os.makedirs(self._directory)
+    path = self._path(product_id, granularity, 'bin')
+    candles = np.sort(candles, order='time')
+    candles = candles[np.unique(candles['time'], return_index=True)[1]]
+    stored = self.read(product_id, granularity)
+    if len(candles):
+      if not len(stored) or candles['time'][0] > stored['time'][-1]:
+        with open(path, 'ab') as f:
+          f.write(candles.tobytes())
+      else:
+        merged = np.concatenate([np.asarray(stored), candles])
+        # Later fetches win over stored candles of the same time.
+        merged = merged[::-1]
+        merged = merged[np.unique(merged['time'], return_index=True)[1]]
+        del stored
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+          f.write(merged.tobytes())
+        os.rename(tmp_path, path)
+
+    fetched = _merge_ranges(self.fetched(product_id, granularity) +
+                            list(ranges))
+    tmp_path = self._path(product_id, granularity, 'json.tmp')
+    with open(tmp_path, 'w') as f:
+      json.dump({'fetched': fetched}, f)
+    os.rename(tmp_path, self._path(product_id, granularity, 'json'))
+
+def backfill(store, fetch, product_id, granularity, start, end, workers):
+  """Fetches the candles of [start, end) that weren't fetched before.
+
+  Windows are fetched concurrently, in order, and written to the store every
+  WRITE_BATCH windows.
+
+  Args:
+    store: CandleStore to add the candles to.
+    fetch: Function of (start, end) returning candles as the API does.
+    product_id, granularity: Candles to fetch.
+    start, end: Seconds since the epoch.
+    workers: Most requests in flight.
+
+  Returns:
+    Tuple of (requests made, candles fetched).
+  """
+  todo = windows(store.missing(product_id, granularity, start, end),
+                 granularity)
+  count = 0
+  results = utils.parallel_imap(lambda window: fetch(*window), todo, workers)
+  try:
+    for first in range(0, len(todo), WRITE_BATCH):
+      batch = todo[first:first + WRITE_BATCH]
+      arrays = []
+      for window_start, window_end in batch:
+        candles = to_array(next(results))
+        # The end is inclusive in the API; that candle is the next window's.
+        times = candles['time']
+        arrays.append(candles[(times >= window_start) & (times < window_end)])
+      candles = np.concatenate(arrays)
+      store.write(product_id, granularity, candles, batch)
+      count += len(candles)
+  finally:
+    results.close()
+  return len(todo), count
@@ -0,0 +1,190 @@
+"""Daemon mode: keep a warm Client and serve commands over a Unix socket.
+
+Every invocation of gdaxcli otherwise pays for interpreter startup, imports,
+reading the config and a cold TLS connection. While `gdaxcli daemon` runs,
+other invocations send their arguments to it and print what it sends back.
+
+Protocol: the client sends one json line {"args": [...]}; the daemon runs the
+command and replies with one json line {"stdout": ..., "stderr": ...,
+"status": ...} before closing the connection.
+"""
+
+from __future__ import print_function
+
+import json
+import logging
+import os
+import re
+import socket
+import sys
+import traceback
+
+try:
+  from StringIO import StringIO
+  import SocketServer as socketserver
+except ImportError:
+  from io import StringIO
+  import socketserver
+
+from gdaxcli import exceptions
+
+SOCKET_PATH = '~/.gdaxcli.sock'
+
+# Most products whose prices are followed on the websocket feed once a
+# command prices them, e.g. balance. Later commands read them from the feed.
+FEED_PRODUCTS = 6
+
+# Commands that don't ask for confirmation and can run without a terminal.
+_NON_INTERACTIVE_COMMANDS = set(
+    ['products', 'ticker', 'balance', 'history', 'fills', 'stats', 'sync',
+     'candles'])
+
+_ANSI_ESCAPE = re.compile(r'\x1b\[[0-9;]*m')
+
+def can_serve(args):
+  """Returns True if the command in args can be run by the daemon."""
+  cmd = args[0]
+  if '--watch' in args:
+    # Never finishes, and redraws need the terminal.
+    return False
+  if 'msgpack' in args:
+    # Replies carry text; binary output is written here instead.
+    return False
+  if cmd in _NON_INTERACTIVE_COMMANDS:
+    return True
+  if cmd == 'orders':
+    return args[1:2] != ['cancel']
+  if cmd == 'order':
+    return args[1:2] == ['list']
+  return False
+
+def _connect(path):
+  sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+  try:
+    sock.connect(os.path.expanduser(path))
+  except socket.error:
+    sock.close()
+    return None
+  return sock
+
+def _request(sock, message):
+  sock.sendall((json.dumps(message) + '\n').encode('utf-8'))
+  chunks = []
+  while True:
+    chunk = sock.recv(65536)
+    if not chunk:
+      break
+    chunks.append(chunk)
+  sock.close()
+  return json.loads(b''.join(chunks).decode('utf-8'))
+
+def forward(args, path=SOCKET_PATH):
+  """Runs the command on the daemon and prints its output.
+
+  Returns:
+    False if no daemon is running; the caller should run the command itself.
+  """
+  sock = _connect(path)
+  if sock is None:
+    return False
+  response = _request(sock, {'args': args})
+  stdout, stderr = response['stdout'], response['stderr']
+  # Colors are rendered into a buffer on the daemon's side; drop them if we
+  # are not writing to a terminal, like colorama does.
+  if not sys.stdout.isatty():
+    stdout = _ANSI_ESCAPE.sub('', stdout)
+  sys.stdout.write(stdout)
+  sys.stderr.write(stderr)
+  if response['status']:
+    sys.exit(response['status'])
+  return True
+
+def stop(path=SOCKET_PATH):
+  """Asks a running daemon to exit."""
+  sock = _connect(path)
+  if sock is None:
+    print('Daemon is not running')
+    return
+  _request(sock, {'stop': True})
+  print('Daemon stopped')
+
+def _run_captured(client, args):
+  """Runs a command and returns (stdout, stderr, status)."""
+  # Imported here to avoid a circular import; __main__ imports this module.
+  from gdaxcli import __main__ as cli
+
+  out, err = StringIO(), StringIO()
+  handler = logging.StreamHandler(err)
+  root_logger = logging.getLogger()
+  root_logger.addHandler(handler)
+  stdout, stderr = sys.stdout, sys.stderr
+  sys.stdout, sys.stderr = out, err
+  status = 0
+  try:
+    cli.run(client, args)
+  except SystemExit as e:
+    status = e.code or 0
+  except exceptions.Error as e:
+    logging.error('%s', e)
+    status = 1
+  except Exception:
+    traceback.print_exc()
+    status = 1
+  finally:
+    sys.stdout, sys.stderr = stdout, stderr
+    root_logger.removeHandler(handler)
+  return out.getvalue(), err.getvalue(), status
+
+class _Handler(socketserver.StreamRequestHandler):
+
+  def handle(self):
+    message = json.loads(self.rfile.readline().decode('utf-8'))
+    if message.get('stop'):
+      self.server.stopped = True
+      response = {}
+    elif not can_serve(message['args']):
+      response = {'stdout': '', 'stderr': 'Command not supported by daemon\n',
+                  'status': 1}
+    else:
+      stdout, stderr, status = _run_captured(self.server.client,
+                                             message['args'])
+      response = {'stdout': stdout, 'stderr': stderr, 'status': status}
+    self.wfile.write((json.dumps(response) + '\n').encode('utf-8'))
+
+def serve(path=SOCKET_PATH, client=None):
+  """Serves commands until stopped. Commands run one at a time."""
+  path = os.path.expanduser(path)
+  if os.path.exists(path):
+    sock = _connect(path)
+    if sock is not None:
+      sock.close()
+      logging.error('Daemon is already running at %s', path)
+      sys.exit(1)
+    # Left over from a daemon that didn't exit cleanly.
+    os.remove(path)
+
+  if client is None:
+    from gdaxcli import gdax_utils
+    client = gdax_utils.Client()
+  # Fetch the product catalog to open the connection before the first command.
+  client._get_products()
+  client.max_feed_products = FEED_PRODUCTS
+
+  # The socket gives access to the account, so only the owner may connect.
+  old_umask = os.umask(0o177)
+  try:
+    server = socketserver.UnixStreamServer(path, _Handler)
+  finally:
+    os.umask(old_umask)
+  server.client = client
+  server.stopped = False
+  logging.info('Listening on %s', path)
+  try:
+    while not server.stopped:
+      server.handle_request()
+  except KeyboardInterrupt:
+    pass
+  finally:
+    server.server_close()
+    os.remove(path)
+    client.stop_feed()
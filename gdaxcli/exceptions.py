@@ -4,4 +4,15 @@ class Error(Exception):
   """Generic error class."""
 
 class InvalidOrderError(Error):
-  """Raised when order is invalid."""
+  """Raised when order is invalid.
+
+  Attributes:
+    reason: Short name of the rule the order breaks, e.g. min_size, or None.
+  """
+
+  def __init__(self, message, reason=None):
+    Error.__init__(self, message)
+    self.reason = reason
+
+class ApiError(Error):
+  """Raised when the exchange responds with an error."""
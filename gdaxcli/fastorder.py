@@ -0,0 +1,129 @@
+"""Order submission with little work between the decision and the request.
+
+For every request, gdax-python's auth decodes the base64 secret and keys a
+new HMAC, and buy and sell serialize the order with json.dumps. Orders placed
+with --fast instead:
+
+  - are signed with a copy of an HMAC keyed once with the decoded secret;
+  - are serialized from a json template made once per product, side and
+    type, with only the size and price put in;
+  - go out on the client's pooled keep-alive session, warmed up by a request
+    to /time while the order is checked and confirmed;
+  - have their submit to ack latency kept in a timing.LatencyHistogram.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import threading
+import time
+
+from gdaxcli import timing
+
+# Seconds a pooled connection is assumed to stay open without requests. The
+# connection is warmed up again before an order after this long.
+KEEPALIVE_SECONDS = 30
+
+class FastAuth(object):
+  """requests auth signing like gdax-python's GdaxAuth, keyed once."""
+
+  def __init__(self, api_key, b64secret, passphrase):
+    self._hmac = hmac.new(base64.b64decode(b64secret), digestmod=hashlib.sha256)
+    self._headers = {
+        'Content-Type': 'Application/JSON',
+        'CB-ACCESS-KEY': api_key,
+        'CB-ACCESS-PASSPHRASE': passphrase,
+    }
+
+  def signature(self, timestamp, method, path, body=None):
+    """Returns the base64 CB-ACCESS-SIGN of a request."""
+    mac = self._hmac.copy()
+    mac.update((timestamp + method + path).encode('ascii'))
+    if body:
+      mac.update(body if isinstance(body, bytes) else body.encode('ascii'))
+    return base64.b64encode(mac.digest())
+
+  def __call__(self, request):
+    timestamp = str(time.time())
+    request.headers.update(self._headers)
+    request.headers['CB-ACCESS-SIGN'] = self.signature(
+        timestamp, request.method, request.path_url, request.body)
+    request.headers['CB-ACCESS-TIMESTAMP'] = timestamp
+    return request
+
+class OrderTemplates(object):
+  """Order bodies serialized once per product, side and type."""
+
+  def __init__(self):
+    self._templates = {}
+
+  def body(self, product_id, side, order_type, size, price=None):
+    """Returns the json body of an order.
+
+    size and price are put in as they are; they must be checked decimal
+    strings, as rules.RulesIndex.check and _prepare_order make them.
+    """
+    key = (product_id, side, order_type, price is not None)
+    template = self._templates.get(key)
+    if template is None:
+      fields = json.dumps({'product_id': product_id, 'side': side,
+                           'type': order_type}, sort_keys=True,
+                          separators=(',', ':'))
+      template = fields[:-1].replace('%', '%%') + ',"size":"%s"'
+      if price is not None:
+        template += ',"price":"%s"'
+      template += '}'
+      self._templates[key] = template
+    if price is None:
+      return template % size
+    return template % (size, price)
+
+class FastOrders(object):
+  """Places orders of one account through a warm connection."""
+
+  def __init__(self, transport, api_url, auth):
+    """Initializer.
+
+    Args:
+      transport: The client's transport.Transport.
+      api_url: Base url of the exchange API.
+      auth: FastAuth of the account.
+    """
+    self._transport = transport
+    self._url = api_url.rstrip('/')
+    self._auth = auth
+    self._templates = OrderTemplates()
+    self._last_used = None
+    self.latency = timing.LatencyHistogram()
+
+  def warm(self):
+    """Opens a connection to the API in the background, unless one was used
+    recently."""
+    if (self._last_used is not None and
+        time.time() - self._last_used < KEEPALIVE_SECONDS):
+      return
+    self._last_used = time.time()
+    thread = threading.Thread(target=self._warm)
+    thread.daemon = True
+    thread.start()
+
+  def _warm(self):
+    try:
+      self._transport.get(self._url + '/time')
+    except Exception as e:
+      logging.debug('Warming up the connection failed: %s', e)
+
+  def submit(self, kwargs):
+    """Places an order of buy/sell kwargs. Returns the exchange's reply."""
+    body = self._templates.body(kwargs['product_id'], kwargs['side'],
+                                kwargs['type'], kwargs['size'],
+                                kwargs.get('price'))
+    start = time.time()
+    response = self._transport.post(self._url + '/orders', data=body,
+                                    auth=self._auth)
+    result = response.json()
+    self._last_used = time.time()
+    self.latency.add(self._last_used - start)
+    return result
@@ -0,0 +1,264 @@
+"""Live market data from the GDAX websocket feed.
+
+Keeps a level 2 order book and the last trade price for each subscribed
+product, so prices can be looked up without a REST round trip.
+
+gdax-python has a WebsocketClient, but it subscribes without channels and
+has no way to resubscribe a single product, so this talks to the feed
+directly with websocket-client.
+  https://docs.gdax.com/#websocket-feed
+"""
+
+from __future__ import division
+
+import bisect
+import json
+import logging
+import threading
+import time
+
+import websocket
+
+WS_URL = 'wss://ws-feed.gdax.com'
+
+CHANNELS = ['level2', 'ticker']
+
+# Seconds to wait before reconnecting after the connection drops.
+RECONNECT_DELAY = 1
+
+class OrderBook(object):
+  """Level 2 order book of one product: aggregated size at each price."""
+
+  def __init__(self, product_id):
+    self.product_id = product_id
+    self.sequence = None
+    self.last_price = None
+    self.ready = False
+    self._sizes = {'buy': {}, 'sell': {}}
+    # Prices in ascending order, for best bid/ask lookups.
+    self._prices = {'buy': [], 'sell': []}
+
+  def load_snapshot(self, bids, asks, sequence=None):
+    """Replaces the book with a snapshot of [price, size] pairs."""
+    for side, levels in (('buy', bids), ('sell', asks)):
+      sizes = dict((float(price), float(size)) for price, size in levels)
+      self._sizes[side] = sizes
+      self._prices[side] = sorted(sizes)
+    self.sequence = sequence
+    self.ready = True
+
+  def update(self, side, price, size):
+    """Sets the size at a price level; a size of zero removes the level."""
+    price, size = float(price), float(size)
+    sizes, prices = self._sizes[side], self._prices[side]
+    if size == 0:
+      if sizes.pop(price, None) is not None:
+        del prices[bisect.bisect_left(prices, price)]
+    else:
+      if price not in sizes:
+        bisect.insort(prices, price)
+      sizes[price] = size
+
+  def best_bid(self):
+    """Returns (price, size) of the highest bid, or None."""
+    prices = self._prices['buy']
+    if not prices:
+      return None
+    return prices[-1], self._sizes['buy'][prices[-1]]
+
+  def best_ask(self):
+    """Returns (price, size) of the lowest ask, or None."""
+    prices = self._prices['sell']
+    if not prices:
+      return None
+    return prices[0], self._sizes['sell'][prices[0]]
+
+  def levels(self, side, depth):
+    """Returns up to depth (price, size) levels, best first."""
+    prices = self._prices[side]
+    if side == 'buy':
+      prices = reversed(prices[-depth:])
+    else:
+      prices = prices[:depth]
+    return [(price, self._sizes[side][price]) for price in prices]
+
+  def price(self):
+    """Last trade price, or the mid price if no trade was seen yet."""
+    if self.last_price is not None:
+      return self.last_price
+    bid, ask = self.best_bid(), self.best_ask()
+    if bid is None or ask is None:
+      return None
+    return (bid[0] + ask[0]) / 2
+
+class Feed(object):
+  """Subscribes to products and keeps their books up to date.
+
+  Messages are read on a background thread. If a book update skips a
+  sequence number, the book is dropped and the product resubscribed to get a
+  fresh snapshot. The level2 channel may not send sequence numbers, in which
+  case books are only reset by the snapshots sent on (re)connect.
+
+  Usage:
+    feed = Feed(['ETH-USD']).start()
+    feed.wait_ready()
+    bid, size = feed.book('ETH-USD').best_bid()
+  """
+
+  def __init__(self, product_ids, url=WS_URL, on_update=None,
+               on_message=None):
+    """Initializer.
+
+    Args:
+      product_ids: Products to subscribe to.
+      url: Websocket feed url.
+      on_update: Called with the product id after each change to its book,
+          on the feed thread.
+      on_message: Called with the raw text of each message before it's
+          applied, on the feed thread, e.g. to record the feed.
+    """
+    self.product_ids = list(product_ids)
+    self.url = url
+    self.resync_count = 0
+    self._on_update = on_update
+    self._on_message = on_message
+    self._books = dict((product_id, OrderBook(product_id))
+                       for product_id in self.product_ids)
+    self._lock = threading.Lock()
+    self._ws = None
+    self._running = False
+    self._thread = None
+
+  def start(self):
+    self._running = True
+    self._thread = threading.Thread(target=self._run)
+    self._thread.daemon = True
+    self._thread.start()
+    return self
+
+  def stop(self):
+    self._running = False
+    if self._ws is not None:
+      self._ws.close()
+    if self._thread is not None:
+      self._thread.join(5)
+
+  def wait_ready(self, timeout=10):
+    """Waits until every book has a snapshot. Returns False on timeout."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+      with self._lock:
+        if all(book.ready for book in self._books.values()):
+          return True
+      time.sleep(0.01)
+    return False
+
+  def book(self, product_id):
+    """Returns the book of a product, or None if it's not ready."""
+    book = self._books.get(product_id)
+    if book is None or not book.ready:
+      return None
+    return book
+
+  def price(self, product_id):
+    """Returns the current price of a product, or None if not known."""
+    with self._lock:
+      book = self.book(product_id)
+      return book.price() if book is not None else None
+
+  def levels(self, product_id, side, depth):
+    """Returns a copy of up to depth (price, size) levels of a side of a
+    product's book, best first, or None if the book is not ready.
+
+    Copied while holding the lock, so it's never a half applied update.
+    """
+    with self._lock:
+      book = self.book(product_id)
+      return book.levels(side, depth) if book is not None else None
+
+  def subscribe(self, product_ids):
+    """Adds products to a running feed. Their books are ready once the
+    feed sends their snapshots."""
+    with self._lock:
+      new = [product_id for product_id in product_ids
+             if product_id not in self._books]
+      for product_id in new:
+        self._books[product_id] = OrderBook(product_id)
+        self.product_ids.append(product_id)
+    if not new or self._ws is None:
+      return
+    try:
+      self._subscribe('subscribe', new)
+    except (websocket.WebSocketException, IOError) as e:
+      # Subscribed to with the others when the feed reconnects.
+      logging.debug('Subscribing to %s failed: %s', new, e)
+
+  def _send(self, message):
+    self._ws.send(json.dumps(message))
+
+  def _subscribe(self, message_type, product_ids):
+    self._send({'type': message_type, 'product_ids': product_ids,
+                'channels': CHANNELS})
+
+  def _run(self):
+    while self._running:
+      try:
+        self._ws = websocket.create_connection(self.url)
+        self._subscribe('subscribe', self.product_ids)
+        while self._running:
+          text = self._ws.recv()
+          if self._on_message is not None and text:
+            self._on_message(text)
+          self.handle(json.loads(text))
+      except (websocket.WebSocketException, IOError, ValueError) as e:
+        if not self._running:
+          break
+        logging.warning('Feed disconnected: %s; reconnecting', e)
+        with self._lock:
+          for book in self._books.values():
+            book.ready = False
+        time.sleep(RECONNECT_DELAY)
+
+  def _resync(self, book):
+    """Drops a book that missed messages and asks for a new snapshot."""
+    logging.warning('Sequence gap in %s; resubscribing', book.product_id)
+    book.ready = False
+    self.resync_count += 1
+    self._subscribe('unsubscribe', [book.product_id])
+    self._subscribe('subscribe', [book.product_id])
+
+  def handle(self, message):
+    """Applies one feed message."""
+    type_ = message.get('type')
+    if type_ == 'error':
+      logging.error('Feed error: %s', message.get('message'))
+      return
+    book = self._books.get(message.get('product_id'))
+    if book is None:
+      return
+
+    with self._lock:
+      if type_ == 'snapshot':
+        book.load_snapshot(message['bids'], message['asks'],
+                           message.get('sequence'))
+      elif type_ == 'ticker':
+        book.last_price = float(message['price'])
+      elif type_ == 'l2update':
+        if not book.ready:
+          # Waiting for a snapshot, which includes this change.
+          return
+        sequence = message.get('sequence')
+        if sequence is not None and book.sequence is not None:
+          if sequence <= book.sequence:
+            return
+          if sequence > book.sequence + 1:
+            self._resync(book)
+            return
+        book.sequence = sequence
+        for side, price, size in message['changes']:
+          book.update(side, price, size)
+      else:
+        return
+
+    if self._on_update is not None:
+      self._on_update(book.product_id)
@@ -0,0 +1,228 @@
+"""Append-only log of websocket feed messages.
+
+Messages are kept as the raw json text received, with the time they arrived.
+They are buffered into blocks of up to BLOCK_MESSAGES messages or about
+BLOCK_SECONDS seconds, and each block is compressed and appended to the log
+behind a fixed size header:
+
+  magic 'GDXB', compressed length, message count, first time, last time
+
+Inside a block, each message is its arrival time and length followed by its
+bytes. For every block, the time of its first message and its offset are
+appended to an index file next to the log (<log>.idx), so reading from a given
+time is a binary search over the memory mapped index and only decompresses
+blocks from there on. A block left half written by a crash is ignored by
+readers and cut off when the log is opened for writing again, so blocks
+appended after a restart stay readable. Blocks written after the last index
+entry are found from their headers.
+"""
+
+import bisect
+import mmap
+import os
+import struct
+import time
+import zlib
+
+BLOCK_MAGIC = b'GDXB'
+_BLOCK_HEADER = struct.Struct('<4sIIdd')
+_MESSAGE_HEADER = struct.Struct('<dI')
+_INDEX_ENTRY = struct.Struct('<dQ')
+
+# Messages buffered before a block is written.
+BLOCK_MESSAGES = 1000
+
+# Seconds a block spans at most: it's written with the first message that
+# arrives this long after the block's first one.
+BLOCK_SECONDS = 5
+
+def index_path(path):
+  return path + '.idx'
+
+class LogWriter(object):
+  """Appends messages to a log. Not thread-safe."""
+
+  def __init__(self, path, block_messages=BLOCK_MESSAGES,
+               block_seconds=BLOCK_SECONDS):
+    """Initializer.
+
+    Args:
+      path: Log file. Appended to if it exists, after cutting off a block
+          left half written.
+      block_messages: Messages per block.
+      block_seconds: Seconds a block spans at most.
+    """
+    if os.path.exists(path):
+      _truncate_torn(path)
+    self._log = open(path, 'ab')
+    self._index = open(index_path(path), 'ab')
+    self._block_messages = block_messages
+    self._block_seconds = block_seconds
+    self._pending = []
+    self._times = []
+    self.message_count = 0
+
+  def write(self, message, received_at=None):
+    """Adds a message.
+
+    Args:
+      message: Raw json text of the message, as str or bytes.
+      received_at: Seconds since the epoch it arrived. Defaults to now.
+    """
+    if received_at is None:
+      received_at = time.time()
+    if not isinstance(message, bytes):
+      message = message.encode('utf-8')
+    self._pending.append(_MESSAGE_HEADER.pack(received_at, len(message)))
+    self._pending.append(message)
+    self._times.append(received_at)
+    self.message_count += 1
+    if (len(self._times) >= self._block_messages or
+        received_at - self._times[0] >= self._block_seconds):
+      self.flush()
+
+  def flush(self):
+    """Writes the buffered messages as one block."""
+    if not self._times:
+      return
+    data = zlib.compress(b''.join(self._pending))
+    offset = self._log.tell()
+    self._log.write(_BLOCK_HEADER.pack(BLOCK_MAGIC, len(data),
+                                       len(self._times), self._times[0],
+                                       self._times[-1]) + data)
+    self._log.flush()
+    # The index is only written once its block is in the log.
+    self._index.write(_INDEX_ENTRY.pack(self._times[0], offset))
+    self._index.flush()
+    self._pending, self._times = [], []
+
+  def close(self):
+    self.flush()
+    self._log.close()
+    self._index.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    self.close()
+
+class _IndexTimes(object):
+  """Block start times of a memory mapped index, as a sequence for bisect."""
+
+  def __init__(self, data, count):
+    self._data = data
+    self._count = count
+
+  def __len__(self):
+    return self._count
+
+  def __getitem__(self, i):
+    return _INDEX_ENTRY.unpack_from(self._data, i * _INDEX_ENTRY.size)[0]
+
+class LogReader(object):
+  """Reads a log through a memory map."""
+
+  def __init__(self, path):
+    self._file = open(path, 'rb')
+    size = os.fstat(self._file.fileno()).st_size
+    self._data = (mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                  if size else b'')
+    self._index = b''
+    try:
+      with open(index_path(path), 'rb') as f:
+        if os.fstat(f.fileno()).st_size >= _INDEX_ENTRY.size:
+          self._index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (IOError, OSError):
+      pass
+    count = len(self._index) // _INDEX_ENTRY.size
+    # Drop entries of blocks that didn't make it to the log.
+    while count and self._entry(count - 1)[1] >= len(self._data):
+      count -= 1
+    self._index_count = count
+
+  def _entry(self, i):
+    return _INDEX_ENTRY.unpack_from(self._index, i * _INDEX_ENTRY.size)
+
+  def close(self):
+    for data in (self._data, self._index):
+      if isinstance(data, mmap.mmap):
+        data.close()
+    self._file.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    self.close()
+
+  def _start_offset(self, start):
+    """Offset of the last block starting at or before start."""
+    if start is None or not self._index_count:
+      return 0
+    times = _IndexTimes(self._index, self._index_count)
+    i = bisect.bisect_right(times, start) - 1
+    return self._entry(max(i, 0))[1]
+
+  def _scan(self, offset):
+    """Yields (offset, end, count, first time, last time) of the complete
+    blocks from offset on."""
+    while offset + _BLOCK_HEADER.size <= len(self._data):
+      magic, length, count, first, last = _BLOCK_HEADER.unpack_from(
+          self._data, offset)
+      end = offset + _BLOCK_HEADER.size + length
+      if magic != BLOCK_MAGIC or end > len(self._data):
+        # A block cut short by a crash; nothing after it is readable.
+        return
+      yield offset, end, count, first, last
+      offset = end
+
+  def blocks(self, start=None):
+    """Yields (offset, count, first time, last time) of complete blocks,
+    from the last one starting at or before start."""
+    for offset, _, count, first, last in self._scan(self._start_offset(start)):
+      yield offset, count, first, last
+
+  def complete_size(self):
+    """Returns (bytes, index entries) of the log up to its last complete
+    block."""
+    end = self._entry(self._index_count - 1)[1] if self._index_count else 0
+    for _, end, _, _, _ in self._scan(end):
+      pass
+    count = self._index_count
+    while count and self._entry(count - 1)[1] >= end:
+      count -= 1
+    return end, count
+
+  def messages(self, start=None, end=None):
+    """Yields (arrival time, raw message bytes) with start <= time < end."""
+    for offset, _, first, last in self.blocks(start):
+      if end is not None and first >= end:
+        return
+      if start is not None and last < start:
+        continue
+      begin = offset + _BLOCK_HEADER.size
+      length = _BLOCK_HEADER.unpack_from(self._data, offset)[1]
+      data = zlib.decompress(self._data[begin:begin + length])
+      position = 0
+      while position < len(data):
+        received_at, size = _MESSAGE_HEADER.unpack_from(data, position)
+        position += _MESSAGE_HEADER.size
+        if ((start is None or received_at >= start) and
+            (end is None or received_at < end)):
+          yield received_at, data[position:position + size]
+        elif end is not None and received_at >= end:
+          return
+        position += size
+
+def _truncate_torn(path):
+  """Cuts a log and its index back to the last complete block."""
+  with LogReader(path) as reader:
+    size, count = reader.complete_size()
+  if os.path.getsize(path) > size:
+    with open(path, 'r+b') as f:
+      f.truncate(size)
+  index, index_size = index_path(path), count * _INDEX_ENTRY.size
+  if os.path.exists(index) and os.path.getsize(index) > index_size:
+    with open(index, 'r+b') as f:
+      f.truncate(index_size)
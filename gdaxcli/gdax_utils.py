@@ -3,49 +3,126 @@
 Gdax-python is the unofficial python library for GDAX.
   https://github.com/danpaquin/gdax-python
   https://pypi.python.org/pypi/gdax
+
+Third party libraries and modules only some commands need are imported when
+first used, so that startup only pays for what the command uses.
 """
 
 from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
-# OrderedDict retains its key order, so we get consistent column ordering.
-from collections import OrderedDict
-import functools
+import itertools
 import logging
+import os
 import string
 import sys
+import time
 import traceback
 
-# https://pypi.python.org/pypi/colorama
-import colorama
-colorama.init()
-
-# https://pypi.python.org/pypi/tabulate
-from tabulate import tabulate
-
+from gdaxcli import cache
 from gdaxcli import exceptions
+from gdaxcli import numeric
+from gdaxcli import order_index
+from gdaxcli import render
+from gdaxcli import rules
 from gdaxcli import utils
 
-try:
-  import gdax
-  # TODO: include other non-standard libraries in this as well.
-except ImportError:
-  traceback.print_exc()
-  print('Unable to import gdax. Make sure you follow the installation'
-        ' instructions at https://github.com/sonph/gdaxcli')
-  sys.exit(1)
+def _import_gdax():
+  """Imports gdax and the transport built on it."""
+  try:
+    import gdax
+    from gdaxcli import transport
+    # TODO: include other non-standard libraries in this as well.
+  except ImportError:
+    traceback.print_exc()
+    print('Unable to import gdax. Make sure you follow the installation'
+          ' instructions at https://github.com/sonph/gdaxcli')
+    sys.exit(1)
+  return gdax, transport
 
 DIGITS = set(string.digits)
 
-# 'CAD' is available in the sandbox.
-FIAT_CURRENCY = set(['USD', 'CAD', 'GBP', 'EUR'])
+# Intermediate currencies tried first when a currency has no direct pair
+# with the quote currency.
+CROSS_CURRENCIES = ['BTC', 'ETH', 'USD', 'EUR']
 
 # TODO: make this configurable.
 DEFAULT_ACCURACY = 4
 
-tabulate = functools.partial(tabulate,
-    tablefmt='simple', headers='keys', floatfmt='.%df' % DEFAULT_ACCURACY)
+API_URL = 'https://api.gdax.com'
+
+# Number of requests to have in flight at once when fanning out over products.
+DEFAULT_WORKERS = 6
+
+# Public endpoints allow 3 requests per second, up to 6 in bursts.
+#   https://docs.gdax.com/#rate-limits
+PUBLIC_RATE_LIMIT = 3
+PUBLIC_RATE_BURST = 6
+
+# Private endpoints allow 5 requests per second, up to 10 in bursts.
+PRIVATE_RATE_LIMIT = 5
+PRIVATE_RATE_BURST = 10
+
+# Seconds to reuse the order rules indexed from the product catalog, for long
+# running clients such as the shell. Refreshing the catalog indexes it again.
+RULES_TTL = 60 * 60
+
+# Seconds to reuse the list of open orders for resolving id prefixes. Orders
+# placed and cancelled through the same client are reflected right away.
+OPEN_ORDERS_TTL = 5
+
+# Maximum number of items the API returns per page.
+MAX_PAGE_SIZE = 100
+
+# Seconds to reuse 24h stats in ticker --watch. They move slowly, and fetching
+# them with every ticker would double the requests.
+WATCH_STATS_TTL = 60
+
+# Colors of ticker rows, by whether the price went up.
+TICKER_COLORS = {
+    True: (None,) * 10 + (render.GREEN, render.GREEN),
+    False: (None,) * 10 + (render.RED, render.RED),
+}
+
+# Colors of a watch row: bids green, asks red.
+WATCH_COLORS = (None, None, render.GREEN, render.RED, None, None)
+
+# Colors of a balance row with funds on hold.
+BALANCE_HOLD_COLORS = (None, None, None, render.RED)
+
+# Column names and widths, used as is for streaming output.
+HISTORY_COLUMNS = [
+    ('type', 20), ('amount', 14), ('balance', 14), ('product_id', 10),
+    ('created_at', 27)]
+MERGED_HISTORY_COLUMNS = [('account', 7)] + HISTORY_COLUMNS
+PROFILE_COLUMN = ('profile', 10)
+FILL_COLUMNS = [
+    ('product_id', 10), ('side', 4), ('price', 12), ('size', 14),
+    ('size_usd', 12), ('fee', 12), ('settled', 7), ('created_at', 27)]
+# Columns of fills summed into the subtotal of each profile: size_usd, fee.
+FILL_TOTAL_COLUMNS = (4, 5)
+ORDER_COLUMNS = [
+    ('id', 6), ('product_id', 10), ('side', 4), ('type', 6), ('price', 12),
+    ('size', 14), ('size_usd', 12), ('filled_size', 14), ('fill_fees', 10),
+    ('status', 8), ('time_in_force', 13), ('settled', 7), ('stp', 3),
+    ('created_at', 27)]
+# Columns of orders summed into the subtotal of each profile: size_usd.
+ORDER_TOTAL_COLUMNS = (6,)
+
+def tabulate(rows, **kwargs):
+  """Formats rows with tabulate, using our defaults.
+
+  https://pypi.python.org/pypi/tabulate
+  """
+  from tabulate import tabulate as tabulate_
+  options = {
+      'tablefmt': 'simple',
+      'headers': 'keys',
+      'floatfmt': '.%df' % DEFAULT_ACCURACY,
+  }
+  options.update(kwargs)
+  return tabulate_(rows, **options)
 
 negative = lambda x: float(x) < 0
 nonnegative = lambda x: float(x) >= 0
@@ -55,12 +132,11 @@ nonpositive = lambda x: float(x) <= 0
 def format_float(value, accuracy=DEFAULT_ACCURACY):
   """Formatting the value as a float with set number of digits after the dot.
 
-  This is only needed if we want to colorize it or use a different number of
-  digits other than the default, before adding it into the table. Otherwise,
-  tabulate automatically formats the value for us.
+  This is only needed if we want to use a different number of digits other
+  than the default, before adding it into the table. Otherwise, the table
+  formats floats and Decimals for us. Strings are formatted exactly.
   """
-  placeholder = '%.' + str(accuracy) + 'f'
-  return placeholder % float(value)
+  return numeric.format_fixed(value, accuracy)
 
 def colorize(value, condition, accuracy=None):
   """Return green string if condition is true; red otherwise.
@@ -78,191 +154,496 @@ def colorize(value, condition, accuracy=None):
   if not isinstance(condition, bool):
     condition = condition(value)
 
+  colorama = render.get_colorama()
   color = colorama.Fore.GREEN if condition else colorama.Fore.RED
   return color + value + colorama.Style.RESET_ALL
 
 green = lambda value: colorize(value, True)
 red = lambda value: colorize(value, False)
 
+def _color(condition):
+  """Table cell color: green if condition is true; red otherwise."""
+  return render.GREEN if condition else render.RED
+
 def is_str_zero(s):
   """Returns True is string s is strictly zero.
 
   Converting the value to float and comparing with 0 within a set threshold is
   another approach, but since gdax returns a string, why not just check it?
   """
-  for char in s:
-    if char in DIGITS:
-      if char != '0':
-        return False
-  return True
+  return numeric.is_zero(s)
+
+try:
+  _input = raw_input
+except NameError:
+  _input = input
+
+def _conversion_path(currency, quote, product_ids):
+  """Finds products to convert currency into quote.
+
+  Returns:
+    List of (product_id, inverted) legs, where inverted means the price is
+    divided by rather than multiplied, or None if there is no path.
+  """
+  def leg(base, target):
+    if '%s-%s' % (base, target) in product_ids:
+      return ('%s-%s' % (base, target), False)
+    if '%s-%s' % (target, base) in product_ids:
+      return ('%s-%s' % (target, base), True)
+    return None
+
+  direct = leg(currency, quote)
+  if direct is not None:
+    return [direct]
+  currencies = set()
+  for product_id in product_ids:
+    currencies.update(product_id.split('-'))
+  # Prefer the most liquid intermediate currencies.
+  candidates = [c for c in CROSS_CURRENCIES if c in currencies]
+  candidates += sorted(currencies - set(CROSS_CURRENCIES))
+  for middle in candidates:
+    if middle in (currency, quote):
+      continue
+    first, second = leg(currency, middle), leg(middle, quote)
+    if first is not None and second is not None:
+      return [first, second]
+  return None
 
 def confirm(message='Proceed?'):
   ok = set(['y', 'Y'])
-  response = raw_input('%s [y/N]: ' % message)
+  response = _input('%s [y/N]: ' % message)
   if response == '':
     print('Enter y or Y to proceed.')
   return response in ok
 
+def _is_absolute_limit(order_type, price):
+  """True for a limit order at an absolute price, which doesn't need the
+  current price."""
+  return order_type == 'limit' and bool(price) and price[0] in DIGITS
+
+def _errors_as_results(func):
+  """Wraps func to return an exception it raises as an error result, like the
+  exchange's {'message': ...}, instead of raising it.
+
+  Lets a batch of requests sent with utils.parallel_map report every
+  request's result when some of them fail.
+  """
+  def call(item):
+    try:
+      return func(item)
+    except Exception as e:
+      logging.debug('Request for %s failed', item, exc_info=True)
+      return {'message': '%s: %s' % (type(e).__name__, e)}
+  return call
+
 class Client(object):
   """Wrapper of the gdax-python library."""
 
-  def __init__(self):
-    """Initializer."""
-    config = utils.read_config()
+  def __init__(self, config=None, api_url=API_URL, workers=DEFAULT_WORKERS,
+               rate_limit=PUBLIC_RATE_LIMIT, rate_burst=PUBLIC_RATE_BURST,
+               product_cache=None, ledger=None, feed=None,
+               ws_url=None, max_retries=None, recorder=None,
+               candle_store=None):
+    """Initializer.
+
+    Args:
+      config: Dict with passphrase, key and secret. Read from the config file
+          if not given.
+      api_url: Base url of the exchange API.
+      workers: Maximum number of concurrent requests for commands that fan out
+          over products, e.g. ticker.
+      rate_limit: Requests per second allowed for public endpoints. None to
+          disable throttling of public and private endpoints.
+      rate_burst: Number of requests allowed in a burst.
+      product_cache: A cache.ProductCache. Defaults to the one in the home
+          directory.
+      ledger: A ledger.Ledger for local history and fills. Defaults to the
+          one in the home directory, opened when first needed.
+      feed: A running feed.Feed. Prices of the products it subscribes to are
+          read from it instead of fetching the ticker. See also
+          max_feed_products.
+      ws_url: Websocket feed url, for the watch command. Defaults to
+          feed.WS_URL.
+      max_retries: Times a GET failing with a rate limit, server error or
+          dropped connection is retried. Defaults to
+          transport.DEFAULT_MAX_RETRIES.
+      recorder: timing.Recorder for --profile. Requests, reading the config,
+          importing gdax and rendering tables are recorded to it.
+      candle_store: A candles.CandleStore. Defaults to the one in the home
+          directory.
+    """
+    self._recorder = recorder
+    if config is None:
+      with self._phase('config'):
+        config = utils.read_config()
+    # Reuse connections across requests instead of a new handshake each time.
+    with self._phase('import'):
+      gdax, transport = _import_gdax()
+    public_limiter = private_limiter = None
+    if rate_limit:
+      # Shared by all threads, so concurrent commands stay under the limits.
+      public_limiter = utils.RateLimiter(rate_limit, rate_burst)
+      private_limiter = utils.RateLimiter(
+          PRIVATE_RATE_LIMIT, PRIVATE_RATE_BURST)
+    transport_kwargs = {}
+    if max_retries is not None:
+      transport_kwargs['max_retries'] = max_retries
+    self._transport = transport.Transport(
+        pool_size=max(workers, 1), public_limiter=public_limiter,
+        private_limiter=private_limiter, recorder=recorder, **transport_kwargs)
     self._client = gdax.AuthenticatedClient(
         key=config['key'],
         b64secret=config['secret'],
-        passphrase=config['passphrase'])
+        passphrase=config['passphrase'],
+        api_url=api_url)
+    transport.install(self._transport, self._client.auth)
+    self._workers = workers
+    self._rate_limit = rate_limit
+    self._rate_burst = rate_burst
+    self._max_retries = max_retries
+    # Profile name -> Client of another account, see profile_clients.
+    self._profile_clients = {}
+    self._product_cache = product_cache or cache.ProductCache()
+    self._ledger = ledger
+    self._candle_store = candle_store
+    self._feed = feed
+    # Whether _feed was started by follow, and is stopped by stop_feed.
+    self._own_feed = False
+    self._ws_url = ws_url
+    self._open_orders = None
+    self._rules = None
+    self._fast_orders = None
+    # Seconds to reuse a fetched ticker price instead of fetching it again.
+    # 0 always fetches; the shell sets it and keeps prices fresh.
+    self.price_ttl = 0
+    # Most products to follow on the websocket feed once they're priced, so
+    # their later prices are read from it; see follow. 0 never starts a
+    # feed; the shell and the daemon set it.
+    self.max_feed_products = 0
+    self._prices = {}
+    # Product id -> (24h stats, time fetched), for ticker --watch.
+    self._stats = {}
+    # Print tables with tabulate, as older versions did, instead of
+    # render.Table.
+    self.use_tabulate = False
+    # One of output.FORMATS to write records instead of tables, or None.
+    self.output_format = None
     # TODO: configure sandbox keys.
     # TODO: allow public client.
 
-  def products(self):
-    """Lists products available for trading."""
-    rows = []
-    for product in self._client.get_products():
-      rows.append(OrderedDict([
-        ('id', product['id']),
-        ('base_currency', product['base_currency']),
-        ('quote_currency', product['quote_currency']),
-        ('base_min_size', product['base_min_size']),
-        ('base_max_size', product['base_max_size']),
-        ('quote_increment', product['quote_increment']),
-    ]))
-    print(tabulate(rows))
-
-  def ticker(self, product_ids=None):
-    # TODO: Configure default products or currencies e.g. USD only, ETH only.
-    rows = []
+  def products(self, refresh=False):
+    """Lists products available for trading.
+
+    Args:
+      refresh: If True, ignore the cached catalog and fetch it again.
+    """
+    table = self._new_table(['id', 'base_currency', 'quote_currency',
+                             'base_min_size', 'base_max_size',
+                             'quote_increment'])
+    for product in self._get_products(refresh=refresh):
+      table.add_row([
+        product['id'],
+        product['base_currency'],
+        product['quote_currency'],
+        product['base_min_size'],
+        product['base_max_size'],
+        product['quote_increment'],
+      ])
+    self._print_table(table)
+
+  def ticker(self, product_ids=None, watch=None):
+    """Get current market ticker.
+
+    Args:
+      product_ids: Products to show. Defaults to all.
+      watch: If set, redraw every this many seconds until interrupted.
+    """
     if product_ids is None:
       product_ids = self._get_product_ids()
+    if watch:
+      self._watch(lambda: (self._ticker_table(product_ids, WATCH_STATS_TTL),
+                           ''), watch)
+      return
+    self._print_table(self._ticker_table(product_ids))
+
+  def _ticker_table(self, product_ids, stats_ttl=0):
+    """Returns a table of tickers and 24h stats of product_ids.
+
+    Args:
+      product_ids: Products to show.
+      stats_ttl: Seconds to reuse the 24h stats of a product. 0 always
+          fetches them.
+    """
+    # TODO: Configure default products or currencies e.g. USD only, ETH only.
+    table = self._new_table([
+        'product_id', 'price', 'size', 'bid', 'ask', 'gap', '24h_volume',
+        '24h_open', '24h_high', '24h_low', '24h_gain', 'perc'])
+
+    # Fetch tickers and stats for all products at once; results come back in
+    # the same order as requested.
+    now = time.time()
+    stale = set(product_id for product_id in product_ids
+                if now - self._stats.get(product_id, (None, 0))[1] >= stats_ttl)
+    calls = []
     for product_id in product_ids:
-      tick = self._client.get_product_ticker(product_id)
+      calls.append((self._client.get_product_ticker, product_id))
+      if product_id in stale:
+        calls.append((self._client.get_product_24hr_stats, product_id))
+    results = iter(utils.parallel_map(lambda call: call[0](call[1]), calls,
+                                      self._workers))
+
+    for product_id in product_ids:
+      tick = next(results)
+      if product_id in stale:
+        self._stats[product_id] = (next(results), now)
+      stats = self._stats[product_id][0]
       gap = float(tick['ask']) - float(tick['bid'])
-      stats = self._client.get_product_24hr_stats(product_id)
       gain = float(tick['price']) - float(stats['open'])
       gain_perc = gain / float(stats['open']) * 100
-      rows.append(OrderedDict([
-        ('product_id', product_id),
-        ('price', tick['price']),
-        ('size', tick['size']),
-        ('bid', tick['bid']),
-        ('ask', tick['ask']),
-        ('gap', gap),
-        ('24h_volume', tick['volume']),
-        ('24h_open', stats['open']),
-        ('24h_high', stats['high']),
-        ('24h_low', stats['low']),
-        ('24h_gain', colorize(gain, nonnegative)),
-        ('perc', colorize(format_float(gain_perc, 2),
-                                   nonnegative(gain_perc)))
-      ]))
-    print(tabulate(rows))
-
-  def balance(self):
-    rows = []
-
-    prices = {}
-    for product_id in self._get_product_ids():
-      # TODO: support other currencies
-      if product_id.endswith('-USD'):
-        prices[product_id] = self._client.get_product_ticker(
-            product_id)['price']
+      table.add_row([
+        product_id,
+        tick['price'],
+        tick['size'],
+        tick['bid'],
+        tick['ask'],
+        gap,
+        tick['volume'],
+        stats['open'],
+        stats['high'],
+        stats['low'],
+        gain,
+        format_float(gain_perc, 2),
+      ], TICKER_COLORS[gain >= 0])
+    return table
+
+  def balance(self, quote='USD', watch=None, profiles=None):
+    """Get account balances and their value in the quote currency.
+
+    Only products needed to price the non-zero balances are fetched. A
+    currency without a direct pair is priced through an intermediate one,
+    e.g. LTC-BTC and BTC-USD.
 
-    # Total all accounts converted to USD
-    balance_total = 0
+    Args:
+      quote: Currency to value the accounts in.
+      watch: If set, redraw every this many seconds until interrupted.
+      profiles: List of (name, Client) from profile_clients. Their accounts
+          are fetched concurrently and listed by profile with subtotals,
+          instead of this client's.
+    """
+    if watch:
+      self._watch(lambda: self._balance_table(quote, profiles), watch)
+      return
+    table, total = self._balance_table(quote, profiles)
+    self._print_table(table)
+    if not self.output_format:
+      print(total, end='')
+
+  def _balance_table(self, quote, profiles=None):
+    """Returns (table of accounts, total line)."""
+    quote = quote.upper()
+    if profiles:
+      names = [name for name, _ in profiles]
+      account_lists = utils.parallel_map(
+          lambda profile: profile[1]._client.get_accounts(), profiles,
+          len(profiles))
+      accounts = [dict(acc, profile=name)
+                  for name, profile_accounts in zip(names, account_lists)
+                  for acc in sorted(profile_accounts,
+                                    key=lambda acc: acc['currency'])]
+    else:
+      accounts = self._client.get_accounts()
+      accounts.sort(key=lambda acc: acc['currency'])
 
-    # Map of account currency -> account total in USD
-    acc_totals = {}
+    # Prices are fetched once for the currencies held in any account.
+    held = set(acc['currency'] for acc in accounts
+               if not is_str_zero(acc['balance']) and acc['currency'] != quote)
+    rates = self._conversion_rates(held, quote)
 
-    accounts = self._client.get_accounts()
-    accounts.sort(key=lambda acc: acc['currency'])
+    # Value of each account in the quote currency; None if it can't be priced.
+    values = []
     for acc in accounts:
-      hodl = acc['hold']
-
-      if acc['currency'] not in FIAT_CURRENCY:
-        acc_total_usd = float(prices[acc['currency'] + '-USD']) * float(acc['balance'])
+      if acc['currency'] == quote:
+        values.append(float(acc['balance']))
+      elif acc['currency'] in rates:
+        values.append(float(acc['balance']) * rates[acc['currency']])
+      elif is_str_zero(acc['balance']):
+        values.append(0.0)
       else:
-        acc_total_usd = float(acc['balance'])
-
-      # We need to store float values here, since the OrderedDict's have the
-      # colored strings.
-      acc_totals[acc['currency']] = acc_total_usd
-
-      # Calculate sum total.
-      balance_total += acc_total_usd
-
-      rows.append(OrderedDict([
-        ('currency', acc['currency']),
-        ('balance', acc['balance']),
-        ('available', acc['available']),
-        ('hold', red(hodl) if not is_str_zero(hodl) else hodl),
-        ('total_usd', acc_total_usd)
-      ]))
-
-    # Calculate percent holding in each of teh currencies as `perc` column.
-    for acc in rows:
-      if acc['currency'] != 'TOTAL':
+        logging.warning('No product to price %s in %s', acc['currency'], quote)
+        values.append(None)
+    balance_total = sum(value for value in values if value is not None)
+
+    columns = ['currency', 'balance', 'available', 'hold',
+               'total_%s' % quote.lower()]
+    if profiles:
+      columns.insert(0, 'profile')
+    if balance_total > 0:
+      columns.append('perc')
+    table = self._new_table(columns)
+    subtotal = 0.0
+    for index, (acc, value) in enumerate(zip(accounts, values)):
+      hodl = acc['hold']
+      row = [
+        acc['currency'],
+        acc['balance'],
+        acc['available'],
+        hodl,
+        value if value is not None else '',
+      ]
+      colors = None if is_str_zero(hodl) else BALANCE_HOLD_COLORS
+      if profiles:
+        row.insert(0, acc['profile'])
+        colors = colors and (None,) + colors
+      if balance_total > 0:
+        row.append(value / balance_total * 100 if value is not None else '')
+      table.add_row(row, colors)
+      if not profiles or self.output_format:
+        continue
+      subtotal += value or 0.0
+      if (index + 1 == len(accounts) or
+          accounts[index + 1]['profile'] != acc['profile']):
+        row = [acc['profile'], 'subtotal', '', '', '', subtotal]
         if balance_total > 0:
-          perc = float(acc_totals[acc['currency']]) / balance_total * 100
-          acc['perc'] = perc
-      else:
-        acc['perc'] = 100.00
+          row.append(subtotal / balance_total * 100)
+        table.add_row(row)
+        subtotal = 0.0
+    return table, '\nAccount total balance in %s: %s\n' % (
+        quote, format_float(balance_total))
 
-    print(tabulate(rows))
-    print('\nAccount total balance in USD: %s' % format_float(balance_total))
+  def history(self, accounts, limit=None, since=None, stream=False,
+              local=False, until=None, product=None, type_=None, merge=False):
+    """Get trade history for specified accounts: USD, BTC, ETH, LTC, etc.
 
-  def history(self, accounts):
-    """Get trade history for specified accounts: USD, BTC, ETH, LTC, etc."""
+    Accounts are printed in the order given. The first is read page by page
+    as it's printed; unless streaming, the others are fetched concurrently
+    meanwhile.
+
+    Args:
+      accounts: List of account currencies.
+      limit: Show at most this many entries per account, or in total if
+          merged.
+      since: Only show entries created at or after this time, e.g. 2017-08-01
+          or 2017-08-01T12:00:00. Times are UTC.
+      stream: If True, print rows as each page arrives instead of buffering
+          all of them to line up columns.
+      local: If True, read from the local ledger instead of the API. Run sync
+          first to bring it up to date.
+      until: Only show entries created before this time. Local only.
+      product: Only show entries for this product. Local only.
+      type_: Only show entries of this type. Local only.
+      merge: If True, show one table of all accounts, newest first.
+    """
     # TODO: allow user to specify what currency to use
-    acc_ids = []
+    if local:
+      currencies = accounts
+      ledger = self._get_ledger()
+      # Reading from the local database is fast; no need for threads.
+      histories = (ledger.history(
+          currency, start=since, end=until,
+          product_id=product.upper() if product else None, type_=type_,
+          limit=limit) for currency in currencies)
+    else:
+      acc_ids = dict((acc['currency'], acc['id'])
+                     for acc in self._client.get_accounts())
+      currencies = [currency for currency in accounts if currency in acc_ids]
+      fetch = lambda currency: self._iter_paginated(
+          '/accounts/%s/ledger' % acc_ids[currency], limit=limit, since=since)
+      if stream or len(currencies) <= 1:
+        histories = (fetch(currency) for currency in currencies)
+      else:
+        # Each account is a chain of page requests; run the chains of the
+        # others side by side with the first instead of one after another.
+        histories = itertools.chain(
+            [fetch(currencies[0])],
+            utils.parallel_prefetch(lambda currency: list(fetch(currency)),
+                                    currencies[1:], self._workers))
+
+    if merge:
+      self._print_merged_history(currencies, histories, limit, stream)
+      return
 
-    for acc in self._client.get_accounts():
-      currency = acc['currency']
-      if currency in accounts:
-        acc_ids.append((acc['id'], currency))
+    if self.output_format:
+      # One stream of records for all accounts, each tagged with its account.
+      self._write_records(
+          dict(item, account=currency)
+          for currency, items in zip(currencies, histories) for item in items)
+      return
 
-    for index, value in enumerate(acc_ids):
-      acc_id, currency = value
-      rows = []
+    for index, (currency, items) in enumerate(zip(currencies, histories)):
       if index != 0:
         print()
       print('Account: %s' % currency)
+      self._print_rows(items, self._parse_history_item, HISTORY_COLUMNS,
+                       stream, numalign='decimal')
 
-      for page in self._client.get_account_history(acc_id):
-        for item in page:
-          is_green = True
-          product, type_, amount = '', item['type'], float(item['amount'])
-          if type_ == 'transfer':
-            transfer_type = item['details']['transfer_type']
-            is_green = (transfer_type == 'deposit')
-            type_ = 'transfer (%s)' % transfer_type
-          elif type_ == 'match':
-            product = item['details']['product_id']
-            is_green = nonnegative(amount)
-          elif type_ == 'fee':
-            is_green = False
-          rows.append(OrderedDict([
-            ('type', colorize(type_, is_green)),
-            ('amount', colorize(amount, is_green)),
-            ('balance', format_float(item['balance'])),
-            ('product_id', product),
-            ('created_at', item['created_at']),
-          ]))
-      print(tabulate(rows, numalign="decimal"))
-
-  def orders(self):
-    rows = []
-    pages = self._client.get_orders()
-    for page in pages:
-      for order in page:
-        rows.append(self._parse_order(order))
-    if rows:
-      print(tabulate(rows))
-    else:
-      print('No pending orders')
+  def _print_merged_history(self, currencies, histories, limit, stream):
+    """Prints histories of several accounts as one table, newest first.
+
+    Each account's history is already newest first, so they are merged with a
+    heap of one entry per account instead of sorting all of them.
+    """
+    def tag(currency, items):
+      # Not zip, which reads all of items on Python 2.
+      return ((currency, item) for item in items)
+    tagged = [tag(currency, items)
+              for currency, items in zip(currencies, histories)]
+    merged = utils.merge_sorted(
+        tagged, key=lambda pair: pair[1]['created_at'], reverse=True)
+    if limit:
+      merged = itertools.islice(merged, limit)
+    def parse(pair):
+      values, colors = self._parse_history_item(pair[1])
+      return [pair[0]] + values, (None,) + tuple(colors)
+    self._print_rows(merged, parse, MERGED_HISTORY_COLUMNS, stream,
+                     empty_message='No history',
+                     record=lambda pair: dict(pair[1], account=pair[0]),
+                     numalign='decimal')
+
+  def orders(self, limit=None, since=None, stream=False, watch=None,
+             profiles=None):
+    """List open orders.
+
+    Args:
+      limit, since, stream: See history. With profiles, limit is per
+          profile.
+      watch: If set, redraw every this many seconds until interrupted.
+      profiles: List of (name, Client) from profile_clients, to list the
+          orders of instead of this client's. See _print_profile_rows.
+    """
+    if watch:
+      self._watch(lambda: (self._orders_table(limit, since, profiles), ''),
+                  watch)
+      return
+    if profiles:
+      self._print_profile_rows(
+          profiles, lambda client: client._iter_paginated(
+              '/orders', limit=limit, since=since),
+          self._parse_order, ORDER_COLUMNS, ORDER_TOTAL_COLUMNS, stream,
+          empty_message='No pending orders')
+      return
+    orders = self._iter_paginated('/orders', limit=limit, since=since)
+    self._print_rows(orders, self._parse_order, ORDER_COLUMNS, stream,
+                     empty_message='No pending orders')
+
+  def _orders_table(self, limit=None, since=None, profiles=None):
+    """Returns a table of open orders."""
+    if profiles:
+      table = self._new_table(
+          [name for name, _ in [PROFILE_COLUMN] + ORDER_COLUMNS])
+      rows = self._profile_rows(
+          profiles, lambda client: client._iter_paginated(
+              '/orders', limit=limit, since=since),
+          self._parse_order, ORDER_TOTAL_COLUMNS)
+      for values, colors in rows:
+        table.add_row(values, colors)
+      return table
+    table = self._new_table([name for name, _ in ORDER_COLUMNS])
+    for order in self._iter_paginated('/orders', limit=limit, since=since):
+      table.add_row(*self._parse_order(order))
+    return table
 
   def order(self, order_type, side, product, size, price,
-      skip_confirmation=False):
+      skip_confirmation=False, fast=False):
     """Place an order.
 
     Args:
@@ -276,29 +657,637 @@ class Client(object):
           the difference amount with + or - . Order is checked to make sure
           you're not buying higher or selling lower than current price.
       skip_confirmation: If True, do not ask for confirmation.
+      fast: If True, submit through fastorder on a warm connection, and don't
+          fetch the current price for a limit order at an absolute price;
+          that price isn't checked against the current one.
+    """
+    product = product.upper()
+    if fast:
+      self._get_fast_orders().warm()
+    size = self._check_valid_order(order_type, side, product, size, price)
+
+    if fast and _is_absolute_limit(order_type, price):
+      current_price = None
+    else:
+      current_price = self._current_prices([product])[product]
+    kwargs, price, diff, total = self._prepare_order(
+        order_type, side, product, size, price, current_price)
+
+    if diff is not None:
+      diff = ' (' + colorize('%.2f' % diff, negative) + ')'
+    else:
+      diff = ''
+    print('Placing %s order: %s %s %s @ %s%s; total %.2f' % (
+        order_type.upper(), colorize(side, lambda side: side == 'buy'), size,
+        product, price, diff, total))
+
+    if skip_confirmation or confirm():
+      print(self._submit_order(kwargs, fast))
+      if fast:
+        print('Acked in %.1fms' % (
+            self._fast_orders.latency.samples[-1] * 1000))
+    else:
+      print('Did nothing')
+
+  def order_batch(self, specs, skip_confirmation=False, fast=False):
+    """Place many orders at once.
+
+    All orders are validated and priced before anything is placed, against
+    one product catalog and one ticker per product. After a single
+    confirmation, orders are submitted concurrently.
+
+    Args:
+      specs: List of dicts with order_type, side, product, size and price, as
+          returned by batch.read_order_specs.
+      skip_confirmation: If True, do not ask for confirmation.
+      fast: If True, submit as order does with fast, and print a histogram of
+          the orders' submit to ack latencies.
+    """
+    start = time.time()
+    if fast:
+      self._get_fast_orders().warm()
+    for index, spec in enumerate(specs):
+      spec['product'] = spec['product'].upper()
+      try:
+        spec['size'] = self._check_valid_order(
+            spec['order_type'], spec['side'], spec['product'], spec['size'],
+            spec['price'])
+      except exceptions.InvalidOrderError as e:
+        raise exceptions.InvalidOrderError('Order #%d: %s' % (index + 1, e),
+                                           reason=e.reason)
+
+    prices = self._current_prices(set(
+        spec['product'] for spec in specs
+        if not (fast and _is_absolute_limit(spec['order_type'],
+                                            spec['price']))))
+
+    table = self._new_table(['#', 'type', 'side', 'product', 'size', 'price',
+                             'diff', 'total'])
+    orders, batch_total = [], 0
+    for index, spec in enumerate(specs):
+      try:
+        kwargs, price, diff, total = self._prepare_order(
+            spec['order_type'], spec['side'], spec['product'], spec['size'],
+            spec['price'], prices.get(spec['product']))
+      except exceptions.InvalidOrderError as e:
+        raise exceptions.InvalidOrderError('Order #%d: %s' % (index + 1, e),
+                                           reason=e.reason)
+      orders.append(kwargs)
+      batch_total += total
+      table.add_row([
+        index + 1,
+        spec['order_type'],
+        spec['side'],
+        spec['product'],
+        spec['size'],
+        price,
+        '%.2f' % diff if diff is not None else '',
+        format_float(total, 2),
+      ], (None, None, _color(spec['side'] == 'buy'), None, None, None,
+          _color(diff is not None and negative(diff)), None))
+    self._print_table(table)
+    print('\nPlacing %d orders; total %.2f' % (len(orders), batch_total))
+
+    if not (skip_confirmation or confirm()):
+      print('Did nothing')
+      return
+
+    submit_start = time.time()
+    # A failed order doesn't stop the others, and the results of those placed
+    # are always printed.
+    results = utils.parallel_map(
+        _errors_as_results(lambda kwargs: self._submit_order(kwargs, fast)),
+        orders, self._workers)
+    table = self._new_table(['#', 'product', 'result', 'id', 'message'])
+    for index, result in enumerate(results):
+      ok = isinstance(result, dict) and 'id' in result
+      table.add_row([
+        index + 1,
+        orders[index]['product_id'],
+        'placed' if ok else 'failed',
+        result['id'] if ok else '',
+        '' if ok else result.get('message', result),
+      ], (None, None, _color(ok), None, None))
+    self._print_table(table)
+    now = time.time()
+    print('\nSubmitted %d orders in %.2fs; %.2fs total' % (
+        len(orders), now - submit_start, now - start))
+    if fast:
+      print('\nSubmit to ack latency:')
+      self._fast_orders.latency.print_summary(sys.stdout)
+
+  def order_latency(self):
+    """Print a histogram of submit to ack latencies of fast orders placed by
+    this client, e.g. in the shell."""
+    if self._fast_orders is None:
+      print('No fast orders placed')
+      return
+    self._fast_orders.latency.print_summary(sys.stdout)
+
+  def order_cancel(self, order_id_prefixes, skip_confirmation=False):
+    """Cancel orders by id prefix.
+
+    Open orders are listed once for all prefixes, and the cancels are sent
+    concurrently after one confirmation.
+
+    Args:
+      order_id_prefixes: List of order id prefixes, or a single prefix. Each
+          must match exactly one open order.
+      skip_confirmation: If True, do not ask for confirmation.
+    """
+    if isinstance(order_id_prefixes, str):
+      order_id_prefixes = [order_id_prefixes]
+    index = self._get_open_orders()
+
+    orders = []
+    for prefix in order_id_prefixes:
+      possible_matches = index.match(prefix)
+      if not possible_matches:
+        print('Order prefix %s does not match any' % prefix)
+        return
+      if len(possible_matches) > 1:
+        print('Order prefix %s too short; cannot uniquely identify an order'
+              % prefix)
+        return
+      if possible_matches[0] not in orders:
+        orders.append(possible_matches[0])
+
+    table = self._new_table([name for name, _ in ORDER_COLUMNS])
+    for order in orders:
+      table.add_row(*self._parse_order(order))
+    self._print_table(table)
+    message = 'Cancel order?' if len(orders) == 1 else (
+        'Cancel %d orders?' % len(orders))
+    if not (skip_confirmation or confirm(message)):
+      print('Did nothing')
+      return
+
+    order_ids = [order['id'] for order in orders]
+    # A failed cancel is reported with the others instead of hiding which of
+    # them went through.
+    results = utils.parallel_map(_errors_as_results(self._client.cancel_order),
+                                 order_ids, self._workers)
+    for order_id, result in zip(order_ids, results):
+      # TODO: factor out this error checking logic
+      if isinstance(result, dict) and 'message' in result:
+        print('%s: %s' % (order_id, result['message']))
+      else:
+        index.remove(order_id)
+        print(result)
+
+  def fills(self, product=None, limit=None, since=None, stream=False,
+            local=False, until=None, profiles=None):
+    """List recent fills.
+
+    Args:
+      product: Only list fills for this product.
+      limit, since, stream, local, until: See history. With profiles, limit
+          is per profile.
+      profiles: List of (name, Client) from profile_clients, to list the
+          fills of instead of this client's. See _print_profile_rows.
+    """
+    product = product.upper() if product else None
+    if profiles:
+      if local:
+        raise exceptions.Error('The local database has one account; '
+                               'profiles are only read from the API')
+      params = {'product_id': product} if product else None
+      self._print_profile_rows(
+          profiles, lambda client: client._iter_paginated(
+              '/fills', params, limit=limit, since=since),
+          self._parse_fill, FILL_COLUMNS, FILL_TOTAL_COLUMNS, stream,
+          empty_message='No fills')
+      return
+    if local:
+      fills = self._get_ledger().fills(product_id=product, start=since,
+                                       end=until, limit=limit)
+    else:
+      params = {'product_id': product} if product else None
+      fills = self._iter_paginated('/fills', params, limit=limit, since=since)
+    self._print_rows(fills, self._parse_fill, FILL_COLUMNS, stream,
+                     empty_message='No fills')
+
+  def stats(self, product=None, since=None, local=False, until=None,
+            daily=False):
+    """Summarize fills per product: VWAP, position, P&L and fees.
+
+    Args:
+      product: Only summarize fills for this product.
+      since, local, until: See history.
+      daily: Also list volume per product and day.
+    """
+    from gdaxcli import stats as stats_lib
+    product = product.upper() if product else None
+    if local:
+      fills = self._get_ledger().fills(product_id=product, start=since,
+                                       end=until)
+    else:
+      params = {'product_id': product} if product else None
+      fills = self._iter_paginated('/fills', params, since=since)
+    by_product = stats_lib.load(fills)
+    if not by_product:
+      print('No fills')
+      return
+
+    product_ids = sorted(by_product)
+    # Only value open positions.
+    prices = self._current_prices([product_id for product_id in product_ids
+                                   if by_product[product_id].position() > 0])
+    table = self._new_table(list(stats_lib.Summary._fields))
+    for product_id in product_ids:
+      summary = stats_lib.summarize(by_product[product_id],
+                                    prices.get(product_id))
+      values = ['' if value is None else value for value in summary]
+      table.add_row(values, (None,) * 7 + (
+          _color(summary.realized_pnl >= 0),
+          None if summary.unrealized_pnl is None
+          else _color(summary.unrealized_pnl >= 0),
+          None))
+    self._print_table(table)
+
+    if daily:
+      table = self._new_table(list(stats_lib.DailyVolume._fields))
+      for product_id in product_ids:
+        for row in stats_lib.daily_volume(by_product[product_id]):
+          table.add_row(row)
+      if not self.output_format:
+        print()
+      self._print_table(table)
+
+  def candles(self, product, granularity=3600, start=None, end=None,
+              summary=False):
+    """Backfill historic candles into the local store and list them.
+
+    Only the parts of the range not fetched before are requested, in windows
+    of the most candles one request returns, fetched concurrently.
+
+    Args:
+      product: Product id.
+      granularity: Seconds per candle, one of candles.GRANULARITIES.
+      start: Only candles at or after this time, e.g. 2017-08-01 or
+          2017-08-01T12:00. Times are UTC. Defaults to MAX_CANDLES candles
+          before end.
+      end: Only candles before this time. Defaults to now.
+      summary: If True, only show how many candles were fetched and stored
+          instead of listing them.
     """
+    from gdaxcli import candles as candles_lib
     product = product.upper()
-    self._check_valid_order(order_type, side, product, size, price)
+    if granularity not in candles_lib.GRANULARITIES:
+      raise exceptions.Error('Granularity must be one of %s' % ', '.join(
+          str(g) for g in candles_lib.GRANULARITIES))
+    try:
+      now = int(time.time())
+      # The current candle is still changing; never mark it as fetched.
+      end = min(utils.parse_time(end) if end else now,
+                now - now % granularity)
+      start = (utils.parse_time(start) if start else
+               end - granularity * candles_lib.MAX_CANDLES)
+    except ValueError as e:
+      raise exceptions.Error(str(e))
+
+    def fetch(window_start, window_end):
+      rows = self._client.get_product_historic_rates(
+          product, start=utils.format_time(window_start),
+          end=utils.format_time(window_end), granularity=granularity)
+      if isinstance(rows, dict):
+        raise exceptions.ApiError('Fetching candles of %s failed: %s' % (
+            product, rows.get('message', rows)))
+      return rows
+
+    store = self._get_candle_store()
+    requests, fetched = candles_lib.backfill(
+        store, fetch, product, granularity, start, end, self._workers)
+    candles = store.read(product, granularity, start, end)
+
+    if summary:
+      table = self._new_table(['product_id', 'granularity', 'requests',
+                               'fetched', 'candles', 'start', 'end'])
+      table.add_row([product, granularity, requests, fetched, len(candles),
+                     utils.format_time(start),
+                     utils.format_time(end)])
+      self._print_table(table)
+      return
+    table = self._new_table(['time', 'open', 'high', 'low', 'close',
+                             'volume'])
+    for row in zip(map(utils.format_time, candles['time'].tolist()),
+                   candles['open'].tolist(), candles['high'].tolist(),
+                   candles['low'].tolist(), candles['close'].tolist(),
+                   candles['volume'].tolist()):
+      table.add_row(row)
+    if len(table):
+      self._print_table(table)
+    else:
+      print('No candles')
+
+  def sync(self, accounts=None):
+    """Downloads new history and fills into the local ledger.
+
+    Args:
+      accounts: List of account currencies to sync history for. All accounts
+          if not given.
+    """
+    ledger = self._get_ledger()
+    table = self._new_table(['account', 'new'])
+    for acc in self._client.get_accounts():
+      if accounts and acc['currency'] not in accounts:
+        continue
+      items = self._iter_paginated('/accounts/%s/ledger' % acc['id'])
+      count = ledger.sync_history(acc['id'], acc['currency'], items)
+      table.add_row([acc['currency'], count])
+    count = ledger.sync_fills(self._iter_paginated('/fills'))
+    table.add_row(['fills', count])
+    self._print_table(table)
+
+  # TODO: support product arg.
+  def cancel_all(self, product, skip_confirmation=False):
+    if skip_confirmation or confirm('Cancel ALL orders for %s?' % product):
+      print(self._client.cancel_all(product=product))
+
+  def watch(self, product_ids=None, interval=0.5, depth=5, url=None):
+    """Show live order books from the websocket feed until interrupted.
+
+    Args:
+      product_ids: Products to watch. Defaults to all.
+      interval: Seconds between redraws.
+      depth: Number of price levels to show on each side.
+      url: Websocket feed url, e.g. of a replay. Defaults to the client's.
+    """
+    if not product_ids:
+      product_ids = self._get_product_ids()
+    product_ids = [product_id.upper() for product_id in product_ids]
+    from gdaxcli import feed as feed_lib
+    feed = feed_lib.Feed(product_ids,
+                         url=url or self._ws_url or feed_lib.WS_URL)
+    feed.start()
+    screen = render.Screen()
+    try:
+      if not feed.wait_ready():
+        logging.warning('Timed out waiting for order book snapshots')
+      while True:
+        table = self._new_table(['product_id', 'bid_size', 'bid', 'ask',
+                                 'ask_size', 'last'])
+        for product_id in product_ids:
+          book = feed.book(product_id)
+          # Copied under the feed's lock; the feed thread keeps updating the
+          # book while this draws.
+          bids = feed.levels(product_id, 'buy', depth)
+          asks = feed.levels(product_id, 'sell', depth)
+          if book is None or bids is None or asks is None:
+            continue
+          for level in range(max(len(bids), len(asks))):
+            bid = bids[level] if level < len(bids) else ('', '')
+            ask = asks[level] if level < len(asks) else ('', '')
+            table.add_row([
+              product_id if level == 0 else '',
+              bid[1],
+              format_float(bid[0], 2) if bid[0] else '',
+              format_float(ask[0], 2) if ask[0] else '',
+              ask[1],
+              book.last_price if level == 0 else '',
+            ], WATCH_COLORS)
+        screen.draw(table)
+        time.sleep(interval)
+    except KeyboardInterrupt:
+      pass
+    finally:
+      feed.stop()
+
+  def record(self, path, product_ids=None, duration=None):
+    """Record the websocket feed to an append-only log until interrupted.
+
+    Args:
+      path: Log file, see feedlog. Appended to if it exists.
+      product_ids: Products to record. Defaults to all.
+      duration: Seconds to record for. Defaults to until Ctrl-C.
+    """
+    if not product_ids:
+      product_ids = self._get_product_ids()
+    product_ids = [product_id.upper() for product_id in product_ids]
+    from gdaxcli import feed as feed_lib
+    from gdaxcli import feedlog
+
+    writer = feedlog.LogWriter(path)
+    feed = feed_lib.Feed(product_ids, url=self._ws_url or feed_lib.WS_URL,
+                         on_message=writer.write)
+    started = time.time()
+    feed.start()
+    try:
+      while duration is None or time.time() - started < duration:
+        time.sleep(0.1)
+    except KeyboardInterrupt:
+      pass
+    finally:
+      feed.stop()
+      writer.close()
+    print('Recorded %d messages of %s to %s in %.0fs' % (
+        writer.message_count, ', '.join(product_ids), path,
+        time.time() - started))
+
+  def replay(self, path, speed=1.0, start=None, end=None, port=0):
+    """Serve a recorded feed log on a local websocket until interrupted.
+
+    Each connection gets the messages of the products it subscribes to,
+    from the start of the log.
 
-    current_price = float(self._client.get_product_ticker(product)['price'])
+    Args:
+      path: Log written by record.
+      speed: Factor of the recorded pace; None replays as fast as possible.
+      start, end: Only replay messages received in [start, end), e.g.
+          2017-08-01T12:00 (UTC).
+      port: Port to listen on. Defaults to a free one.
+    """
+    from gdaxcli import replay as replay_lib
+    if not os.path.isfile(path):
+      raise exceptions.Error('No such log: %s' % path)
+    try:
+      start = utils.parse_time(start) if start else None
+      end = utils.parse_time(end) if end else None
+    except ValueError as e:
+      raise exceptions.Error(str(e))
+    server = replay_lib.ReplayServer(path, speed, start, end, port).start()
+    print('Replaying %s at %s speed on %s' % (
+        path, 'max' if speed is None else '%gx' % speed, server.url))
+    print('Watch it with: gdaxcli watch --url %s [products]' % server.url)
+    try:
+      while True:
+        time.sleep(1)
+    except KeyboardInterrupt:
+      pass
+    finally:
+      server.stop()
+    print('Sent %d messages' % server.sent)
+
+  def _watch(self, frame, interval):
+    """Redraws frames in place until interrupted.
+
+    Only cells that changed since the previous frame are written, so a watch
+    left running all day costs little terminal output.
+
+    Args:
+      frame: Function returning (table, footer) of the current state.
+      interval: Seconds from the start of one frame to the next.
+    """
+    screen = render.Screen()
+    try:
+      while True:
+        start = time.time()
+        table, footer = frame()
+        screen.draw(table, footer)
+        time.sleep(max(interval - (time.time() - start), 0))
+    except KeyboardInterrupt:
+      print()
+
+  def _current_prices(self, product_ids):
+    """Returns a dict of product id -> current price.
+
+    Prices come from the feed when it has them; the rest are fetched from
+    the ticker concurrently.
+    """
+    prices = {}
+    if self._feed is not None:
+      for product_id in product_ids:
+        price = self._feed.price(product_id)
+        if price is not None:
+          prices[product_id] = price
+    if self.price_ttl:
+      now = time.time()
+      for product_id in product_ids:
+        cached = self._prices.get(product_id)
+        if product_id not in prices and cached and (
+            now - cached[1] < self.price_ttl):
+          prices[product_id] = cached[0]
+    missing = sorted(set(product_ids) - set(prices))
+    prices.update(self._fetch_prices(missing))
+    if missing and self.max_feed_products:
+      self.follow(missing)
+    return prices
+
+  def _fetch_prices(self, product_ids):
+    """Fetches ticker prices concurrently and keeps them for price_ttl."""
+    fetched_at = time.time()
+    tickers = utils.parallel_map(self._client.get_product_ticker, product_ids,
+                                 self._workers)
+    prices = {}
+    for product_id, tick in zip(product_ids, tickers):
+      prices[product_id] = float(tick['price'])
+      self._prices[product_id] = (prices[product_id], fetched_at)
+    return prices
+
+  def refresh_prices(self, product_ids):
+    """Fetches ticker prices now, to be reused for price_ttl seconds.
+
+    Products the feed has a price for are skipped.
+    """
+    if self._feed is not None:
+      product_ids = [product_id for product_id in product_ids
+                     if self._feed.price(product_id) is None]
+    self._fetch_prices(sorted(product_ids))
 
+  def follow(self, product_ids):
+    """Subscribes to product_ids on the websocket feed, up to
+    max_feed_products in all, starting the feed on first use.
+
+    Prices of followed products are then read from their order books, e.g.
+    for relative limit orders placed in the shell, without a request.
+    """
+    from gdaxcli import feed as feed_lib
+    followed = self._feed.product_ids if self._feed is not None else []
+    new = [product_id for product_id in sorted(set(product_ids))
+           if product_id not in followed]
+    new = new[:max(self.max_feed_products - len(followed), 0)]
+    if not new:
+      return
+    if self._feed is None:
+      self._feed = feed_lib.Feed(
+          new, url=self._ws_url or feed_lib.WS_URL).start()
+      self._own_feed = True
+    else:
+      self._feed.subscribe(new)
+
+  def stop_feed(self):
+    """Stops the feed started by follow, if any."""
+    if self._own_feed:
+      self._feed.stop()
+      self._feed, self._own_feed = None, False
+
+  def refresh_open_orders(self):
+    """Lists open orders again. Returns the new OpenOrderIndex."""
+    self._open_orders = order_index.OpenOrderIndex(
+        self._iter_paginated('/orders'))
+    return self._open_orders
+
+  def open_order_ids(self):
+    """Ids of the open orders last listed, without making a request."""
+    index = self._open_orders
+    return index.ids() if index is not None else []
+
+  def product_ids(self):
+    """Sorted product ids, from the cached catalog when possible."""
+    return self._get_product_ids()
+
+  def _conversion_rates(self, currencies, quote):
+    """Returns a dict of currency -> price in quote, for those with a path.
+
+    Prices of all the products needed are fetched concurrently.
+    """
+    product_ids = set(self._get_product_ids())
+    paths = {}
+    for currency in currencies:
+      path = _conversion_path(currency, quote, product_ids)
+      if path is not None:
+        paths[currency] = path
+
+    needed = set(product_id for path in paths.values()
+                 for product_id, _ in path)
+    prices = self._current_prices(needed)
+
+    rates = {}
+    for currency, path in paths.items():
+      rate = 1.0
+      for product_id, inverted in path:
+        price = prices[product_id]
+        rate *= 1 / price if inverted else price
+      rates[currency] = rate
+    return rates
+
+  def _prepare_order(self, order_type, side, product, size, price,
+                     current_price):
+    """Works out the order parameters given the current price.
+
+    current_price may be None for a limit order at an absolute price, which
+    is then not checked against it.
+
+    Returns:
+      Tuple of (kwargs for buy/sell, absolute price, difference from the
+      current price or None, total).
+
+    Raises:
+      InvalidOrderError: if a limit order would cross the current price.
+    """
+    diff = None
+    increment = self._get_rules().get(product).quote_increment
     if order_type == 'market':
-      total = float(size) * current_price
       price = current_price
     elif order_type == 'limit':
-      abs_price, amount = self._parse_price(price, current_price)
-      if side == 'buy' and amount >= 0:
+      abs_price, amount = self._parse_price(price, current_price, increment)
+      if amount is None:
+        pass
+      elif side == 'buy' and amount >= 0:
         raise exceptions.InvalidOrderError(
             'Error: Buying higher than or equal to current price:'
-            ' %s >= %.2f' % (abs_price, current_price))
-        return
+            ' %s >= %.2f' % (abs_price, current_price),
+            reason='crosses_price')
       elif side == 'sell' and amount <= 0:
         raise exceptions.InvalidOrderError(
             'Error: Selling lower than or equal to current price:'
-            ' %s <= %.2f' % (abs_price, current_price))
-        return
+            ' %s <= %.2f' % (abs_price, current_price),
+            reason='crosses_price')
       # TODO: make time_in_force, post_only configurable.
       price = abs_price
+      if current_price is not None:
+        diff = float(numeric.to_decimal(price) -
+                     numeric.to_decimal(current_price))
     elif order_type == 'stop':
       # TODO
       raise NotImplementedError('This functionality is not yet implemented.')
@@ -310,134 +1299,374 @@ class Client(object):
         'size': size,
     }
     # TODO: read the self trade prevention option from config
-
-    diff = ''
     if order_type == 'limit':
-      kwargs['price'] = abs_price
-      diff = float(price) - current_price
-      diff = ' (' + colorize('%.2f' % diff, negative) + ')'
+      kwargs['price'] = price
 
-    total = float(size) * float(price)
-    print('Placing %s order: %s %s %s @ %s%s; total %.2f' % (
-        order_type.upper(), colorize(side, lambda side: side == 'buy'), size,
-        product, price, diff, total))
-
-    if skip_confirmation or confirm():
-      if side == 'buy':
-        print(self._client.buy(**kwargs))
-      else:
-        print(self._client.sell(**kwargs))
-    else:
-      print('Did nothing')
-
-  def order_cancel(self, order_id_prefix, skip_confirmation=False):
-    order_ids = []
-    pages = self._client.get_orders()
-    for page in pages:
-      for order in page:
-        order_ids.append(order['id'])
+    total = numeric.notional([size], [price])
+    return kwargs, price, diff, total
 
-    possible_matches = []
-    for order_id in order_ids:
-      if order_id.startswith(order_id_prefix):
-        possible_matches.append(order_id)
-
-    if not possible_matches:
-      print('Order prefix does not match any')
-      return
-    if len(possible_matches) > 1:
-      print('Order prefix too short; cannot uniquely identify an order')
-      return
-
-    order = self._client.get_order(possible_matches[0])
-    # TODO: factor out this error checking logic
-    if isinstance(order, dict) and order.has_key('message'):
-      print(order)
-
-    print(tabulate([self._parse_order(order)]))
-    if skip_confirmation or confirm('Cancel order?'):
-      print(self._client.cancel_order(order_id))
-
-  def fills(self, product=None):
-    rows = []
-    pages = self._client.get_fills(product_id=product)
-    for page in pages:
-      for fill in page:
-        size, price = float(fill['size']), float(fill['price'])
-        size_usd = size * price
-        fee = fill['fee']
-        rows.append(OrderedDict([
-          ('product_id', fill['product_id']),
-          ('side', colorize(fill['side'], lambda side: side == 'buy')),
-          ('price', price),
-          ('size', size),
-          ('size_usd', size_usd),
-          ('fee', red(fee) if not is_str_zero(fee) else fee),
-          ('settled', 'yes' if fill['settled'] else red('no')),
-          ('created_at', fill['created_at']),
-        ]))
-    if rows:
-      print(tabulate(rows))
+  def _submit_order(self, kwargs, fast=False):
+    if fast:
+      result = self._get_fast_orders().submit(kwargs)
+    elif kwargs['side'] == 'buy':
+      result = self._client.buy(**kwargs)
     else:
-      print('No fills')
-
-  # TODO: support product arg.
-  def cancel_all(self, product):
-    if confirm('Cancel ALL orders for %s?' % product):
-      print(self._client.cancel_all(product=product))
+      result = self._client.sell(**kwargs)
+    if self._open_orders is not None and isinstance(result, dict) and (
+        'id' in result):
+      self._open_orders.add(result)
+    return result
+
+  def _get_open_orders(self):
+    """Returns an OpenOrderIndex, listing orders again if it's too old."""
+    if (self._open_orders is None or
+        self._open_orders.age() > OPEN_ORDERS_TTL):
+      return self.refresh_open_orders()
+    return self._open_orders
+
+  def _parse_history_item(self, item):
+    """Returns (values, colors) of a history table row."""
+    is_green = True
+    product, type_ = '', item['type']
+    amount = numeric.to_decimal(item['amount'])
+    if type_ == 'transfer':
+      transfer_type = item['details']['transfer_type']
+      is_green = (transfer_type == 'deposit')
+      type_ = 'transfer (%s)' % transfer_type
+    elif type_ == 'match':
+      product = item['details']['product_id']
+      is_green = nonnegative(amount)
+    elif type_ == 'fee':
+      is_green = False
+    color = _color(is_green)
+    return ([
+      type_,
+      amount,
+      format_float(item['balance']),
+      product,
+      item['created_at'],
+    ], (color, color, None, None, None))
+
+  def _parse_fill(self, fill):
+    """Returns (values, colors) of a fills table row."""
+    size = numeric.to_decimal(fill['size'])
+    price = numeric.to_decimal(fill['price'])
+    size_usd = size * price
+    fee = fill['fee']
+    return ([
+      fill['product_id'],
+      fill['side'],
+      price,
+      size,
+      size_usd,
+      fee,
+      'yes' if fill['settled'] else 'no',
+      fill['created_at'],
+    ], (None, _color(fill['side'] == 'buy'), None, None, None,
+        None if is_str_zero(fee) else render.RED,
+        None if fill['settled'] else render.RED, None))
 
   def _parse_order(self, order):
-    size, price = float(order['size']), float(order['price'])
+    """Returns (values, colors) of an orders table row."""
+    size = numeric.to_decimal(order['size'])
+    price = numeric.to_decimal(order['price'])
     size_usd = size * price
     fill_fees = order['fill_fees']
-    return OrderedDict([
-      ('id', order['id'][:6]),
-      ('product_id', order['product_id']),
-      ('side', colorize(order['side'], lambda x: x == 'buy')),
-      ('type', order['type']),
-      ('price', price),
-      ('size', size),
-      ('size_usd', size_usd),
-      ('filled_size', order['filled_size']),
-      ('fill_fees', red(format_float(fill_fees)) if not is_str_zero(fill_fees) else float(fill_fees)),
-      ('status', colorize(order['status'], lambda x: x == 'open')),
-      ('time_in_force', order['time_in_force']),
-      ('settled', 'yes' if order['settled'] else red('no')),
-      ('stp', order['stp']),
-      ('created_at', order['created_at']),
+    return ([
+      order['id'][:6],
+      order['product_id'],
+      order['side'],
+      order['type'],
+      price,
+      size,
+      size_usd,
+      order['filled_size'],
+      format_float(fill_fees),
+      order['status'],
+      order['time_in_force'],
+      'yes' if order['settled'] else 'no',
+      order['stp'],
+      order['created_at'],
       # TODO: local date.
-    ])
+    ], (None, None, _color(order['side'] == 'buy'), None, None, None, None,
+        None, None if is_str_zero(fill_fees) else render.RED,
+        _color(order['status'] == 'open'), None,
+        None if order['settled'] else render.RED, None, None))
 
-  def _parse_price(self, price, current_price):
-    # TODO: make default diff amount configurable.
+  def _parse_price(self, price, current_price, increment=None):
+    """Returns (absolute price string, difference from the current price).
 
+    Args:
+      price: Absolute price, or relative to current_price if it starts with
+          + or -.
+      current_price: Current price of the product. May be None for an
+          absolute price, in which case the difference is None.
+      increment: The product's quote_increment. Prices are rounded down to
+          it; without it, cut to 2 digits after the dot.
+    """
+    # TODO: make default diff amount configurable.
     if price[0] in DIGITS:
       # Absolute price.
-      return (self._truncate(price, 2), float(price) - current_price)
+      if increment:
+        abs_price = numeric.to_str(numeric.round_down(price, increment))
+      else:
+        abs_price = self._truncate(price, 2)
+      if current_price is None:
+        return abs_price, None
+      return (abs_price,
+              float(numeric.to_decimal(price)) - float(current_price))
+
+    current_price = numeric.to_decimal(current_price)
 
     # Relative price.
-    amount = float(price[1:])
-    if price.startswith('-'):
-      amount = -amount
-    abs_price = current_price + amount
-    # If we simply call str, it may return a scientific notation e.g. 5e-5.
-    return (self._truncate('%.6f' % abs_price, 2), amount)
+    amount = numeric.to_decimal(price)
+    abs_price = numeric.round_down(
+        current_price + amount, increment or numeric.DEFAULT_PRICE_INCREMENT)
+    return (numeric.to_str(abs_price), float(amount))
 
   def _check_valid_order(
       self, order_type, side, product, size, price):
-    product = product.upper()
-    product_ids = self._get_product_ids()
-    # TODO: throw more meaningful error messages.
-    assert order_type in set(['market', 'limit', 'stop'])
-    assert side in set(['buy', 'sell'])
-    assert product in product_ids
-    float(size)
-    if order_type != 'market':
-      assert price[0] in (DIGITS | set(['-', '+']))
+    """Checks an order against the product's rules. Returns the size to send.
+
+    Raises:
+      InvalidOrderError: see rules.RulesIndex.check.
+    """
+    return self._get_rules().check(order_type, side, product.upper(), size,
+                                   price)
+
+  def _iter_paginated(self, path, params=None, limit=None, since=None):
+    """Yields items of a paginated endpoint, newest first.
+
+    Pages are only requested as the items are consumed, following the
+    cb-after cursor, so callers can print or drop them as they go.
+
+    Args:
+      path: Endpoint path, e.g. /fills.
+      params: Dict of query parameters.
+      limit: Stop after this many items.
+      since: Stop at the first item created before this time.
+    """
+    params = dict(params or {})
+    if limit:
+      params['limit'] = min(limit, MAX_PAGE_SIZE)
+    count = 0
+    while True:
+      r = self._transport.get(self._client.url + path, params=params,
+                              auth=self._client.auth)
+      page = r.json()
+      if not isinstance(page, list):
+        raise exceptions.ApiError(page.get('message', page))
+      for item in page:
+        if since and item['created_at'] < since:
+          return
+        yield item
+        count += 1
+        if limit and count >= limit:
+          return
+      after = r.headers.get('cb-after')
+      if not page or not after:
+        return
+      params['after'] = after
+
+  def request_counters(self):
+    """Returns a dict of transport.Transport counters."""
+    return dict(self._transport.counters)
+
+  def _new_table(self, columns):
+    return render.Table(columns, accuracy=DEFAULT_ACCURACY)
+
+  def _phase(self, name):
+    """Context manager timing a phase of the command, if profiling."""
+    if self._recorder is None:
+      from gdaxcli import timing
+      return timing.NO_PHASE
+    return self._recorder.phase(name)
+
+  def _write_records(self, records):
+    """Writes dicts in output_format as they come."""
+    from gdaxcli import output
+    with self._phase('render'):
+      output.write_records(records, self.output_format)
+
+  def _print_table(self, table, **tabulate_kwargs):
+    """Prints a render.Table, with tabulate if use_tabulate is set, or its
+    rows as records if output_format is set."""
+    if self.output_format:
+      self._write_records(table.records())
+      return
+    with self._phase('render'):
+      if self.use_tabulate:
+        print(tabulate(table.to_dicts(), **tabulate_kwargs))
+      else:
+        table.render()
+
+  def _print_rows(self, items, parse, columns, stream, empty_message=None,
+                  record=None, **tabulate_kwargs):
+    """Prints an iterable of items as table rows.
+
+    Args:
+      items: Iterable of items, e.g. fills from the API.
+      parse: Function returning (values, colors) of an item's row.
+      columns: List of (name, width). Widths are only used for streaming.
+      stream: If True, print each row as it comes; otherwise buffer them all
+          to line up the columns.
+      empty_message: Printed instead if there are no rows.
+      record: Function returning the dict written for an item if
+          output_format is set. Defaults to the item as is.
+    """
+    if self.output_format:
+      if record is not None:
+        items = (record(item) for item in items)
+      self._write_records(items)
+      return
+    if stream:
+      table = render.StreamingTable(columns, accuracy=DEFAULT_ACCURACY)
+      for item in items:
+        values, colors = parse(item)
+        with self._phase('render'):
+          table.write_row(values, colors)
+      count = table.row_count
+    else:
+      table = self._new_table([name for name, _ in columns])
+      for item in items:
+        table.add_row(*parse(item))
+      count = len(table)
+      if count or empty_message is None:
+        self._print_table(table, **tabulate_kwargs)
+    if not count and empty_message is not None:
+      print(empty_message)
+
+  def _profile_rows(self, profiles, fetch, parse, total_columns):
+    """Yields (values, colors) of the rows of several profiles' items.
+
+    Profiles are fetched concurrently and their rows yielded in order, each
+    prefixed with the profile name and followed by a subtotal row, then a
+    total row of all of them.
+
+    Args:
+      profiles: List of (name, Client).
+      fetch: Function of a Client returning an iterable of its items.
+      parse: Function returning (values, colors) of an item's row.
+      total_columns: Indexes of the values of parse summed into subtotals.
+    """
+    names = [name for name, _ in profiles]
+    results = utils.parallel_imap(lambda profile: list(fetch(profile[1])),
+                                  profiles, len(profiles))
+    totals = [numeric.to_decimal(0)] * len(total_columns)
+    width = None
+    for name, items in zip(names, results):
+      subtotals = [numeric.to_decimal(0)] * len(total_columns)
+      for item in items:
+        values, colors = parse(item)
+        width = len(values)
+        for i, column in enumerate(total_columns):
+          subtotals[i] += numeric.to_decimal(values[column])
+        yield [name] + values, (None,) + tuple(colors)
+      if items:
+        yield self._total_row(name, 'subtotal', width, total_columns,
+                              subtotals)
+        totals = [a + b for a, b in zip(totals, subtotals)]
+    if width is not None and len(names) > 1:
+      yield self._total_row('all', 'total', width, total_columns, totals)
+
+  @staticmethod
+  def _total_row(name, label, width, total_columns, totals):
+    values = [label] + [''] * (width - 1)
+    for column, total in zip(total_columns, totals):
+      values[column] = total
+    return [name] + values, None
+
+  def _print_profile_rows(self, profiles, fetch, parse, columns,
+                          total_columns, stream, empty_message=None):
+    """Prints the items of several profiles as one table.
+
+    With output_format, items are written tagged with their profile, without
+    subtotals. See _profile_rows for the arguments.
+    """
+    if self.output_format:
+      names = [name for name, _ in profiles]
+      results = utils.parallel_imap(lambda profile: list(fetch(profile[1])),
+                                    profiles, len(profiles))
+      self._write_records(dict(item, profile=name)
+                          for name, items in zip(names, results)
+                          for item in items)
+      return
+    self._print_rows(
+        self._profile_rows(profiles, fetch, parse, total_columns),
+        lambda row: row, [PROFILE_COLUMN] + columns, stream,
+        empty_message=empty_message)
+
+  def profile_clients(self, names=None):
+    """Returns a list of (name, Client) of profiles in the config file.
+
+    A client is created once per profile and kept, so each account keeps one
+    pool of connections across the commands of a shell or daemon. They share
+    this client's product cache and settings; requests without auth, e.g. for
+    prices, still go through this client.
+
+    Args:
+      names: Profile names, in the order to show them. None for all.
+
+    Raises:
+      Error: if a name isn't in the config file.
+    """
+    profiles = utils.select_profiles(utils.read_profiles(), names)
+    result = []
+    for name, config in profiles:
+      client = self._profile_clients.get(name)
+      if client is None:
+        client = Client(
+            config, api_url=self._client.url, workers=self._workers,
+            rate_limit=self._rate_limit, rate_burst=self._rate_burst,
+            product_cache=self._product_cache, max_retries=self._max_retries,
+            recorder=self._recorder)
+        self._profile_clients[name] = client
+      result.append((name, client))
+    _, transport = _import_gdax()
+    transport.install(self._transport)
+    return result
+
+  def _get_ledger(self):
+    if self._ledger is None:
+      from gdaxcli import ledger
+      self._ledger = ledger.Ledger()
+    return self._ledger
+
+  def _get_candle_store(self):
+    if self._candle_store is None:
+      from gdaxcli import candles
+      self._candle_store = candles.CandleStore()
+    return self._candle_store
+
+  def _get_products(self, refresh=False):
+    """Gets the product catalog, from the cache if it's fresh."""
+    products = None if refresh else self._product_cache.get()
+    if products is None:
+      products = self._client.get_products()
+      # Errors come back as a dict with a message; don't cache those.
+      if isinstance(products, list):
+        self._product_cache.set(products)
+        self._rules = None
+    return products
+
+  def _get_fast_orders(self):
+    if self._fast_orders is None:
+      from gdaxcli import fastorder
+      auth = self._client.auth
+      self._fast_orders = fastorder.FastOrders(
+          self._transport, self._client.url,
+          fastorder.FastAuth(auth.api_key, auth.secret_key, auth.passphrase))
+    return self._fast_orders
+
+  def _get_rules(self):
+    """Returns the rules.RulesIndex of the catalog, indexing it if needed."""
+    if self._rules is None or self._rules.age() > RULES_TTL:
+      self._rules = rules.RulesIndex(self._get_products())
+    return self._rules
 
   def _get_product_ids(self):
     """Gets sorted list of products."""
-    products = self._client.get_products()
+    products = self._get_products()
     product_ids = [p['id'] for p in products]
     product_ids.sort()
     return product_ids
@@ -451,12 +1680,5 @@ class Client(object):
     """
     if not isinstance(s, str):
       s = str(s)
-    for index, char in enumerate(s):
-      if char == '.':
-        dot_index = index
-        end = dot_index + digits + 1
-        break
-    else:
-      end = len(s)
-    return s[:end]
+    return numeric.truncate(s, digits)
 
@@ -0,0 +1,199 @@
+"""Local SQLite store of account history and fills.
+
+Lets history and fills be answered without re-downloading every page. A sync
+only fetches entries newer than what's already stored.
+"""
+
+import json
+import os
+import sqlite3
+
+DEFAULT_PATH = '~/.gdaxcli_ledger.db'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+  account_id TEXT NOT NULL,
+  currency TEXT NOT NULL,
+  id INTEGER NOT NULL,
+  created_at TEXT NOT NULL,
+  amount TEXT NOT NULL,
+  balance TEXT NOT NULL,
+  type TEXT NOT NULL,
+  product_id TEXT,
+  details TEXT,
+  PRIMARY KEY (account_id, id)
+);
+CREATE INDEX IF NOT EXISTS history_account_created
+  ON history (account_id, created_at);
+CREATE INDEX IF NOT EXISTS history_product_created
+  ON history (product_id, created_at);
+
+CREATE TABLE IF NOT EXISTS fills (
+  product_id TEXT NOT NULL,
+  trade_id INTEGER NOT NULL,
+  order_id TEXT,
+  side TEXT NOT NULL,
+  price TEXT NOT NULL,
+  size TEXT NOT NULL,
+  fee TEXT NOT NULL,
+  liquidity TEXT,
+  settled INTEGER NOT NULL,
+  created_at TEXT NOT NULL,
+  PRIMARY KEY (product_id, trade_id)
+);
+CREATE INDEX IF NOT EXISTS fills_created ON fills (created_at);
+CREATE INDEX IF NOT EXISTS fills_product_created
+  ON fills (product_id, created_at);
+
+CREATE TABLE IF NOT EXISTS cursors (
+  name TEXT PRIMARY KEY,
+  value TEXT NOT NULL
+);
+"""
+
+_HISTORY_FIELDS = ('id', 'created_at', 'amount', 'balance', 'type')
+_FILL_FIELDS = ('product_id', 'trade_id', 'order_id', 'side', 'price', 'size',
+                'fee', 'liquidity', 'settled', 'created_at')
+
+def _where(conditions):
+  """Joins (sql, value) conditions, skipping ones whose value is None."""
+  clauses, values = [], []
+  for sql, value in conditions:
+    if value is not None:
+      clauses.append(sql)
+      values.append(value)
+  if not clauses:
+    return '', values
+  return ' WHERE ' + ' AND '.join(clauses), values
+
+class Ledger(object):
+  """History and fills stored in SQLite.
+
+  Items are stored and returned in the same shape as the API returns them,
+  with amounts kept as the exchange's strings.
+  """
+
+  def __init__(self, path=DEFAULT_PATH):
+    path = os.path.expanduser(path)
+    self._conn = sqlite3.connect(path)
+    if path != ':memory:':
+      os.chmod(path, 0o600)
+    self._conn.executescript(_SCHEMA)
+
+  def close(self):
+    self._conn.close()
+
+  def get_cursor(self, name):
+    row = self._conn.execute(
+        'SELECT value FROM cursors WHERE name = ?', (name,)).fetchone()
+    return row[0] if row else None
+
+  def sync_history(self, account_id, currency, items):
+    """Stores new history entries of an account.
+
+    Args:
+      account_id: Account the entries belong to.
+      currency: Currency of the account.
+      items: Iterable of entries, newest first, as returned by the API. Only
+          consumed until an entry that is already stored.
+
+    Returns:
+      Number of entries added.
+    """
+    cursor_name = 'history:' + account_id
+    last_id = self.get_cursor(cursor_name)
+    last_id = int(last_id) if last_id is not None else None
+    newest_id = None
+    count = 0
+    # One transaction, so an interrupted sync doesn't leave a gap behind the
+    # cursor.
+    with self._conn:
+      for item in items:
+        if last_id is not None and item['id'] <= last_id:
+          break
+        if newest_id is None:
+          newest_id = item['id']
+        details = item.get('details') or {}
+        self._conn.execute(
+            'INSERT OR REPLACE INTO history VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (account_id, currency, item['id'], item['created_at'],
+             item['amount'], item['balance'], item['type'],
+             details.get('product_id'), json.dumps(details)))
+        count += 1
+      if newest_id is not None:
+        self._conn.execute('INSERT OR REPLACE INTO cursors VALUES (?, ?)',
+                           (cursor_name, str(newest_id)))
+    return count
+
+  def sync_fills(self, fills):
+    """Stores new fills.
+
+    Args:
+      fills: Iterable of fills, newest first, as returned by the API. Only
+          consumed until a fill that is already stored.
+
+    Returns:
+      Number of fills added.
+    """
+    count = 0
+    with self._conn:
+      for fill in fills:
+        exists = self._conn.execute(
+            'SELECT 1 FROM fills WHERE product_id = ? AND trade_id = ?',
+            (fill['product_id'], fill['trade_id'])).fetchone()
+        if exists:
+          break
+        self._conn.execute(
+            'INSERT INTO fills VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (fill['product_id'], fill['trade_id'], fill.get('order_id'),
+             fill['side'], fill['price'], fill['size'], fill['fee'],
+             fill.get('liquidity'), 1 if fill['settled'] else 0,
+             fill['created_at']))
+        count += 1
+    return count
+
+  def history(self, currency, start=None, end=None, product_id=None,
+              type_=None, limit=None):
+    """Yields stored history entries of an account, newest first.
+
+    Args:
+      currency: Account currency, e.g. USD.
+      start: Only entries created at or after this time.
+      end: Only entries created before this time.
+      product_id: Only entries for this product.
+      type_: Only entries of this type: transfer, match, fee or rebate.
+      limit: Maximum number of entries.
+    """
+    where, values = _where([
+        ('currency = ?', currency),
+        ('created_at >= ?', start),
+        ('created_at < ?', end),
+        ('product_id = ?', product_id),
+        ('type = ?', type_),
+    ])
+    query = ('SELECT id, created_at, amount, balance, type, details'
+             ' FROM history' + where + ' ORDER BY created_at DESC, id DESC')
+    if limit:
+      query += ' LIMIT %d' % limit
+    for row in self._conn.execute(query, values):
+      item = dict(zip(_HISTORY_FIELDS, row[:-1]))
+      item['details'] = json.loads(row[-1]) if row[-1] else {}
+      yield item
+
+  def fills(self, product_id=None, start=None, end=None, side=None,
+            limit=None):
+    """Yields stored fills, newest first. Arguments are as in history."""
+    where, values = _where([
+        ('product_id = ?', product_id),
+        ('created_at >= ?', start),
+        ('created_at < ?', end),
+        ('side = ?', side),
+    ])
+    query = ('SELECT ' + ', '.join(_FILL_FIELDS) + ' FROM fills' + where +
+             ' ORDER BY created_at DESC, trade_id DESC')
+    if limit:
+      query += ' LIMIT %d' % limit
+    for row in self._conn.execute(query, values):
+      fill = dict(zip(_FILL_FIELDS, row))
+      fill['settled'] = bool(fill['settled'])
+      yield fill
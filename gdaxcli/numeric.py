@@ -0,0 +1,65 @@
+"""Exact arithmetic on the decimal strings gdax returns.
+
+Prices, sizes and fees are parsed once into Decimals instead of going through
+floats, so order prices and totals don't drift, e.g. on small crypto sizes.
+"""
+
+import decimal
+from decimal import Decimal
+import operator
+
+ZERO = Decimal(0)
+
+# Tick used for prices when the product doesn't give its quote_increment.
+DEFAULT_PRICE_INCREMENT = Decimal('0.01')
+
+def to_decimal(value):
+  """Converts an exchange string, int or float to a Decimal.
+
+  Floats go through repr, so 0.1 becomes Decimal('0.1') rather than the exact
+  value of the binary float.
+  """
+  if isinstance(value, Decimal):
+    return value
+  if isinstance(value, float):
+    return Decimal(repr(value))
+  return Decimal(value)
+
+def to_str(value):
+  """Formats a Decimal as the exchange expects: no exponent, e.g. 0.00000001."""
+  return format(value, 'f')
+
+def format_fixed(value, digits):
+  """Formats value with the given number of digits after the dot."""
+  if isinstance(value, float):
+    return '%.*f' % (digits, value)
+  return format(to_decimal(value), '.%df' % digits)
+
+def is_zero(s):
+  """Returns True if the decimal string s is zero, e.g. '0.0000000000'."""
+  return not s.strip('+-0.')
+
+def truncate(s, digits):
+  """Cuts the decimal string s to the number of digits after the dot.
+
+  Digits are dropped rather than rounded up: selling all of 0.1111115 BTC
+  must not ask for 0.111112.
+  """
+  head, dot, tail = s.partition('.')
+  return head + dot + tail[:digits] if dot else s
+
+def round_down(value, increment):
+  """Rounds value down to a multiple of increment, e.g. a quote_increment.
+
+  The result has as many digits after the dot as increment needs.
+  """
+  increment = to_decimal(increment).normalize()
+  steps = (to_decimal(value) / increment).to_integral_value(
+      rounding=decimal.ROUND_FLOOR)
+  digits = max(-increment.as_tuple().exponent, 0)
+  return (steps * increment).quantize(Decimal(1).scaleb(-digits))
+
+def notional(sizes, prices):
+  """Sum of size * price over two parallel sequences of strings or Decimals."""
+  return sum(map(operator.mul, map(to_decimal, sizes), map(to_decimal, prices)),
+             ZERO)
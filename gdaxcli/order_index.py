@@ -0,0 +1,45 @@
+"""Index of open orders for resolving order id prefixes."""
+
+import bisect
+import time
+
+class OpenOrderIndex(object):
+  """Open orders kept sorted by id.
+
+  Orders with a given id prefix are adjacent in sorted order, so a prefix is
+  resolved with a binary search instead of scanning every order.
+  """
+
+  def __init__(self, orders=()):
+    self._orders = dict((order['id'], order) for order in orders)
+    self._ids = sorted(self._orders)
+    self.created_at = time.time()
+
+  def __len__(self):
+    return len(self._ids)
+
+  def age(self):
+    """Seconds since the index was built."""
+    return time.time() - self.created_at
+
+  def add(self, order):
+    if order['id'] not in self._orders:
+      bisect.insort(self._ids, order['id'])
+    self._orders[order['id']] = order
+
+  def remove(self, order_id):
+    if self._orders.pop(order_id, None) is not None:
+      del self._ids[bisect.bisect_left(self._ids, order_id)]
+
+  def match(self, prefix):
+    """Returns the orders whose id starts with prefix, sorted by id."""
+    matches = []
+    index = bisect.bisect_left(self._ids, prefix)
+    while index < len(self._ids) and self._ids[index].startswith(prefix):
+      matches.append(self._orders[self._ids[index]])
+      index += 1
+    return matches
+
+  def ids(self):
+    """All order ids, sorted."""
+    return list(self._ids)
@@ -0,0 +1,112 @@
+"""Machine readable output: one record per line, no colors or tables.
+
+With --format, listings are written record by record as pages arrive, with
+the exchange's strings as they are. No values are reformatted, colored or
+measured for column widths, so piping millions of rows costs little more
+than reading them.
+
+msgpack is only needed for --format msgpack: pip install msgpack
+https://msgpack.org
+"""
+
+import csv
+from decimal import Decimal
+import json
+import sys
+
+from gdaxcli import exceptions
+from gdaxcli import numeric
+
+FORMATS = ('jsonl', 'csv', 'tsv', 'msgpack')
+
+def _default(value):
+  """Encodes values json and msgpack don't know, e.g. computed Decimals."""
+  if isinstance(value, Decimal):
+    return numeric.to_str(value)
+  raise TypeError('Cannot encode %r' % (value,))
+
+def _cell(value):
+  if value is None:
+    return ''
+  if isinstance(value, Decimal):
+    return numeric.to_str(value)
+  if isinstance(value, float):
+    return repr(value)
+  if isinstance(value, (dict, list)):
+    # Nested details, e.g. of history entries, as json in one cell.
+    return json.dumps(value, sort_keys=True, default=_default)
+  return value
+
+class JsonLinesWriter(object):
+  """Writes each record as a json object on its own line."""
+
+  def __init__(self, out):
+    self._out = out
+    self._encode = json.JSONEncoder(separators=(',', ':'),
+                                    default=_default).encode
+
+  def write(self, record):
+    self._out.write(self._encode(record) + '\n')
+
+class DelimitedWriter(object):
+  """Writes records as CSV or TSV rows.
+
+  The header is the keys of the first record; later records are written in
+  the same columns, with missing keys left empty and extra keys dropped.
+  """
+
+  def __init__(self, out, delimiter):
+    self._writer = csv.writer(out, delimiter=delimiter, lineterminator='\n')
+    self._columns = None
+
+  def write(self, record):
+    if self._columns is None:
+      self._columns = list(record)
+      self._writer.writerow(self._columns)
+    self._writer.writerow([_cell(record.get(column))
+                           for column in self._columns])
+
+class MsgpackWriter(object):
+  """Writes each record as a msgpack map, back to back."""
+
+  def __init__(self, out):
+    try:
+      import msgpack
+    except ImportError:
+      raise exceptions.Error('--format msgpack needs msgpack: '
+                             'pip install msgpack')
+    # Binary stream under a text stdout.
+    self._out = getattr(out, 'buffer', out)
+    self._pack = msgpack.Packer(default=_default).pack
+
+  def write(self, record):
+    self._out.write(self._pack(record))
+
+def writer(output_format, out=None):
+  """Returns a writer of records in output_format, one of FORMATS.
+
+  Raises:
+    Error: if the format isn't known.
+  """
+  out = out or sys.stdout
+  if output_format == 'jsonl':
+    return JsonLinesWriter(out)
+  if output_format == 'csv':
+    return DelimitedWriter(out, ',')
+  if output_format == 'tsv':
+    return DelimitedWriter(out, '\t')
+  if output_format == 'msgpack':
+    return MsgpackWriter(out)
+  raise exceptions.Error('Unknown format %s; use one of %s' % (
+      output_format, ', '.join(FORMATS)))
+
+def write_records(records, output_format, out=None):
+  """Writes an iterable of dicts as they come. Returns the number written."""
+  out = out or sys.stdout
+  write = writer(output_format, out).write
+  count = 0
+  for record in records:
+    write(record)
+    count += 1
+  out.flush()
+  return count
@@ -0,0 +1,362 @@
+"""Table rendering.
+
+Table keeps rows by column with raw values, and a color per cell only where
+there is one. Colors and number formatting are applied while writing, and
+column widths are worked out in a single pass over the formatted cells, so
+large listings don't go through per row dicts of colored strings and
+tabulate's repeated scans.
+"""
+
+from __future__ import print_function
+
+from collections import OrderedDict
+from decimal import Decimal
+import os
+import re
+import sys
+
+# Cell colors.
+GREEN = 'green'
+RED = 'red'
+
+_ANSI_ESCAPE = re.compile(r'\x1b\[[0-9;]*m')
+
+_colorama = None
+
+def get_colorama():
+  """Imports and initializes colorama the first time colors are needed.
+
+  https://pypi.python.org/pypi/colorama
+  """
+  global _colorama
+  if _colorama is None:
+    import colorama
+    colorama.init()
+    _colorama = colorama
+  return _colorama
+
+def _color_codes():
+  colorama = get_colorama()
+  return {GREEN: colorama.Fore.GREEN, RED: colorama.Fore.RED,
+          None: colorama.Style.RESET_ALL}
+
+def visible_len(s):
+  """Length of s as shown on a terminal, ignoring color codes."""
+  return len(_ANSI_ESCAPE.sub('', s))
+
+def _pad(s, width, right):
+  padding = ' ' * max(width - visible_len(s), 0)
+  return padding + s if right else s + padding
+
+def _is_number(s):
+  try:
+    float(s)
+  except ValueError:
+    return False
+  return True
+
+class Table(object):
+  """Rows of a table, stored by column."""
+
+  def __init__(self, columns, accuracy=4):
+    """Initializer.
+
+    Args:
+      columns: List of column names.
+      accuracy: Number of digits after the dot for floats and Decimals.
+    """
+    self.columns = list(columns)
+    self._accuracy = accuracy
+    self._decimal_format = '.%df' % accuracy
+    self._cells = [[] for _ in self.columns]
+    # Per column list of cell colors, created when a column gets its first
+    # color. May be shorter than the column; missing entries have no color.
+    self._colors = [None] * len(self.columns)
+    self._row_count = 0
+
+  def __len__(self):
+    return self._row_count
+
+  def add_row(self, values, colors=None):
+    """Adds a row.
+
+    Args:
+      values: Values in column order. Floats and Decimals are formatted when
+          written.
+      colors: Optional sequence with GREEN, RED or None for each column.
+    """
+    for cells, value in zip(self._cells, values):
+      cells.append(value)
+    if colors:
+      for index, color in enumerate(colors):
+        if color is None:
+          continue
+        column_colors = self._colors[index]
+        if column_colors is None:
+          column_colors = self._colors[index] = []
+        column_colors.extend([None] * (self._row_count - len(column_colors)))
+        column_colors.append(color)
+    self._row_count += 1
+
+  def column(self, name):
+    """Raw values of a column."""
+    return self._cells[self.columns.index(name)]
+
+  def color(self, name, row):
+    """Color of a cell, or None."""
+    return self._cell_color(self.columns.index(name), row)
+
+  def _format(self, value):
+    if isinstance(value, float):
+      return '%.*f' % (self._accuracy, value)
+    if isinstance(value, Decimal):
+      return format(value, self._decimal_format)
+    return str(value)
+
+  def _layout(self):
+    """Returns (texts, widths, right): formatted cells by column, the width of
+    each column and whether it is right aligned."""
+    texts, widths, right = [], [], []
+    for name, cells in zip(self.columns, self._cells):
+      column = [self._format(value) for value in cells]
+      texts.append(column)
+      widths.append(max([len(name)] + [len(text) for text in column]))
+      right.append(bool(cells) and all(
+          isinstance(value, (int, float)) or _is_number(text)
+          for value, text in zip(cells, column) if text != ''))
+    return texts, widths, right
+
+  def _cell_color(self, index, row):
+    column_colors = self._colors[index]
+    if column_colors is None or row >= len(column_colors):
+      return None
+    return column_colors[row]
+
+  def _header_lines(self, widths, right):
+    return [
+        '  '.join(_pad(name, width, align) for name, width, align
+                  in zip(self.columns, widths, right)),
+        '  '.join('-' * width for width in widths),
+    ]
+
+  def render(self, out=None, color=True):
+    """Writes the table in the same layout as tabulate's simple format.
+
+    Numeric columns are right aligned, others left aligned.
+    """
+    # Codes first: loading them has colorama wrap sys.stdout, which strips
+    # them when it's not a terminal.
+    codes = _color_codes() if color else None
+    out = out or sys.stdout
+    texts, widths, right = self._layout()
+    lines = self._header_lines(widths, right)
+    for row in range(self._row_count):
+      cells = []
+      for index, width in enumerate(widths):
+        text = texts[index][row]
+        padding = ' ' * (width - len(text))
+        cell_color = self._cell_color(index, row) if codes else None
+        if cell_color is not None:
+          text = codes[cell_color] + text + codes[None]
+        cells.append(padding + text if right[index] else text + padding)
+      lines.append('  '.join(cells))
+    out.write('\n'.join(lines) + '\n')
+
+  def records(self):
+    """Yields rows as OrderedDicts of raw values, without formatting."""
+    for row in zip(*self._cells):
+      yield OrderedDict(zip(self.columns, row))
+
+  def to_dicts(self):
+    """Rows as OrderedDicts of colored strings, for tabulate."""
+    codes = _color_codes()
+    rows = []
+    for row in range(self._row_count):
+      values = []
+      for index, name in enumerate(self.columns):
+        value = self._cells[index][row]
+        cell_color = self.color(name, row)
+        if cell_color is not None:
+          value = codes[cell_color] + self._format(value) + codes[None]
+        values.append((name, value))
+      rows.append(OrderedDict(values))
+    return rows
+
+class StreamingTable(object):
+  """Writes rows as they come in, with fixed column widths.
+
+  Unlike Table, this doesn't need all rows up front to compute widths, so
+  rows can be printed as soon as a page arrives and then dropped. Values wider
+  than their column push the rest of the row to the right.
+  """
+
+  def __init__(self, columns, out=None, accuracy=4):
+    """Initializer.
+
+    Args:
+      columns: List of (name, width) tuples.
+      out: File to write to. Defaults to stdout.
+      accuracy: Number of digits after the dot for floats and Decimals.
+    """
+    self._columns = columns
+    # None for sys.stdout, looked up with every line: it's replaced by
+    # colorama's wrapper once the first colored cell loads the codes.
+    self._out = out
+    self._float_format = '%.' + str(accuracy) + 'f'
+    self._decimal_format = '.%df' % accuracy
+    self._header_written = False
+    self._codes = None
+    self.row_count = 0
+
+  def _stream(self):
+    return self._out or sys.stdout
+
+  def _write_line(self, cells):
+    self._stream().write('  '.join(cells).rstrip() + '\n')
+
+  def write_header(self):
+    self._write_line([_pad(name, width, False)
+                      for name, width in self._columns])
+    self._write_line(['-' * width for _, width in self._columns])
+    self._header_written = True
+
+  def write_row(self, values, colors=None):
+    """Writes one row. Values are in column order; numbers are right aligned.
+
+    Args:
+      values: Values in column order.
+      colors: Optional sequence with GREEN, RED or None for each column.
+    """
+    if not self._header_written:
+      self.write_header()
+    cells = []
+    for index, ((_, width), value) in enumerate(zip(self._columns, values)):
+      if isinstance(value, float):
+        cell = _pad(self._float_format % value, width, True)
+      elif isinstance(value, Decimal):
+        cell = _pad(format(value, self._decimal_format), width, True)
+      else:
+        cell = _pad(str(value), width, False)
+      if colors and colors[index] is not None:
+        if self._codes is None:
+          self._codes = _color_codes()
+        cell = self._codes[colors[index]] + cell + self._codes[None]
+      cells.append(cell)
+    self._write_line(cells)
+    self.row_count += 1
+    self._stream().flush()
+
+# Moves the cursor to the top left and clears the screen.
+CLEAR_SCREEN = '\x1b[H\x1b[J'
+
+def _move_to(line, column):
+  """Escape code moving the cursor to a 0-based line and column."""
+  return '\x1b[%d;%dH' % (line + 1, column + 1)
+
+def _terminal_lines():
+  """Height of the terminal in lines, or None if it's not known."""
+  try:
+    from shutil import get_terminal_size
+  except ImportError:
+    # Python 2.
+    lines = os.environ.get('LINES', '')
+    return int(lines) if lines.isdigit() else None
+  return get_terminal_size().lines
+
+def _change_color(before, after):
+  """GREEN if a number went up, RED if it went down, else None."""
+  if not (_is_number(before) and _is_number(after)):
+    return None
+  if float(after) > float(before):
+    return GREEN
+  if float(after) < float(before):
+    return RED
+  return None
+
+class Screen(object):
+  """Redraws a table in place on a terminal, writing only what changed.
+
+  The first frame, and any frame whose columns, column widths or number of
+  rows differ from the last one, is drawn in full on a cleared screen.
+  Otherwise the cursor is moved to each cell that changed and only that cell
+  is written: flashed green if its number went up or red if it went down.
+  Flashed cells get their own color back on the next frame.
+
+  Cells are found by their line on the screen, so a frame as tall as the
+  terminal or taller, which scrolls it, is always drawn in full.
+  """
+
+  def __init__(self, out=None, lines=None):
+    """Initializer.
+
+    Args:
+      out: Stream to draw on. Defaults to stdout.
+      lines: Height of the terminal. Read from the terminal with every frame
+          if None, as it can be resized.
+    """
+    if out is None:
+      # Frames are colored; have colorama wrap sys.stdout before it's kept.
+      get_colorama()
+    self._out = out or sys.stdout
+    self._lines = lines
+    self._shape = None
+    self._texts = None
+    self._footer = None
+    self._flashed = set()
+
+  def draw(self, table, footer=''):
+    """Draws a frame.
+
+    Args:
+      table: Table to show.
+      footer: Text shown under the table, e.g. a total.
+    """
+    texts, widths, right = table._layout()
+    footer_lines = footer.split('\n')
+    shape = (table.columns, widths, len(table), len(footer_lines))
+    lines = self._lines if self._lines is not None else _terminal_lines()
+    # Header and separator lines, the rows and the footer.
+    scrolls = lines is not None and 2 + len(table) + len(footer_lines) >= lines
+    if shape != self._shape or scrolls:
+      self._out.write(CLEAR_SCREEN)
+      table.render(self._out)
+      self._out.write(footer)
+      self._flashed = set()
+    else:
+      self._out.write(self._changes(table, texts, widths, right,
+                                    footer_lines))
+    self._shape, self._texts, self._footer = shape, texts, footer_lines
+    self._out.flush()
+
+  def _changes(self, table, texts, widths, right, footer_lines):
+    """Escape codes and text rewriting the cells that changed."""
+    codes = _color_codes()
+    parts, flashed = [], set()
+    offset = 0
+    for index, width in enumerate(widths):
+      for row, text in enumerate(texts[index]):
+        before = self._texts[index][row]
+        if text != before:
+          cell_color = (_change_color(before, text) or
+                        table._cell_color(index, row))
+          flashed.add((index, row))
+        elif (index, row) in self._flashed:
+          cell_color = table._cell_color(index, row)
+        else:
+          continue
+        cell = _pad(text, width, right[index])
+        if cell_color is not None:
+          cell = codes[cell_color] + cell + codes[None]
+        parts.append(_move_to(row + 2, offset) + cell)
+      offset += width + 2
+    # Header and separator lines come first, then the rows.
+    top = len(table) + 2
+    for line, (text, before) in enumerate(zip(footer_lines, self._footer)):
+      if text != before:
+        # Clear the rest of the line in case the new text is shorter.
+        parts.append(_move_to(top + line, 0) + text + '\x1b[K')
+    if parts:
+      # Leave the cursor under everything drawn.
+      parts.append(_move_to(top + len(footer_lines) - 1, 0))
+    self._flashed = flashed
+    return ''.join(parts)
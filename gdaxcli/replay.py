@@ -0,0 +1,416 @@
+"""Replays a recorded feed log over a websocket on localhost.
+
+A client subscribes as it would to the exchange's feed, e.g. with
+`gdaxcli watch --url ws://127.0.0.1:<port>`, and gets the recorded messages
+of the products it subscribed to, paced by their recorded arrival times:
+at the recorded rate, faster or slower by a factor, or as fast as the socket
+takes them. Frames are written in batches while no pacing sleep is due, so
+a replay at maximum speed costs about one send per batch, not per message.
+A client resyncing a book gets a snapshot of it as replayed so far, so a
+gap in the recording doesn't leave the book empty for the rest of the replay.
+
+The server speaks just enough of RFC 6455 for websocket-client: unmasked
+frames out, masked or not in, no extensions.
+"""
+
+import base64
+import collections
+import hashlib
+import json
+import logging
+import socket
+import struct
+import threading
+import time
+
+from gdaxcli import feedlog
+
+_WS_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+# Bytes of frames buffered before they're sent.
+SEND_BATCH = 64 * 1024
+
+# Smallest pacing delay worth sleeping for, in seconds. Shorter waits are
+# added up until they are.
+MIN_SLEEP = 0.001
+
+# Seconds between checks for requests once the replay is over.
+REQUEST_POLL = 0.05
+
+# Raw book messages of a product kept before they're folded into its book.
+COMPACT_MESSAGES = 10000
+
+def _recv_exactly(conn, size):
+  data = b''
+  while len(data) < size:
+    chunk = conn.recv(size - len(data))
+    if not chunk:
+      raise EOFError()
+    data += chunk
+  return data
+
+def ws_handshake(conn):
+  """Reads the client's upgrade request and accepts it."""
+  request = b''
+  while b'\r\n\r\n' not in request:
+    chunk = conn.recv(4096)
+    if not chunk:
+      raise EOFError()
+    request += chunk
+  key = None
+  for line in request.decode('latin-1').split('\r\n'):
+    if line.lower().startswith('sec-websocket-key:'):
+      key = line.split(':', 1)[1].strip()
+  accept = base64.b64encode(
+      hashlib.sha1((key + _WS_GUID).encode('ascii')).digest()).decode('ascii')
+  conn.sendall(('HTTP/1.1 101 Switching Protocols\r\n'
+                'Upgrade: websocket\r\n'
+                'Connection: Upgrade\r\n'
+                'Sec-WebSocket-Accept: %s\r\n\r\n' % accept).encode('ascii'))
+
+def ws_recv(conn):
+  """Reads one frame. Returns (opcode, payload bytes)."""
+  first, second = struct.unpack('!BB', _recv_exactly(conn, 2))
+  length = second & 0x7f
+  if length == 126:
+    length = struct.unpack('!H', _recv_exactly(conn, 2))[0]
+  elif length == 127:
+    length = struct.unpack('!Q', _recv_exactly(conn, 8))[0]
+  mask = _recv_exactly(conn, 4) if second & 0x80 else None
+  payload = bytearray(_recv_exactly(conn, length))
+  if mask:
+    mask = bytearray(mask)
+    for i in range(length):
+      payload[i] ^= mask[i % 4]
+  return first & 0x0f, bytes(payload)
+
+def ws_frame(text, opcode=0x1):
+  """Returns one unmasked frame of text or bytes."""
+  payload = text.encode('utf-8') if not isinstance(text, bytes) else text
+  length = len(payload)
+  if length < 126:
+    header = struct.pack('!BB', 0x80 | opcode, length)
+  elif length < (1 << 16):
+    header = struct.pack('!BBH', 0x80 | opcode, 126, length)
+  else:
+    header = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+  return header + payload
+
+def ws_send(conn, text, opcode=0x1):
+  """Sends one unmasked frame."""
+  conn.sendall(ws_frame(text, opcode))
+
+def parse_speed(value):
+  """Parses a --speed value: a positive factor, or max for no pacing.
+
+  Returns:
+    The factor as a float, or None for max.
+
+  Raises:
+    ValueError: if value is neither.
+  """
+  if value in (None, 'max'):
+    return None
+  speed = float(value)
+  if speed <= 0:
+    raise ValueError('Speed must be positive: %s' % value)
+  return speed
+
+def paced(messages, speed, clock=time.time):
+  """Yields (arrival time, payload, wait) from messages, where wait is the
+  seconds to sleep before sending the payload to keep to the recorded pace
+  scaled by speed. With speed None, wait is always 0.
+
+  The pace is kept against the clock from the first message, so time spent
+  sending doesn't add up into drift.
+  """
+  first = started = None
+  for received_at, payload in messages:
+    wait = 0
+    if speed is not None:
+      if first is None:
+        first, started = received_at, clock()
+      wait = started + (received_at - first) / speed - clock()
+    yield received_at, payload, max(wait, 0)
+
+def _string_field(payload, name):
+  """A string field of a raw message, without parsing all of it."""
+  start = payload.find(b'"' + name + b'"')
+  if start < 0:
+    return None
+  start = payload.find(b'"', payload.find(b':', start) + 1)
+  end = payload.find(b'"', start + 1)
+  return payload[start + 1:end].decode('utf-8')
+
+def _product_id(payload):
+  """Product id of a raw message, without parsing all of it."""
+  return _string_field(payload, b'product_id')
+
+class _Books(object):
+  """Level 2 books of the messages sent on a connection, to answer a
+  resubscribe with a snapshot of where the replay is.
+
+  Snapshot and update messages are kept raw and only parsed when a snapshot
+  is asked for, or once COMPACT_MESSAGES of a product piled up.
+  """
+
+  def __init__(self):
+    # Product id -> {'buy': {float price: [price, size]}, 'sell': ...,
+    # 'sequence': ...}, as of the messages folded in.
+    self._books = {}
+    # Product id -> raw messages not folded in yet.
+    self._pending = {}
+
+  def add(self, product_id, payload):
+    type_ = _string_field(payload, b'type')
+    if type_ == 'snapshot':
+      self._books.pop(product_id, None)
+      self._pending[product_id] = [payload]
+    elif type_ == 'l2update':
+      pending = self._pending.setdefault(product_id, [])
+      pending.append(payload)
+      if len(pending) >= COMPACT_MESSAGES:
+        self._fold(product_id)
+
+  def _fold(self, product_id):
+    book = self._books.get(product_id)
+    for payload in self._pending.pop(product_id, []):
+      message = json.loads(payload.decode('utf-8'))
+      if message['type'] == 'snapshot':
+        book = {'sequence': message.get('sequence')}
+        for side, key in (('buy', 'bids'), ('sell', 'asks')):
+          book[side] = dict((float(price), [price, size])
+                            for price, size in message[key])
+        continue
+      if book is None:
+        # Updates from before the first snapshot sent.
+        continue
+      for side, price, size in message['changes']:
+        if float(size) == 0:
+          book[side].pop(float(price), None)
+        else:
+          book[side][float(price)] = [price, size]
+      book['sequence'] = message.get('sequence', book['sequence'])
+    if book is not None:
+      self._books[product_id] = book
+
+  def snapshot(self, product_id):
+    """Returns the raw snapshot message of a product's book as sent so far,
+    or None if no snapshot of it was sent."""
+    self._fold(product_id)
+    book = self._books.get(product_id)
+    if book is None:
+      return None
+    return json.dumps({
+        'type': 'snapshot',
+        'product_id': product_id,
+        'sequence': book['sequence'],
+        'bids': [book['buy'][price] for price in sorted(book['buy'],
+                                                        reverse=True)],
+        'asks': [book['sell'][price] for price in sorted(book['sell'])],
+    })
+
+class _Connection(object):
+  """A client of the replay: its subscriptions, requests and sent books."""
+
+  def __init__(self, conn, product_ids):
+    """Initializer.
+
+    Args:
+      conn: Socket of the client.
+      product_ids: Products it subscribed to; all if empty.
+    """
+    self.conn = conn
+    # None for all products.
+    self.product_ids = set(product_ids) if product_ids else None
+    # Products whose books are kept: the ones subscribed to at any time.
+    self._known = set(product_ids) if product_ids else None
+    self._books = _Books()
+    # Requests read from the client, answered between messages.
+    self.requests = collections.deque()
+    self._pending = []
+    self._size = 0
+    self.closed = False
+
+  def wants(self, product_id):
+    return (self.product_ids is None or product_id is None or
+            product_id in self.product_ids)
+
+  def track(self, product_id, payload):
+    """Keeps a message to be able to send a snapshot of its book."""
+    if product_id is not None and (self._known is None or
+                                   product_id in self._known):
+      self._books.add(product_id, payload)
+
+  def queue(self, frame):
+    self._pending.append(frame)
+    self._size += len(frame)
+    if self._size >= SEND_BATCH:
+      self.flush()
+
+  def flush(self):
+    if self._pending:
+      self.conn.sendall(b''.join(self._pending))
+      self._pending, self._size = [], 0
+
+  def answer(self):
+    """Applies the requests queued: subscribe, unsubscribe, and close,
+    queued by _read_requests when the client closes. A product
+    subscribed to again gets a snapshot of its book as sent so far, as the
+    exchange sends one."""
+    while self.requests:
+      message = self.requests.popleft()
+      requested = set(message.get('product_ids') or [])
+      if message.get('type') == 'close':
+        self.flush()
+        ws_send(self.conn, b'', opcode=0x8)
+        self.closed = True
+        return
+      if message.get('type') == 'unsubscribe':
+        if self.product_ids is not None:
+          self.product_ids -= requested
+      elif message.get('type') == 'subscribe':
+        if self.product_ids is not None:
+          self.product_ids |= requested
+          self._known |= requested
+        for product_id in sorted(requested):
+          snapshot = self._books.snapshot(product_id)
+          if snapshot is not None:
+            self.queue(ws_frame(snapshot))
+
+class ReplayServer(object):
+  """Serves a feed log to websocket clients, each from the start.
+
+  A client resyncing a book, by unsubscribing and subscribing to its product
+  again, gets a snapshot of the book as replayed so far.
+
+  Usage:
+    with ReplayServer('eth.log', speed=10) as server:
+      client = gdax_utils.Client(ws_url=server.url)
+  """
+
+  def __init__(self, path, speed=1.0, start=None, end=None, port=0):
+    """Initializer.
+
+    Args:
+      path: Log written by feedlog.LogWriter.
+      speed: Factor of the recorded pace to replay at; None for max.
+      start, end: Only replay messages received in [start, end), in seconds
+          since the epoch.
+      port: Port to listen on; 0 picks a free one.
+    """
+    self.path = path
+    self.speed = speed
+    self.start_time = start
+    self.end_time = end
+    self.sent = 0
+    self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    self._sock.bind(('127.0.0.1', port))
+    self._sock.listen(5)
+    self.url = 'ws://127.0.0.1:%d' % self._sock.getsockname()[1]
+    self._running = False
+    self._lock = threading.Lock()
+
+  def start(self):
+    self._running = True
+    thread = threading.Thread(target=self._accept)
+    thread.daemon = True
+    thread.start()
+    return self
+
+  def stop(self):
+    self._running = False
+    self._sock.close()
+
+  def __enter__(self):
+    return self.start()
+
+  def __exit__(self, *args):
+    self.stop()
+
+  def _accept(self):
+    while self._running:
+      try:
+        conn, _ = self._sock.accept()
+      except (socket.error, OSError):
+        return
+      thread = threading.Thread(target=self._serve, args=(conn,))
+      thread.daemon = True
+      thread.start()
+
+  def _serve(self, conn):
+    try:
+      ws_handshake(conn)
+      product_ids = None
+      while product_ids is None:
+        opcode, payload = ws_recv(conn)
+        if opcode == 0x8:
+          ws_send(conn, b'', opcode=0x8)
+          return
+        if opcode != 0x1:
+          continue
+        message = json.loads(payload.decode('utf-8'))
+        if message.get('type') == 'subscribe':
+          product_ids = message.get('product_ids') or []
+      client = _Connection(conn, product_ids)
+      reader = threading.Thread(target=_read_requests, args=(client,))
+      reader.daemon = True
+      reader.start()
+      count = self.stream(client)
+      logging.info('Replayed %d messages', count)
+      # Stay connected until the client leaves, so it keeps the final state
+      # instead of reconnecting and replaying from the start.
+      while self._running and not client.closed:
+        client.answer()
+        client.flush()
+        time.sleep(REQUEST_POLL)
+    except (EOFError, socket.error, OSError, ValueError):
+      pass
+    finally:
+      conn.close()
+
+  def stream(self, client):
+    """Sends the log's messages for the client's products to it.
+
+    Returns:
+      Number of messages sent.
+    """
+    count = 0
+    with feedlog.LogReader(self.path) as reader:
+      messages = reader.messages(self.start_time, self.end_time)
+      for _, payload, wait in paced(messages, self.speed):
+        if client.requests:
+          client.answer()
+        if not self._running or client.closed:
+          break
+        product_id = _product_id(payload)
+        client.track(product_id, payload)
+        if not client.wants(product_id):
+          continue
+        if wait >= MIN_SLEEP:
+          client.flush()
+          time.sleep(wait)
+        client.queue(ws_frame(payload))
+        count += 1
+      if not client.closed:
+        client.answer()
+        client.flush()
+    with self._lock:
+      self.sent += count
+    return count
+
+def _read_requests(client):
+  """Queues the client's text messages until it closes the connection, then
+  a close request."""
+  try:
+    while True:
+      opcode, payload = ws_recv(client.conn)
+      if opcode == 0x8:
+        return
+      if opcode == 0x1:
+        client.requests.append(json.loads(payload.decode('utf-8')))
+  except (EOFError, socket.error, OSError, ValueError):
+    pass
+  finally:
+    client.requests.append({'type': 'close'})
@@ -0,0 +1,133 @@
+"""Order rules of each product, checked locally before an order is sent.
+
+The product catalog gives each product's size limits, increments and trading
+status. RulesIndex parses them once into Decimals keyed by product id, so an
+order is checked, and its size rounded to the product's increment, without a
+request or a scan of the catalog. An order the exchange would reject doesn't
+cost a request or a token from the rate limiter.
+"""
+
+from collections import namedtuple
+import decimal
+import string
+import time
+
+from gdaxcli import exceptions
+from gdaxcli import numeric
+
+ORDER_TYPES = frozenset(['market', 'limit', 'stop'])
+SIDES = frozenset(['buy', 'sell'])
+
+_PRICE_START = frozenset(string.digits + '+-')
+
+Rules = namedtuple('Rules', [
+    'product_id', 'min_size', 'max_size', 'base_increment',
+    'quote_increment', 'status', 'trading_disabled', 'cancel_only',
+    'limit_only', 'post_only'])
+
+def _decimal_or_none(value):
+  if value in (None, ''):
+    return None
+  return numeric.to_decimal(value)
+
+def _invalid(reason, message, *args):
+  return exceptions.InvalidOrderError(message % args, reason=reason)
+
+def parse_rules(product):
+  """Returns the Rules of a catalog product. Missing fields aren't checked."""
+  return Rules(
+      product_id=product['id'],
+      min_size=_decimal_or_none(product.get('base_min_size')),
+      max_size=_decimal_or_none(product.get('base_max_size')),
+      base_increment=_decimal_or_none(product.get('base_increment')),
+      quote_increment=_decimal_or_none(product.get('quote_increment')),
+      status=product.get('status'),
+      trading_disabled=bool(product.get('trading_disabled')),
+      cancel_only=bool(product.get('cancel_only')),
+      limit_only=bool(product.get('limit_only')),
+      post_only=bool(product.get('post_only')))
+
+class RulesIndex(object):
+  """Rules of every product in the catalog, by product id."""
+
+  def __init__(self, products):
+    self._rules = dict((product['id'], parse_rules(product))
+                       for product in products)
+    self.created_at = time.time()
+
+  def __contains__(self, product_id):
+    return product_id in self._rules
+
+  def age(self):
+    """Seconds since the index was built."""
+    return time.time() - self.created_at
+
+  def get(self, product_id):
+    """Returns the Rules of a product.
+
+    Raises:
+      InvalidOrderError: if the product isn't listed.
+    """
+    rules = self._rules.get(product_id)
+    if rules is None:
+      raise _invalid('product', 'Unknown product: %s', product_id)
+    return rules
+
+  def check(self, order_type, side, product_id, size, price=None):
+    """Checks an order against the product's rules.
+
+    Args:
+      order_type: One of market, limit or stop.
+      side: One of buy or sell.
+      product_id: Product id, uppercased.
+      size: Size in the base currency, as a string.
+      price: Absolute or relative price, for limit and stop orders.
+
+    Returns:
+      The size to send: rounded down to the product's base_increment if it
+      has one, otherwise size as given.
+
+    Raises:
+      InvalidOrderError: naming the broken rule in its reason, one of
+          order_type, side, product, trading, market_orders, size, min_size,
+          max_size or price.
+    """
+    if order_type not in ORDER_TYPES:
+      raise _invalid('order_type', 'Invalid order type: %s', order_type)
+    if side not in SIDES:
+      raise _invalid('side', 'Invalid side: %s', side)
+    rules = self.get(product_id)
+    if (rules.trading_disabled or rules.cancel_only or
+        rules.status not in (None, 'online')):
+      raise _invalid('trading', '%s is not trading now (status: %s)',
+                     product_id, rules.status or 'cancel only')
+    if order_type == 'market' and (rules.limit_only or rules.post_only):
+      raise _invalid('market_orders', '%s only takes limit orders',
+                     product_id)
+
+    try:
+      amount = numeric.to_decimal(size)
+    except (decimal.InvalidOperation, TypeError, ValueError):
+      raise _invalid('size', 'Invalid size: %s', size)
+    if not amount.is_finite() or amount <= 0:
+      raise _invalid('size', 'Invalid size: %s', size)
+    if rules.base_increment:
+      amount = numeric.round_down(amount, rules.base_increment)
+      size = numeric.to_str(amount)
+    if rules.min_size is not None and amount < rules.min_size:
+      raise _invalid('min_size', 'Size %s is below the minimum of %s for %s',
+                     size, numeric.to_str(rules.min_size), product_id)
+    if rules.max_size is not None and amount > rules.max_size:
+      raise _invalid('max_size', 'Size %s is above the maximum of %s for %s',
+                     size, numeric.to_str(rules.max_size), product_id)
+
+    if order_type != 'market':
+      if not price or price[0] not in _PRICE_START:
+        raise _invalid('price', 'Invalid price: %s', price)
+      try:
+        value = numeric.to_decimal(price)
+      except decimal.InvalidOperation:
+        raise _invalid('price', 'Invalid price: %s', price)
+      if not value.is_finite() or (price[0] in string.digits and value <= 0):
+        raise _invalid('price', 'Invalid price: %s', price)
+    return size
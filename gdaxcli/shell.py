@@ -0,0 +1,222 @@
+"""Interactive shell running gdaxcli commands on one warm Client.
+
+The client, its connection pool and the product catalog stay in memory
+between commands. Products priced in the session are followed on the
+websocket feed, so later orders read their prices from its order books. While
+the prompt is idle, a background thread lists open orders again and refreshes
+the prices of products used in the session the feed has no price for yet, so
+order cancels, completion and relative prices don't wait on a request.
+"""
+
+from __future__ import print_function
+
+import cmd
+import logging
+import os
+import shlex
+import threading
+import traceback
+
+from gdaxcli import exceptions
+
+HISTORY_PATH = '~/.gdaxcli_history'
+
+# Seconds between background refreshes.
+REFRESH_INTERVAL = 4
+
+# Seconds to reuse a price refreshed in the background. A little more than
+# REFRESH_INTERVAL, so products in use are always fresh.
+PRICE_TTL = 6
+
+# Most products to keep refreshing; public endpoints allow 3 requests a second.
+MAX_WATCHED_PRODUCTS = 6
+
+# Most products to follow on the websocket feed.
+MAX_FEED_PRODUCTS = 6
+
+COMMANDS = ['products', 'ticker', 'watch', 'record', 'replay', 'balance',
+            'history', 'fills', 'stats', 'candles', 'orders', 'order', 'sync',
+            'help', 'exit']
+
+ORDER_SUBCOMMANDS = ['list', 'batch', 'cancel', 'latency', 'limit', 'market',
+                     'stop']
+
+class Refresher(object):
+  """Refreshes open orders and watched prices while no command runs."""
+
+  def __init__(self, client, busy, interval=REFRESH_INTERVAL):
+    """Initializer.
+
+    Args:
+      client: The shell's gdax_utils.Client.
+      busy: Lock held while a command runs.
+      interval: Seconds between refreshes.
+    """
+    self._client = client
+    self._busy = busy
+    self._interval = interval
+    self._stopped = threading.Event()
+    self.product_ids = []
+
+  def watch(self, product_ids):
+    """Moves product_ids to the front of the products to refresh."""
+    for product_id in product_ids:
+      if product_id in self.product_ids:
+        self.product_ids.remove(product_id)
+      self.product_ids.insert(0, product_id)
+    del self.product_ids[MAX_WATCHED_PRODUCTS:]
+
+  def refresh(self):
+    """Refreshes once, unless a command is running."""
+    if not self._busy.acquire(False):
+      return
+    try:
+      self._client.refresh_open_orders()
+      if self.product_ids:
+        self._client.refresh_prices(self.product_ids)
+    except Exception as e:
+      logging.debug('Background refresh failed: %s', e)
+    finally:
+      self._busy.release()
+
+  def _run(self):
+    while not self._stopped.wait(self._interval):
+      self.refresh()
+
+  def start(self):
+    thread = threading.Thread(target=self._run)
+    thread.daemon = True
+    thread.start()
+    return self
+
+  def stop(self):
+    self._stopped.set()
+
+class Shell(cmd.Cmd):
+  """gdaxcli commands at a prompt, with history and tab completion."""
+
+  prompt = 'gdax> '
+  intro = 'gdaxcli shell. Type help for commands, exit or Ctrl-D to quit.'
+
+  def __init__(self, client, refresh_interval=REFRESH_INTERVAL):
+    cmd.Cmd.__init__(self)
+    self.client = client
+    client.price_ttl = PRICE_TTL
+    client.max_feed_products = MAX_FEED_PRODUCTS
+    self._busy = threading.Lock()
+    self.refresher = Refresher(client, self._busy, refresh_interval)
+
+  def emptyline(self):
+    pass
+
+  def default(self, line):
+    # Imported here to avoid a circular import; __main__ imports this module.
+    from gdaxcli import __main__ as cli
+    try:
+      args = shlex.split(line)
+    except ValueError as e:
+      print('Error: %s' % e)
+      return
+    if args[0] in ('exit', 'quit', 'EOF'):
+      return True
+    if args[0] == 'shell':
+      print('Already in the shell')
+      return
+    product_ids = self._product_ids_in(args)
+    with self._busy:
+      try:
+        cli.run(self.client, args)
+      except SystemExit:
+        pass
+      except exceptions.Error as e:
+        print(e)
+      except KeyboardInterrupt:
+        print()
+      except Exception:
+        traceback.print_exc()
+    self.refresher.watch(product_ids)
+
+  def do_help(self, arg):
+    self.default('help')
+
+  def do_EOF(self, arg):
+    print()
+    return True
+
+  def _product_ids_in(self, args):
+    try:
+      known = set(self.client.product_ids())
+    except Exception:
+      return []
+    return [arg.upper() for arg in args if arg.upper() in known]
+
+  def completenames(self, text, *ignored):
+    return [name for name in COMMANDS if name.startswith(text)]
+
+  def completedefault(self, text, line, begidx, endidx):
+    words = line[:begidx].split()
+    if words == ['order']:
+      candidates = ORDER_SUBCOMMANDS
+    elif words[:2] == ['order', 'cancel']:
+      candidates = self.client.open_order_ids()
+    else:
+      try:
+        candidates = self.client.product_ids()
+      except Exception:
+        return []
+      if text.islower():
+        candidates = [product_id.lower() for product_id in candidates]
+    return [c for c in candidates if c.startswith(text)]
+
+  def complete(self, text, state):
+    # cmd only completes arguments of do_ commands; all of ours go through
+    # default, so route argument completion there too.
+    if state == 0:
+      import readline
+      line = readline.get_line_buffer()
+      begidx = readline.get_begidx()
+      if line[:begidx].strip():
+        self.completion_matches = self.completedefault(
+            text, line, begidx, readline.get_endidx())
+      else:
+        self.completion_matches = self.completenames(text)
+    try:
+      return self.completion_matches[state]
+    except IndexError:
+      return None
+
+def _load_history(path):
+  try:
+    import readline
+  except ImportError:
+    return None
+  # Dashes in order ids and product ids are part of the word.
+  readline.set_completer_delims(' \t\n')
+  try:
+    readline.read_history_file(path)
+  except (IOError, OSError):
+    pass
+  return readline
+
+def run(client, history_path=HISTORY_PATH):
+  """Runs the shell until exit."""
+  path = os.path.expanduser(history_path)
+  readline = _load_history(path)
+  shell = Shell(client)
+  shell.refresher.start()
+  try:
+    while True:
+      try:
+        shell.cmdloop()
+        break
+      except KeyboardInterrupt:
+        print()
+        shell.intro = None
+  finally:
+    shell.refresher.stop()
+    client.stop_feed()
+    if readline is not None:
+      try:
+        readline.write_history_file(path)
+      except (IOError, OSError):
+        pass
@@ -0,0 +1,41 @@
+"""Unit tests for batch."""
+
+import unittest
+try:
+  from StringIO import StringIO
+except ImportError:
+  from io import StringIO
+
+from .. import batch
+
+class TestReadOrderSpecs(unittest.TestCase):
+
+  def testCsv(self):
+    f = StringIO('order_type,side,product,size,price\n'
+                 '# ladder\n'
+                 'limit,buy,eth-usd,0.1,280.50\n'
+                 '\n'
+                 'market,sell,BTC-USD,0.01\n')
+    self.assertListEqual(batch.read_order_specs(f), [
+        {'order_type': 'limit', 'side': 'buy', 'product': 'eth-usd',
+         'size': '0.1', 'price': '280.50'},
+        {'order_type': 'market', 'side': 'sell', 'product': 'BTC-USD',
+         'size': '0.01', 'price': ''},
+    ])
+
+  def testJsonLines(self):
+    f = StringIO('{"order_type": "limit", "side": "buy", "product": "ETH-USD",'
+                 ' "size": "0.1", "price": "-2"}\n'
+                 '{"order_type": "market", "side": "sell", "product": "ETH-USD",'
+                 ' "size": 1}\n')
+    specs = batch.read_order_specs(f)
+    self.assertEqual(specs[0]['price'], '-2')
+    self.assertEqual(specs[1]['size'], '1')
+    self.assertEqual(specs[1]['price'], '')
+
+  def testInvalid(self):
+    with self.assertRaises(ValueError):
+      batch.read_order_specs(StringIO('limit,buy\n'))
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,52 @@
+"""Unit tests for cache."""
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import mock
+
+from .. import cache
+
+PRODUCTS = [{'id': 'ETH-USD', 'base_min_size': '0.01',
+             'quote_increment': '0.01'}]
+
+class TestProductCache(unittest.TestCase):
+
+  def setUp(self):
+    self.tmp_dir = tempfile.mkdtemp()
+    self.path = os.path.join(self.tmp_dir, 'products.json')
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp_dir)
+
+  def testMissing(self):
+    self.assertIsNone(cache.ProductCache(self.path, ttl=60).get())
+
+  def testRoundTrip(self):
+    product_cache = cache.ProductCache(self.path, ttl=60)
+    product_cache.set(PRODUCTS)
+    self.assertListEqual(product_cache.get(), PRODUCTS)
+
+  def testExpired(self):
+    product_cache = cache.ProductCache(self.path, ttl=60)
+    product_cache.set(PRODUCTS)
+    with mock.patch('time.time', return_value=time.time() + 61):
+      self.assertIsNone(product_cache.get())
+
+  def testInvalidate(self):
+    product_cache = cache.ProductCache(self.path, ttl=60)
+    product_cache.set(PRODUCTS)
+    product_cache.invalidate()
+    self.assertIsNone(product_cache.get())
+    product_cache.invalidate()
+
+  def testCorrupt(self):
+    with open(self.path, 'w') as f:
+      f.write('{not json')
+    self.assertIsNone(cache.ProductCache(self.path, ttl=60).get())
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,76 @@
+"""Unit tests for candles."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from .. import candles
+
+class TestCandleStore(unittest.TestCase):
+
+  def setUp(self):
+    self.tmp_dir = tempfile.mkdtemp()
+    self.store = candles.CandleStore(self.tmp_dir)
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp_dir)
+
+  def _candles(self, times):
+    return candles.to_array([[t, 1, 2, 1.5, 1.75, 10] for t in times])
+
+  def testWriteAndRead(self):
+    self.store.write('ETH-USD', 60, self._candles([180, 60, 120]), [(60, 240)])
+    self.store.write('ETH-USD', 60, self._candles([300, 240]), [(240, 360)])
+    self.assertEqual(os.path.getsize(os.path.join(self.tmp_dir,
+                                                  'ETH-USD-60.bin')),
+                     5 * candles.CANDLE_DTYPE.itemsize)
+    read = self.store.read('ETH-USD', 60, 120, 300)
+    self.assertIsInstance(read, np.memmap)
+    self.assertListEqual(read['time'].tolist(), [120, 180, 240])
+    self.assertListEqual(self.store.fetched('ETH-USD', 60), [(60, 360)])
+
+  def testMergeEarlierCandles(self):
+    self.store.write('ETH-USD', 60, self._candles([240, 300]), [(240, 360)])
+    self.store.write('ETH-USD', 60, self._candles([0, 60, 240]), [(0, 120)])
+    self.assertListEqual(self.store.read('ETH-USD', 60)['time'].tolist(),
+                         [0, 60, 240, 300])
+    self.assertListEqual(self.store.fetched('ETH-USD', 60),
+                         [(0, 120), (240, 360)])
+
+  def testMissing(self):
+    self.store.write('ETH-USD', 60, self._candles([]), [(120, 240)])
+    self.assertListEqual(self.store.missing('ETH-USD', 60, 30, 400),
+                         [(0, 120), (240, 420)])
+    self.assertListEqual(self.store.missing('ETH-USD', 60, 120, 240), [])
+    self.assertListEqual(self.store.missing('BTC-USD', 60, 0, 60), [(0, 60)])
+
+  def testWindows(self):
+    size = 60 * candles.MAX_CANDLES
+    self.assertListEqual(candles.windows([(0, size + 60)], 60),
+                         [(0, size), (size, size + 60)])
+
+  def testBackfillOnlyFetchesGaps(self):
+    calls = []
+    def fetch(start, end):
+      calls.append((start, end))
+      # Newest first, end inclusive, like the API.
+      return [[t, 1, 2, 1.5, 1.75, 10] for t in range(end, start - 1, -60)]
+    end = 60 * candles.MAX_CANDLES * 3
+    self.assertEqual(candles.backfill(self.store, fetch, 'ETH-USD', 60,
+                                      0, end // 3, 4),
+                     (1, candles.MAX_CANDLES))
+    self.assertEqual(candles.backfill(self.store, fetch, 'ETH-USD', 60,
+                                      0, end, 4),
+                     (2, 2 * candles.MAX_CANDLES))
+    self.assertEqual(len(calls), 3)
+    self.assertEqual(candles.backfill(self.store, fetch, 'ETH-USD', 60,
+                                      0, end, 4), (0, 0))
+    times = self.store.read('ETH-USD', 60)['time']
+    self.assertEqual(len(times), 3 * candles.MAX_CANDLES)
+    self.assertTrue((np.diff(times) == 60).all())
+
+if __name__ == '__main__':
+  unittest.main()
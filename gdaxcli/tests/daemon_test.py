@@ -0,0 +1,64 @@
+"""Unit tests for daemon."""
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+import mock
+
+from .. import daemon
+
+class TestCanServe(unittest.TestCase):
+
+  def testCommands(self):
+    self.assertTrue(daemon.can_serve(['ticker', 'ETH-USD']))
+    self.assertTrue(daemon.can_serve(['orders']))
+    self.assertTrue(daemon.can_serve(['order', 'list']))
+    self.assertFalse(daemon.can_serve(['orders', 'cancel', 'ETH-USD']))
+    self.assertFalse(daemon.can_serve(['order', 'cancel', 'abc']))
+    self.assertFalse(daemon.can_serve(['order', 'limit', 'buy', 'ETH-USD']))
+    self.assertFalse(daemon.can_serve(['ticker', '--watch', '5']))
+
+class TestDaemon(unittest.TestCase):
+
+  def setUp(self):
+    self.tmp_dir = tempfile.mkdtemp()
+    self.path = os.path.join(self.tmp_dir, 'gdaxcli.sock')
+    self.client = mock.Mock()
+    self.client.ticker.side_effect = lambda products, watch: sys.stdout.write(
+        'ticker %s\n' % ','.join(products))
+    self.thread = threading.Thread(
+        target=daemon.serve, kwargs={'path': self.path, 'client': self.client})
+    self.thread.daemon = True
+    self.thread.start()
+    for _ in range(100):
+      if os.path.exists(self.path):
+        break
+      time.sleep(0.01)
+
+  def tearDown(self):
+    daemon.stop(self.path)
+    self.thread.join(1)
+    self.assertEqual(self.client.max_feed_products, daemon.FEED_PRODUCTS)
+    self.client.stop_feed.assert_called_once_with()
+    shutil.rmtree(self.tmp_dir)
+
+  def testForward(self):
+    self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+    with mock.patch('sys.stdout') as stdout:
+      stdout.isatty.return_value = True
+      self.assertTrue(daemon.forward(['ticker', 'ETH-USD', 'BTC-USD'],
+                                     path=self.path))
+    stdout.write.assert_called_with('ticker ETH-USD,BTC-USD\n')
+    self.assertEqual(self.client._get_products.call_count, 1)
+
+  def testNotRunning(self):
+    self.assertFalse(daemon.forward(
+        ['ticker'], path=os.path.join(self.tmp_dir, 'missing.sock')))
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,63 @@
+"""Unit tests for fastorder."""
+
+import json
+import unittest
+
+from gdax.authenticated_client import GdaxAuth
+import mock
+import requests
+
+from .. import fastorder
+
+SECRET = 'U0VDUkVU'
+
+class TestFastAuth(unittest.TestCase):
+
+  def testSignsLikeGdax(self):
+    body = '{"product_id":"ETH-USD","side":"buy","size":"1","type":"market"}'
+    signed = []
+    for auth in (GdaxAuth('KEY', SECRET, 'PASS'),
+                 fastorder.FastAuth('KEY', SECRET, 'PASS')):
+      request = requests.Request('POST', 'https://api.gdax.com/orders',
+                                 data=body).prepare()
+      with mock.patch('time.time', return_value=1500000000.5):
+        signed.append(auth(request).headers)
+    for name in ('CB-ACCESS-SIGN', 'CB-ACCESS-TIMESTAMP', 'CB-ACCESS-KEY',
+                 'CB-ACCESS-PASSPHRASE', 'Content-Type'):
+      self.assertEqual(signed[0][name], signed[1][name])
+
+class TestOrderTemplates(unittest.TestCase):
+
+  def testBody(self):
+    templates = fastorder.OrderTemplates()
+    kwargs = {'product_id': 'ETH-USD', 'side': 'buy', 'type': 'limit',
+              'size': '0.5', 'price': '300.10'}
+    body = templates.body('ETH-USD', 'buy', 'limit', '0.5', '300.10')
+    self.assertEqual(json.loads(body), kwargs)
+    body = templates.body('ETH-USD', 'buy', 'limit', '2', '299')
+    self.assertEqual(json.loads(body), dict(kwargs, size='2', price='299'))
+    body = templates.body('ETH-USD', 'sell', 'market', '1')
+    self.assertEqual(json.loads(body), {'product_id': 'ETH-USD',
+                                        'side': 'sell', 'type': 'market',
+                                        'size': '1'})
+
+class TestFastOrders(unittest.TestCase):
+
+  def testWarmsOnceWhileKeptAlive(self):
+    transport = mock.Mock()
+    transport.post.return_value.json.return_value = {'id': 'abc'}
+    orders = fastorder.FastOrders(transport, 'https://api.gdax.com/',
+                                  fastorder.FastAuth('KEY', SECRET, 'PASS'))
+    with mock.patch('threading.Thread') as thread:
+      orders.warm()
+      self.assertEqual(orders.submit({'product_id': 'ETH-USD', 'side': 'buy',
+                                      'type': 'market', 'size': '1'}),
+                       {'id': 'abc'})
+      orders.warm()
+    self.assertEqual(thread.call_count, 1)
+    self.assertEqual(transport.post.call_args[0][0],
+                     'https://api.gdax.com/orders')
+    self.assertEqual(len(orders.latency), 1)
+
+if __name__ == '__main__':
+  unittest.main()
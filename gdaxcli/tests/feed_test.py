@@ -0,0 +1,119 @@
+"""Unit tests for feed."""
+
+import json
+import time
+import unittest
+
+from .. import feed
+from . import mock_exchange
+
+SNAPSHOT = {
+    'type': 'snapshot',
+    'product_id': 'ETH-USD',
+    'sequence': 10,
+    'bids': [['299.50', '1.5'], ['299.00', '2']],
+    'asks': [['300.00', '0.5'], ['300.50', '3']],
+}
+
+def l2update(sequence, changes):
+  return {'type': 'l2update', 'product_id': 'ETH-USD', 'sequence': sequence,
+          'changes': changes}
+
+def wait_for(condition, timeout=5):
+  deadline = time.time() + timeout
+  while time.time() < deadline:
+    if condition():
+      return True
+    time.sleep(0.01)
+  return False
+
+class TestOrderBook(unittest.TestCase):
+
+  def testSnapshotAndUpdates(self):
+    book = feed.OrderBook('ETH-USD')
+    book.load_snapshot(SNAPSHOT['bids'], SNAPSHOT['asks'])
+    self.assertEqual(book.best_bid(), (299.5, 1.5))
+    self.assertEqual(book.best_ask(), (300.0, 0.5))
+    self.assertEqual(book.price(), 299.75)
+
+    book.update('buy', '299.75', '1')
+    book.update('sell', '300.00', '0')
+    self.assertEqual(book.best_bid(), (299.75, 1.0))
+    self.assertEqual(book.best_ask(), (300.5, 3.0))
+    self.assertListEqual(book.levels('buy', 2), [(299.75, 1.0), (299.5, 1.5)])
+
+    book.update('sell', '301', '0')
+    book.last_price = 300.25
+    self.assertEqual(book.price(), 300.25)
+
+class TestFeed(unittest.TestCase):
+
+  def testGapTriggersResync(self):
+    f = feed.Feed(['ETH-USD'])
+    f._ws = mock_ws = _RecordingSocket()
+    f.handle(SNAPSHOT)
+    f.handle(l2update(11, [['buy', '299.60', '1']]))
+    f.handle(l2update(11, [['buy', '299.70', '1']]))
+    self.assertEqual(f.book('ETH-USD').best_bid(), (299.6, 1.0))
+
+    f.handle(l2update(13, [['buy', '299.80', '1']]))
+    self.assertIsNone(f.book('ETH-USD'))
+    self.assertEqual(f.resync_count, 1)
+    self.assertListEqual([m['type'] for m in mock_ws.sent],
+                         ['unsubscribe', 'subscribe'])
+    f.handle(l2update(14, [['buy', '299.90', '1']]))
+    self.assertIsNone(f.book('ETH-USD'))
+
+  def testLevelsAndSubscribe(self):
+    f = feed.Feed(['ETH-USD'])
+    self.assertIsNone(f.levels('ETH-USD', 'buy', 2))
+    f.handle(SNAPSHOT)
+    self.assertListEqual(f.levels('ETH-USD', 'sell', 1), [(300.0, 0.5)])
+    self.assertIsNone(f.levels('BTC-USD', 'buy', 2))
+
+    f._ws = mock_ws = _RecordingSocket()
+    f.subscribe(['ETH-USD', 'BTC-USD'])
+    self.assertListEqual(f.product_ids, ['ETH-USD', 'BTC-USD'])
+    self.assertListEqual(mock_ws.sent[0]['product_ids'], ['BTC-USD'])
+    self.assertIsNone(f.book('BTC-USD'))
+    f.subscribe(['BTC-USD'])
+    self.assertEqual(len(mock_ws.sent), 1)
+
+  def testReplayServer(self):
+    first = [
+        SNAPSHOT,
+        l2update(11, [['sell', '300.00', '0']]),
+        {'type': 'ticker', 'product_id': 'ETH-USD', 'sequence': 99,
+         'price': '300.10'},
+        # Sequence 12 is missing.
+        l2update(13, [['buy', '299.90', '5']]),
+    ]
+    resync = [
+        dict(SNAPSHOT, sequence=20, bids=[['299.95', '4']]),
+        l2update(21, [['sell', '300.25', '1']]),
+    ]
+    with mock_exchange.WebSocketReplayServer([first, resync]) as server:
+      f = feed.Feed(['ETH-USD'], url=server.url).start()
+      try:
+        self.assertTrue(wait_for(
+            lambda: f.book('ETH-USD') is not None and
+            f.book('ETH-USD').sequence == 21))
+        book = f.book('ETH-USD')
+        self.assertEqual(book.best_bid(), (299.95, 4.0))
+        self.assertEqual(book.best_ask(), (300.0, 0.5))
+        self.assertEqual(f.price('ETH-USD'), 300.1)
+        self.assertEqual(f.resync_count, 1)
+        self.assertEqual(server.received[0]['channels'], feed.CHANNELS)
+      finally:
+        f.stop()
+
+class _RecordingSocket(object):
+
+  def __init__(self):
+    self.sent = []
+
+  def send(self, data):
+    self.sent.append(json.loads(data))
+
+if __name__ == '__main__':
+  unittest.main()
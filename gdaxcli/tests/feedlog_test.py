@@ -0,0 +1,85 @@
+"""Unit tests for feedlog."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from .. import feedlog
+
+class TestFeedLog(unittest.TestCase):
+
+  def setUp(self):
+    self.tmp_dir = tempfile.mkdtemp()
+    self.path = os.path.join(self.tmp_dir, 'feed.log')
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp_dir)
+
+  def _write(self, times, block_messages=3):
+    with feedlog.LogWriter(self.path, block_messages=block_messages) as log:
+      for t in times:
+        log.write('{"n": %d}' % t, received_at=t)
+
+  def testWriteAndRead(self):
+    self._write(range(10))
+    with feedlog.LogReader(self.path) as reader:
+      self.assertListEqual(list(reader.messages()),
+                           [(t, b'{"n": %d}' % t) for t in range(10)])
+      self.assertListEqual([block[1:] for block in reader.blocks()],
+                           [(3, 0, 2), (3, 3, 5), (3, 6, 8), (1, 9, 9)])
+    self.assertEqual(os.path.getsize(feedlog.index_path(self.path)), 4 * 16)
+
+  def testSeekByTime(self):
+    self._write(range(10))
+    with feedlog.LogReader(self.path) as reader:
+      self.assertListEqual([t for t, _ in reader.messages(4, 7)], [4, 5, 6])
+      # Starts at the block holding 4, not the first one.
+      self.assertEqual(next(reader.blocks(4))[2], 3)
+      self.assertListEqual([t for t, _ in reader.messages(-5, 1)], [0])
+      self.assertListEqual(list(reader.messages(20)), [])
+
+  def testBlockSeconds(self):
+    with feedlog.LogWriter(self.path, block_seconds=5) as log:
+      for t in (0, 1, 5, 6, 20):
+        log.write('x', received_at=t)
+    with feedlog.LogReader(self.path) as reader:
+      self.assertListEqual([block[1] for block in reader.blocks()], [3, 2])
+
+  def testAppends(self):
+    self._write(range(5))
+    self._write(range(5, 8))
+    with feedlog.LogReader(self.path) as reader:
+      self.assertListEqual([t for t, _ in reader.messages(6)], [6, 7])
+
+  def testTruncatedBlockAndMissingIndex(self):
+    self._write(range(9))
+    # The index lost its last entry and the log its last bytes, as after a
+    # crash while writing.
+    with open(feedlog.index_path(self.path), 'r+b') as f:
+      f.truncate(16)
+    with open(self.path, 'r+b') as f:
+      f.truncate(os.path.getsize(self.path) - 1)
+    with feedlog.LogReader(self.path) as reader:
+      self.assertListEqual([t for t, _ in reader.messages()], list(range(6)))
+      self.assertListEqual([t for t, _ in reader.messages(4)], [4, 5])
+
+  def testAppendsAfterTruncatedBlock(self):
+    self._write(range(9))
+    # Crashed while writing the last block, after its index entry.
+    with open(self.path, 'r+b') as f:
+      f.truncate(os.path.getsize(self.path) - 1)
+    self._write(range(10, 14))
+    with feedlog.LogReader(self.path) as reader:
+      self.assertListEqual([t for t, _ in reader.messages()],
+                           list(range(6)) + list(range(10, 14)))
+      self.assertListEqual([t for t, _ in reader.messages(11)], [11, 12, 13])
+    self.assertEqual(os.path.getsize(feedlog.index_path(self.path)), 4 * 16)
+
+  def testEmpty(self):
+    feedlog.LogWriter(self.path).close()
+    with feedlog.LogReader(self.path) as reader:
+      self.assertListEqual(list(reader.messages()), [])
+
+if __name__ == '__main__':
+  unittest.main()
@@ -1,11 +1,21 @@
 """Unit tests."""
 
+import os
+import shutil
+try:
+  from StringIO import StringIO
+except ImportError:
+  from io import StringIO
+import tempfile
 import unittest
 
 import mock
 
+from .. import cache
 from .. import exceptions
 from .. import gdax_utils
+from .. import ledger
+from .. import render
 from .. import utils
 
 utils.configure_logging(to_stderr=True, to_file=False)
@@ -16,6 +26,8 @@ class TestInit(unittest.TestCase):
     self.mock_gdax_client_class = self.patcher.start()
     self.mock_client = mock.Mock(spec=self.mock_gdax_client_class)
     self.mock_gdax_client_class.return_value = self.mock_client
+    # Set by AuthenticatedClient.__init__, which the autospec doesn't run.
+    self.mock_client.auth = mock.Mock()
 
     self.mock_client.get_products.return_value = [
       {'id': 'ETH-USD'},
@@ -24,27 +36,229 @@ class TestInit(unittest.TestCase):
 
     self.mock_client.get_product_ticker.return_value = {'price': '123.45'}
 
-    self.c = gdax_utils.Client()
+    self.tmp_dir = tempfile.mkdtemp()
+    self.product_cache = cache.ProductCache(
+        path=os.path.join(self.tmp_dir, 'products.json'))
+    self.c = gdax_utils.Client(product_cache=self.product_cache)
 
   def tearDown(self):
     self.patcher.stop()
+    shutil.rmtree(self.tmp_dir)
 
   def testGetProductIds(self):
     self.assertListEqual(self.c._get_product_ids(), ['BTC-GBP', 'ETH-USD'])
 
+  def testProductsAreCached(self):
+    self.c._get_product_ids()
+    self.c._check_valid_order('limit', 'buy', 'ETH-USD', '23.4', '140.11')
+    self.assertEqual(self.mock_client.get_products.call_count, 1)
+
+    self.c._get_products(refresh=True)
+    self.assertEqual(self.mock_client.get_products.call_count, 2)
+
+  def testCheckValidOrderMinSize(self):
+    self.mock_client.get_products.return_value = [
+      {'id': 'ETH-USD', 'base_min_size': '0.01'},
+    ]
+    self.c._check_valid_order('limit', 'buy', 'ETH-USD', '0.01', '140.11')
+    with self.assertRaises(exceptions.InvalidOrderError) as context:
+      self.c._check_valid_order('limit', 'buy', 'ETH-USD', '0.001', '140.11')
+    self.assertEqual(context.exception.reason, 'min_size')
+
+  def testTickerKeepsProductOrder(self):
+    def ticker(product_id):
+      price = '200.00' if product_id == 'ETH-USD' else '100.00'
+      return {'price': price, 'size': '1', 'bid': '99', 'ask': '101',
+              'volume': '10'}
+    def stats(product_id):
+      return {'open': '90', 'high': '110', 'low': '80'}
+    self.mock_client.get_product_ticker.side_effect = ticker
+    self.mock_client.get_product_24hr_stats.side_effect = stats
+
+    with mock.patch.object(self.c, '_print_table') as mock_print:
+      self.c.ticker()
+    table = mock_print.call_args[0][0]
+    self.assertListEqual(table.column('product_id'), ['BTC-GBP', 'ETH-USD'])
+    self.assertListEqual(table.column('price'), ['100.00', '200.00'])
+    self.assertEqual(table.color('perc', 0), render.GREEN)
+    self.assertEqual(self.mock_client.get_product_24hr_stats.call_count, 2)
+
+  def testWatchTickerReusesStats(self):
+    self.mock_client.get_product_ticker.return_value = {
+        'price': '100.00', 'size': '1', 'bid': '99', 'ask': '101',
+        'volume': '10'}
+    self.mock_client.get_product_24hr_stats.return_value = {
+        'open': '90', 'high': '110', 'low': '80'}
+    frames = []
+    def draw(table, footer):
+      frames.append(table.column('price'))
+      if len(frames) == 3:
+        raise KeyboardInterrupt
+    with mock.patch('gdaxcli.render.Screen') as screen, \
+        mock.patch('time.sleep'), mock.patch('sys.stdout'):
+      screen.return_value.draw.side_effect = draw
+      self.c.ticker(['ETH-USD'], watch=1)
+    self.assertEqual(len(frames), 3)
+    self.assertEqual(self.mock_client.get_product_ticker.call_count, 3)
+    self.assertEqual(self.mock_client.get_product_24hr_stats.call_count, 1)
+
+  def _mock_pages(self, pages):
+    """Makes the transport return pages, linked by cb-after cursors."""
+    responses = []
+    for index, page in enumerate(pages):
+      response = mock.Mock()
+      response.json.return_value = page
+      response.headers = {}
+      if index + 1 < len(pages):
+        response.headers['cb-after'] = str(index + 1)
+      responses.append(response)
+    self.mock_client.url = 'https://api.gdax.com'
+    self.mock_client.auth = None
+    self.c._transport = mock.Mock()
+    self.c._transport.get.side_effect = responses
+
+  def testIterPaginatedIsLazy(self):
+    self._mock_pages([[{'id': 1}, {'id': 2}], [{'id': 3}]])
+    items = self.c._iter_paginated('/fills')
+    self.assertEqual(next(items), {'id': 1})
+    self.assertEqual(self.c._transport.get.call_count, 1)
+    self.assertListEqual(list(items), [{'id': 2}, {'id': 3}])
+    self.assertEqual(self.c._transport.get.call_count, 2)
+    self.assertEqual(
+        self.c._transport.get.call_args[1]['params'], {'after': '1'})
+
+  def testIterPaginatedLimitAndSince(self):
+    pages = [[{'created_at': '2017-08-04'}, {'created_at': '2017-08-03'}],
+             [{'created_at': '2017-08-02'}, {'created_at': '2017-08-01'}],
+             [{'created_at': '2017-07-31'}]]
+    self._mock_pages(pages)
+    self.assertEqual(len(list(self.c._iter_paginated('/fills', limit=2))), 2)
+    self.assertEqual(self.c._transport.get.call_count, 1)
+    self.assertEqual(
+        self.c._transport.get.call_args[1]['params'], {'limit': 2})
+
+    self._mock_pages(pages)
+    items = list(self.c._iter_paginated('/fills', since='2017-08-02'))
+    self.assertEqual(len(items), 3)
+    self.assertEqual(self.c._transport.get.call_count, 2)
+
+  def testIterPaginatedError(self):
+    self._mock_pages([{'message': 'Invalid API Key'}])
+    with self.assertRaises(exceptions.ApiError):
+      list(self.c._iter_paginated('/fills'))
+
+  def testFillsStream(self):
+    fill = {'product_id': 'ETH-USD', 'side': 'buy', 'price': '100',
+            'size': '0.5', 'fee': '0.0', 'settled': True,
+            'created_at': '2017-08-01T00:00:00.000Z'}
+    self._mock_pages([[fill], [fill]])
+    with mock.patch('sys.stdout', new_callable=StringIO) as stdout:
+      self.c.fills(stream=True)
+    lines = stdout.getvalue().splitlines()
+    self.assertEqual(len(lines), 4)
+    self.assertTrue(lines[0].startswith('product_id'))
+    self.assertIn('100.0000', lines[2])
+    self.assertIn('50.0000', lines[3])
+
+  def testFillsFormat(self):
+    fill = {'product_id': 'ETH-USD', 'side': 'buy', 'price': '100.00',
+            'size': '0.5', 'fee': '0.0', 'settled': True,
+            'created_at': '2017-08-01T00:00:00.000Z'}
+    self._mock_pages([[fill], [fill]])
+    self.c.output_format = 'csv'
+    with mock.patch('sys.stdout', new_callable=StringIO) as stdout:
+      self.c.fills()
+    lines = stdout.getvalue().splitlines()
+    self.assertEqual(lines[0], ','.join(fill))
+    self.assertEqual(lines[1], 'ETH-USD,buy,100.00,0.5,0.0,True,'
+                     '2017-08-01T00:00:00.000Z')
+    self.assertEqual(len(lines), 3)
+
+  def testSyncThenLocalFills(self):
+    fill = {'product_id': 'ETH-USD', 'trade_id': 1, 'side': 'buy',
+            'price': '100', 'size': '0.5', 'fee': '0.0', 'settled': True,
+            'created_at': '2017-08-01T00:00:00.000Z'}
+    self.mock_client.get_accounts.return_value = []
+    self._mock_pages([[fill]])
+    self.c._ledger = ledger.Ledger(':memory:')
+    with mock.patch('sys.stdout', new_callable=StringIO):
+      self.c.sync()
+
+    with mock.patch('sys.stdout', new_callable=StringIO) as stdout:
+      self.c.fills(local=True, stream=True)
+    self.assertEqual(self.c._transport.get.call_count, 1)
+    self.assertIn('50.0000', stdout.getvalue())
+
+  def testStats(self):
+    fill = {'product_id': 'ETH-USD', 'trade_id': 1, 'side': 'buy',
+            'price': '100', 'size': '0.5', 'fee': '0.1', 'settled': True,
+            'created_at': '2017-08-01T00:00:00.000Z'}
+    self._mock_pages([[fill]])
+    with mock.patch.object(self.c, '_print_table') as mock_print:
+      self.c.stats(daily=True)
+    summary, daily = [call[0][0] for call in mock_print.call_args_list]
+    self.assertListEqual(summary.column('position'), [0.5])
+    # 0.5 bought at 100, now 123.45.
+    self.assertAlmostEqual(summary.column('unrealized_pnl')[0], 11.725)
+    self.assertListEqual(daily.column('volume'), [50.0])
+
+  def _order(self, order_id):
+    return {'id': order_id, 'product_id': 'ETH-USD', 'side': 'buy',
+            'type': 'limit', 'price': '100', 'size': '1', 'filled_size': '0',
+            'fill_fees': '0', 'status': 'open', 'time_in_force': 'GTC',
+            'settled': False, 'stp': 'dc',
+            'created_at': '2017-08-01T00:00:00.000Z'}
+
+  def testOrderCancel(self):
+    self._mock_pages([[self._order('abc1'), self._order('abd2')],
+                      [self._order('bcd3')]])
+    self.mock_client.cancel_order.side_effect = lambda order_id: [order_id]
+    with mock.patch('sys.stdout', new_callable=StringIO):
+      self.c.order_cancel(['abc', 'b'], skip_confirmation=True)
+    self.mock_client.cancel_order.assert_has_calls(
+        [mock.call('abc1'), mock.call('bcd3')], any_order=True)
+    self.assertEqual(self.c._transport.get.call_count, 2)
+
+    # The index is reused, without the cancelled orders.
+    with mock.patch('sys.stdout', new_callable=StringIO) as stdout:
+      self.c.order_cancel('ab', skip_confirmation=True)
+    self.mock_client.cancel_order.assert_called_with('abd2')
+    self.assertEqual(self.c._transport.get.call_count, 2)
+
+  def testOrderCancelFailureKeepsResults(self):
+    self._mock_pages([[self._order('abc1'), self._order('bcd3')]])
+    def cancel(order_id):
+      if order_id == 'abc1':
+        raise IOError('Connection reset')
+      return [order_id]
+    self.mock_client.cancel_order.side_effect = cancel
+    with mock.patch('sys.stdout', new_callable=StringIO) as stdout:
+      self.c.order_cancel(['a', 'b'], skip_confirmation=True)
+    self.assertIn('abc1: %s: Connection reset' % IOError.__name__,
+                  stdout.getvalue())
+    self.assertIn("['bcd3']", stdout.getvalue())
+    self.assertListEqual(self.c.open_order_ids(), ['abc1'])
+
+  def testOrderCancelAmbiguous(self):
+    self._mock_pages([[self._order('abc1'), self._order('abd2')]])
+    with mock.patch('sys.stdout', new_callable=StringIO) as stdout:
+      self.c.order_cancel(['ab'], skip_confirmation=True)
+    self.assertIn('too short', stdout.getvalue())
+    self.assertFalse(self.mock_client.cancel_order.called)
+
   def testCheckValidOrder(self):
     # order_type, side, product, size, price, product_ids
     self.c._check_valid_order('limit', 'buy', 'ETH-USD', '23.4', '140.11')
     self.c._check_valid_order('market', 'sell', 'btc-gbp', '948.2', '1239123')
     self.c._check_valid_order('market', 'sell', 'btc-gbp', '5', '-2')
     # TODO: test stop orders.
-    with self.assertRaises(AssertionError):
+    with self.assertRaises(exceptions.InvalidOrderError):
       self.c._check_valid_order('something', 'buy', 'ETH-USD', '23.4', '140.11')
-    with self.assertRaises(AssertionError):
+    with self.assertRaises(exceptions.InvalidOrderError):
       self.c._check_valid_order('something', 'buysell', 'ETH-USD', '23.4', '140.11')
-    with self.assertRaises(AssertionError):
+    with self.assertRaises(exceptions.InvalidOrderError):
       self.c._check_valid_order('something', 'buysell', 'usd-gbp', '23.4', '140.11')
-    with self.assertRaises(AssertionError):
+    with self.assertRaises(exceptions.InvalidOrderError):
       self.c._check_valid_order('limit', 'buysell', 'usd-gbp', '23.4', '')
 
   def testParsePrice(self):
@@ -112,5 +326,161 @@ class TestInit(unittest.TestCase):
       mock.call(type='limit', size='0.1', price='180', **kwargs),
     ])
 
+  def testOrderRoundsToQuoteIncrement(self):
+    self.mock_client.get_products.return_value = [
+      {'id': 'LTC-BTC', 'quote_increment': '0.00001000'},
+    ]
+    self.mock_client.get_product_ticker.return_value = {'price': '0.01637'}
+    self.c.order('limit', 'buy', 'LTC-BTC', '1', '-0.000123',
+                 skip_confirmation=True)
+    self.c.order('limit', 'buy', 'LTC-BTC', '1', '0.0161234',
+                 skip_confirmation=True)
+    kwargs = {'type': 'limit', 'size': '1', 'side': 'buy',
+              'product_id': 'LTC-BTC'}
+    self.mock_client.buy.assert_has_calls([
+      mock.call(price='0.01624', **kwargs),
+      mock.call(price='0.01612', **kwargs),
+    ])
+
+  def testConversionPath(self):
+    product_ids = set(['BTC-USD', 'ETH-BTC', 'BTC-GBP', 'ETH-USD'])
+    path = gdax_utils._conversion_path
+    self.assertListEqual(path('BTC', 'USD', product_ids), [('BTC-USD', False)])
+    self.assertListEqual(path('USD', 'BTC', product_ids), [('BTC-USD', True)])
+    self.assertListEqual(path('GBP', 'USD', product_ids),
+                         [('BTC-GBP', True), ('BTC-USD', False)])
+    self.assertListEqual(path('ETH', 'GBP', product_ids),
+                         [('ETH-BTC', False), ('BTC-GBP', False)])
+    self.assertIsNone(path('LTC', 'USD', product_ids))
+
+  def testBalance(self):
+    self.mock_client.get_products.return_value = [
+      {'id': 'BTC-USD'}, {'id': 'ETH-USD'}, {'id': 'LTC-BTC'},
+      {'id': 'BCH-USD'},
+    ]
+    prices = {'BTC-USD': '4000', 'ETH-USD': '300', 'LTC-BTC': '0.01'}
+    self.mock_client.get_product_ticker.side_effect = lambda product_id: {
+        'price': prices[product_id]}
+    self.mock_client.get_accounts.return_value = [
+      {'currency': 'USD', 'balance': '100', 'available': '100', 'hold': '0'},
+      {'currency': 'LTC', 'balance': '10', 'available': '10', 'hold': '0'},
+      {'currency': 'BTC', 'balance': '0.5', 'available': '0.5', 'hold': '0'},
+      {'currency': 'BCH', 'balance': '0.0', 'available': '0', 'hold': '0'},
+    ]
+    with mock.patch.object(self.c, '_print_table') as mock_print:
+      with mock.patch('sys.stdout', new_callable=StringIO) as stdout:
+        self.c.balance()
+    fetched = sorted(call[0][0] for call in
+                     self.mock_client.get_product_ticker.call_args_list)
+    self.assertListEqual(fetched, ['BTC-USD', 'LTC-BTC'])
+    table = mock_print.call_args[0][0]
+    self.assertListEqual(table.column('currency'),
+                         ['BCH', 'BTC', 'LTC', 'USD'])
+    self.assertListEqual(table.column('total_usd'),
+                         [0.0, 2000.0, 400.0, 100.0])
+    self.assertAlmostEqual(table.column('perc')[1], 2000.0 / 2500 * 100)
+    self.assertIn('USD: 2500.0000', stdout.getvalue())
+
+    with mock.patch.object(self.c, '_print_table') as mock_print:
+      with mock.patch('sys.stdout', new_callable=StringIO) as stdout:
+        self.c.balance(quote='btc')
+    table = mock_print.call_args[0][0]
+    self.assertListEqual(table.column('total_btc'), [0.0, 0.5, 0.1, 0.025])
+
+  def testOrderUsesFeedPrice(self):
+    self.c._feed = mock.Mock()
+    self.c._feed.price.side_effect = lambda product_id: {
+        'ETH-USD': 200.0}.get(product_id)
+    self.c.order('limit', 'buy', 'ETH-USD', '0.1', '-1',
+                 skip_confirmation=True)
+    self.assertFalse(self.mock_client.get_product_ticker.called)
+    self.mock_client.buy.assert_called_once_with(
+        type='limit', size='0.1', price='199.00', side='buy',
+        product_id='ETH-USD')
+
+    self.c.order('market', 'sell', 'BTC-GBP', '0.1', None,
+                 skip_confirmation=True)
+    self.mock_client.get_product_ticker.assert_called_once_with('BTC-GBP')
+
+  def testFollowsPricedProducts(self):
+    self.c.max_feed_products = 2
+    with mock.patch('gdaxcli.feed.Feed') as feed_class:
+      feed = feed_class.return_value.start.return_value
+      feed.product_ids = ['BTC-GBP']
+      self.c._current_prices(['BTC-GBP'])
+      feed_class.assert_called_once_with(['BTC-GBP'], url=mock.ANY)
+      feed.price.return_value = None
+      self.c._current_prices(['ETH-USD', 'LTC-USD'])
+    # Only one more product fits.
+    feed.subscribe.assert_called_once_with(['ETH-USD'])
+    self.c.stop_feed()
+    feed.stop.assert_called_once_with()
+
+  def testOrderBatch(self):
+    self.mock_client.buy.return_value = {'id': 'abc'}
+    self.mock_client.sell.return_value = {'message': 'Insufficient funds'}
+    specs = [
+      {'order_type': 'limit', 'side': 'buy', 'product': 'eth-usd',
+       'size': '0.1', 'price': '-1'},
+      {'order_type': 'limit', 'side': 'buy', 'product': 'ETH-USD',
+       'size': '0.2', 'price': '120'},
+      {'order_type': 'market', 'side': 'sell', 'product': 'BTC-GBP',
+       'size': '0.3', 'price': ''},
+    ]
+    with mock.patch('sys.stdout', new_callable=StringIO) as stdout:
+      self.c.order_batch(specs, skip_confirmation=True)
+    self.assertEqual(self.mock_client.get_product_ticker.call_count, 2)
+    self.mock_client.buy.assert_has_calls([
+      mock.call(type='limit', size='0.1', price='122.45', side='buy',
+                product_id='ETH-USD'),
+      mock.call(type='limit', size='0.2', price='120', side='buy',
+                product_id='ETH-USD'),
+    ])
+    self.mock_client.sell.assert_called_once_with(
+        type='market', size='0.3', side='sell', product_id='BTC-GBP')
+    self.assertIn('Insufficient funds', stdout.getvalue())
+
+  def testOrderBatchFailureKeepsResults(self):
+    self.mock_client.buy.return_value = {'id': 'abc'}
+    self.mock_client.sell.side_effect = ValueError('No JSON object')
+    specs = [
+      {'order_type': 'market', 'side': 'sell', 'product': 'BTC-GBP',
+       'size': '0.3', 'price': ''},
+      {'order_type': 'limit', 'side': 'buy', 'product': 'ETH-USD',
+       'size': '0.2', 'price': '120'},
+    ]
+    with mock.patch('sys.stdout', new_callable=StringIO) as stdout:
+      self.c.order_batch(specs, skip_confirmation=True)
+    lines = stdout.getvalue().splitlines()
+    self.assertIn('ValueError: No JSON object',
+                  [line for line in lines if 'failed' in line][0])
+    self.assertIn('abc', [line for line in lines if 'placed' in line][0])
+    self.assertIn('Submitted 2 orders', stdout.getvalue())
+
+  def testOrderBatchValidatesFirst(self):
+    specs = [
+      {'order_type': 'limit', 'side': 'buy', 'product': 'ETH-USD',
+       'size': '0.1', 'price': '-1'},
+      {'order_type': 'limit', 'side': 'buy', 'product': 'ETH-USD',
+       'size': '0.1', 'price': '+1'},
+    ]
+    with mock.patch('sys.stdout', new_callable=StringIO):
+      with self.assertRaises(exceptions.InvalidOrderError):
+        self.c.order_batch(specs, skip_confirmation=True)
+    self.assertFalse(self.mock_client.buy.called)
+
+  def testOrderBatchChecksRulesBeforePricing(self):
+    specs = [
+      {'order_type': 'limit', 'side': 'buy', 'product': 'ETH-USD',
+       'size': '0.1', 'price': '-1'},
+      {'order_type': 'limit', 'side': 'buy', 'product': 'LTC-USD',
+       'size': '0.1', 'price': '-1'},
+    ]
+    with self.assertRaises(exceptions.InvalidOrderError) as context:
+      self.c.order_batch(specs, skip_confirmation=True)
+    self.assertEqual(context.exception.reason, 'product')
+    self.assertIn('Order #2', str(context.exception))
+    self.assertFalse(self.mock_client.get_product_ticker.called)
+
 if __name__ == '__main__':
   unittest.main()
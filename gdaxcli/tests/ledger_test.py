@@ -0,0 +1,99 @@
+"""Unit tests for ledger."""
+
+import unittest
+
+from .. import ledger
+
+def history_item(id_, created_at, type_='match', product_id='ETH-USD'):
+  return {
+      'id': id_,
+      'created_at': created_at,
+      'amount': '1.0',
+      'balance': str(id_),
+      'type': type_,
+      'details': {'product_id': product_id},
+  }
+
+def fill(trade_id, created_at, product_id='ETH-USD', side='buy'):
+  return {
+      'product_id': product_id,
+      'trade_id': trade_id,
+      'order_id': 'o%d' % trade_id,
+      'side': side,
+      'price': '100.00',
+      'size': '0.1',
+      'fee': '0.0',
+      'liquidity': 'M',
+      'settled': True,
+      'created_at': created_at,
+  }
+
+class TestLedger(unittest.TestCase):
+
+  def setUp(self):
+    self.ledger = ledger.Ledger(':memory:')
+
+  def tearDown(self):
+    self.ledger.close()
+
+  def testSyncHistoryStopsAtCursor(self):
+    items = [history_item(2, '2017-08-02'), history_item(1, '2017-08-01')]
+    self.assertEqual(self.ledger.sync_history('acc', 'USD', items), 2)
+    self.assertEqual(self.ledger.get_cursor('history:acc'), '2')
+
+    consumed = []
+    def newest_first():
+      for item in [history_item(4, '2017-08-04'),
+                   history_item(3, '2017-08-03')] + items:
+        consumed.append(item['id'])
+        yield item
+    self.assertEqual(self.ledger.sync_history('acc', 'USD', newest_first()), 2)
+    self.assertListEqual(consumed, [4, 3, 2])
+    self.assertListEqual(
+        [item['id'] for item in self.ledger.history('USD')], [4, 3, 2, 1])
+
+  def testSyncIsAtomic(self):
+    def broken():
+      yield history_item(1, '2017-08-01')
+      raise IOError('connection reset')
+    with self.assertRaises(IOError):
+      self.ledger.sync_history('acc', 'USD', broken())
+    self.assertIsNone(self.ledger.get_cursor('history:acc'))
+    self.assertListEqual(list(self.ledger.history('USD')), [])
+
+  def testHistoryFilters(self):
+    self.ledger.sync_history('acc', 'USD', [
+        history_item(3, '2017-08-03', type_='fee'),
+        history_item(2, '2017-08-02', product_id='BTC-USD'),
+        history_item(1, '2017-08-01'),
+    ])
+    self.ledger.sync_history('acc2', 'BTC', [history_item(9, '2017-08-09')])
+    ids = lambda items: [item['id'] for item in items]
+    self.assertListEqual(ids(self.ledger.history('USD', start='2017-08-02')),
+                         [3, 2])
+    self.assertListEqual(ids(self.ledger.history('USD', end='2017-08-02')),
+                         [1])
+    self.assertListEqual(
+        ids(self.ledger.history('USD', product_id='BTC-USD')), [2])
+    self.assertListEqual(ids(self.ledger.history('USD', type_='fee')), [3])
+    self.assertListEqual(ids(self.ledger.history('USD', limit=1)), [3])
+    item = next(self.ledger.history('BTC'))
+    self.assertEqual(item['details'], {'product_id': 'ETH-USD'})
+
+  def testSyncFills(self):
+    fills = [fill(2, '2017-08-02'), fill(1, '2017-08-01')]
+    self.assertEqual(self.ledger.sync_fills(fills), 2)
+    fills = [fill(5, '2017-08-03', product_id='BTC-USD', side='sell')] + fills
+    self.assertEqual(self.ledger.sync_fills(fills), 1)
+
+    stored = list(self.ledger.fills())
+    self.assertListEqual([f['trade_id'] for f in stored], [5, 2, 1])
+    self.assertEqual(stored[0], fills[0])
+    self.assertListEqual(
+        [f['trade_id'] for f in self.ledger.fills(product_id='ETH-USD')],
+        [2, 1])
+    self.assertListEqual(
+        [f['trade_id'] for f in self.ledger.fills(side='sell')], [5])
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,439 @@
+"""Local mock of the GDAX REST API and websocket feed for tests and benchmarks.
+
+Serves synthetic data over HTTP on localhost so Client can be pointed at it
+with api_url, without network access or API keys. The amount of data and the
+latency of each request are configurable, for benchmarks at different scales.
+WebSocketReplayServer plays back recorded or generated feed messages.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import calendar
+import datetime
+import json
+import socket
+import threading
+import time
+import uuid
+
+try:
+  from http.server import BaseHTTPRequestHandler, HTTPServer
+  from socketserver import ThreadingMixIn
+  from urllib.parse import parse_qs
+except ImportError:
+  from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+  from SocketServer import ThreadingMixIn
+  from urlparse import parse_qs
+
+from ..replay import ws_handshake, ws_recv, ws_send
+
+# Fake credentials; the mock server does not check signatures.
+CONFIG = {
+    'passphrase': 'PASSPHRASE',
+    'key': 'KEY',
+    # Must be valid base64 since gdax decodes it to sign requests.
+    'secret': 'U0VDUkVU',
+}
+
+# Most items the real API returns per page.
+MAX_PAGE_SIZE = 100
+
+# Most candles the real API returns for one request.
+MAX_CANDLES = 200
+
+def make_products(num_products):
+  """Returns a list of synthetic products quoted in USD."""
+  products = []
+  for i in range(num_products):
+    base = 'C%03d' % i
+    products.append({
+        'id': base + '-USD',
+        'base_currency': base,
+        'quote_currency': 'USD',
+        'base_min_size': '0.01',
+        'base_max_size': '10000',
+        'quote_increment': '0.01',
+    })
+  return products
+
+def _time(seconds_ago):
+  """Timestamp in the API's format, seconds_ago before 2017-09-01."""
+  created = datetime.datetime(2017, 9, 1) - datetime.timedelta(
+      seconds=seconds_ago)
+  return created.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+def _uuid(prefix, index):
+  return str(uuid.UUID(int=(prefix << 64) + index))
+
+def make_accounts(products, num_accounts):
+  """Returns USD and base currency accounts, num_accounts in total."""
+  currencies = ['USD'] + [p['base_currency'] for p in products]
+  accounts = []
+  for currency in currencies[:num_accounts]:
+    accounts.append({
+        'id': 'account-' + currency.lower(),
+        'currency': currency,
+        'balance': '10.0000000000000000',
+        'available': '9.0000000000000000',
+        'hold': '1.0000000000000000',
+        'profile_id': 'profile',
+    })
+  return accounts
+
+def make_history(account, num_items):
+  """Returns ledger entries of an account, newest first."""
+  items = []
+  for i in range(num_items):
+    kind = ('match', 'match', 'fee', 'transfer')[i % 4]
+    item = {
+        'id': i,
+        'created_at': _time(i * 60),
+        'amount': '%.8f' % (0.5 if i % 2 else -0.25),
+        'balance': '%.8f' % (10 + i * 0.01),
+        'type': kind,
+        'details': {},
+    }
+    if kind == 'match':
+      item['details'] = {'order_id': _uuid(1, i), 'trade_id': str(i),
+                         'product_id': account['currency'] + '-USD'}
+    elif kind == 'transfer':
+      item['details'] = {'transfer_id': _uuid(2, i),
+                         'transfer_type': ('deposit', 'withdraw')[i % 8 // 4]}
+    items.append(item)
+  return items
+
+def make_fills(products, num_fills):
+  """Returns fills spread over products, newest first."""
+  fills = []
+  for i in range(num_fills):
+    product = products[i % len(products)]
+    fills.append({
+        'trade_id': num_fills - i,
+        'product_id': product['id'],
+        'order_id': _uuid(3, i),
+        'side': ('buy', 'sell')[i % 2],
+        'price': '%.2f' % (100 + i % 50),
+        'size': '%.8f' % (0.01 * (1 + i % 20)),
+        'fee': '0.0000000000000000' if i % 3 else '0.0100000000000000',
+        'settled': i % 10 != 0,
+        'liquidity': 'M',
+        'created_at': _time(i * 30),
+    })
+  return fills
+
+def make_order(order_id, product_id, side, price, size, created_at):
+  return {
+      'id': order_id,
+      'product_id': product_id,
+      'side': side,
+      'type': 'limit',
+      'price': price,
+      'size': size,
+      'filled_size': '0.00000000',
+      'fill_fees': '0.0000000000000000',
+      'status': 'open',
+      'time_in_force': 'GTC',
+      'post_only': False,
+      'settled': False,
+      'stp': 'dc',
+      'created_at': created_at,
+  }
+
+def make_orders(products, num_orders):
+  """Returns open orders spread over products, newest first."""
+  return [make_order(_uuid(4, i), products[i % len(products)]['id'],
+                     ('buy', 'sell')[i % 2], '%.2f' % (90 + i % 20), '0.10',
+                     _time(i * 10))
+          for i in range(num_orders)]
+
+def feed_session(product_ids, levels=10, updates=100):
+  """Returns feed messages: a snapshot per product, then level 2 updates.
+
+  Args:
+    product_ids: Products in the session.
+    levels: Price levels on each side of the snapshots.
+    updates: Number of l2update messages per product.
+  """
+  messages = []
+  for product_id in product_ids:
+    messages.append({
+        'type': 'snapshot',
+        'product_id': product_id,
+        'sequence': 0,
+        'bids': [['%.2f' % (99.99 - i * 0.01), '1.0'] for i in range(levels)],
+        'asks': [['%.2f' % (100.01 + i * 0.01), '1.0'] for i in range(levels)],
+    })
+  for i in range(updates):
+    for product_id in product_ids:
+      side = ('buy', 'sell')[i % 2]
+      price = 99.99 - i % levels * 0.01 if side == 'buy' else (
+          100.01 + i % levels * 0.01)
+      messages.append({
+          'type': 'l2update',
+          'product_id': product_id,
+          'sequence': i + 1,
+          'changes': [[side, '%.2f' % price, '%.1f' % (i % 3)]],
+      })
+  return messages
+
+class Exchange(object):
+  """State served by the mock server.
+
+  Serves the time, products, tickers, 24h stats, candles, accounts, account
+  ledgers, fills and open orders, with cb-after pagination like the real API. Orders
+  can be placed and cancelled.
+  """
+
+  def __init__(self, num_products=10, latency=0.0, num_accounts=0,
+               history_items=0, num_fills=0, num_orders=0,
+               page_size=MAX_PAGE_SIZE):
+    """Initializer.
+
+    Args:
+      num_products: Number of synthetic products to list.
+      latency: Seconds to sleep before answering each request.
+      num_accounts: Number of accounts: USD, then base currencies.
+      history_items: Ledger entries per account.
+      num_fills: Number of fills across all products.
+      num_orders: Number of open orders.
+      page_size: Items per page when the request doesn't give a limit.
+    """
+    self.products = make_products(num_products)
+    self.latency = latency
+    self.accounts = make_accounts(self.products, num_accounts)
+    self.history = dict((account['id'], make_history(account, history_items))
+                        for account in self.accounts)
+    self.fills = make_fills(self.products, num_fills)
+    self.orders = make_orders(self.products, num_orders)
+    self.page_size = page_size
+    self.request_count = 0
+    self.candle_requests = 0
+    self._lock = threading.Lock()
+
+  def _page(self, items, query):
+    """Returns (status, page, headers) of a paginated listing."""
+    after = int(query.get('after', 0))
+    limit = min(int(query.get('limit', self.page_size)), MAX_PAGE_SIZE)
+    page = items[after:after + limit]
+    headers = {}
+    if after + limit < len(items):
+      headers['cb-after'] = str(after + limit)
+    return 200, page, headers
+
+  def _candles(self, query):
+    """Returns (status, candles, headers), newest first, with the end
+    inclusive like the real API."""
+    granularity = int(query['granularity'])
+    start, end = (calendar.timegm(time.strptime(query[key],
+                                                '%Y-%m-%dT%H:%M:%SZ'))
+                  for key in ('start', 'end'))
+    if (end - start) // granularity > MAX_CANDLES:
+      return 400, {'message': 'granularity too small for the requested '
+                              'time range'}, {}
+    with self._lock:
+      self.candle_requests += 1
+    candles = []
+    for t in range(end - end % granularity, start - 1, -granularity):
+      price = 100 + t // granularity % 10
+      candles.append([t, price - 1, price + 1, price, price + 0.5, 10.0])
+    return 200, candles, {}
+
+  def handle(self, method, path, body=None):
+    """Returns (status, body, headers) for a request."""
+    with self._lock:
+      self.request_count += 1
+    if self.latency:
+      time.sleep(self.latency)
+
+    path, _, query_string = path.partition('?')
+    query = dict((key, values[0]) for key, values
+                 in parse_qs(query_string).items())
+    parts = path.strip('/').split('/')
+    if method == 'GET':
+      if parts == ['time']:
+        return 200, {'iso': _time(0), 'epoch': time.time()}, {}
+      if parts == ['products']:
+        return 200, self.products, {}
+      if len(parts) == 3 and parts[0] == 'products':
+        if parts[2] == 'ticker':
+          return 200, {
+              'trade_id': 1,
+              'price': '100.00',
+              'size': '0.5',
+              'bid': '99.99',
+              'ask': '100.01',
+              'volume': '1234.5',
+              'time': '2017-08-01T00:00:00.000000Z',
+          }, {}
+        if parts[2] == 'candles':
+          return self._candles(query)
+        if parts[2] == 'stats':
+          return 200, {
+              'open': '95.00',
+              'high': '101.00',
+              'low': '94.00',
+              'volume': '1234.5',
+          }, {}
+      if parts == ['accounts']:
+        return 200, self.accounts, {}
+      if len(parts) == 3 and parts[0] == 'accounts' and parts[2] == 'ledger':
+        if parts[1] not in self.history:
+          return 404, {'message': 'NotFound'}, {}
+        return self._page(self.history[parts[1]], query)
+      if parts == ['fills']:
+        fills = self.fills
+        if 'product_id' in query:
+          fills = [f for f in fills if f['product_id'] == query['product_id']]
+        return self._page(fills, query)
+      if parts == ['orders']:
+        with self._lock:
+          orders = list(self.orders)
+        return self._page(orders, query)
+    elif method == 'POST' and parts == ['orders']:
+      kwargs = json.loads(body or '{}')
+      with self._lock:
+        order = make_order(_uuid(5, len(self.orders) + self.request_count),
+                           kwargs.get('product_id'), kwargs.get('side'),
+                           kwargs.get('price', '100.00'), kwargs.get('size'),
+                           _time(0))
+        order['type'] = kwargs.get('type', 'limit')
+        self.orders.insert(0, order)
+      return 200, order, {}
+    elif method == 'DELETE' and len(parts) == 2 and parts[0] == 'orders':
+      with self._lock:
+        for index, order in enumerate(self.orders):
+          if order['id'] == parts[1]:
+            del self.orders[index]
+            return 200, [parts[1]], {}
+      return 404, {'message': 'order not found'}, {}
+    return 404, {'message': 'NotFound'}, {}
+
+class _Handler(BaseHTTPRequestHandler):
+  # Keep connections alive like the real API does.
+  protocol_version = 'HTTP/1.1'
+  # Headers and body are written separately; avoid waiting on delayed acks.
+  disable_nagle_algorithm = True
+
+  def _respond(self):
+    length = int(self.headers.get('Content-Length') or 0)
+    request_body = self.rfile.read(length).decode('utf-8') if length else None
+    status, body, headers = self.server.exchange.handle(
+        self.command, self.path, request_body)
+    data = json.dumps(body).encode('utf-8')
+    self.send_response(status)
+    self.send_header('Content-Type', 'application/json')
+    self.send_header('Content-Length', str(len(data)))
+    for name, value in headers.items():
+      self.send_header(name, value)
+    self.end_headers()
+    self.wfile.write(data)
+
+  do_GET = _respond
+  do_POST = _respond
+  do_DELETE = _respond
+
+  def log_message(self, *args):
+    pass
+
+class _Server(ThreadingMixIn, HTTPServer):
+  daemon_threads = True
+
+class MockExchangeServer(object):
+  """Runs an Exchange on a background thread.
+
+  Usage:
+    with MockExchangeServer(Exchange(num_products=20)) as server:
+      client = gdax_utils.Client(config=CONFIG, api_url=server.url)
+  """
+
+  def __init__(self, exchange=None):
+    self.exchange = exchange or Exchange()
+    self._server = _Server(('127.0.0.1', 0), _Handler)
+    self._server.exchange = self.exchange
+    self.url = 'http://127.0.0.1:%d' % self._server.server_address[1]
+    self._thread = threading.Thread(target=self._server.serve_forever)
+    self._thread.daemon = True
+
+  def start(self):
+    self._thread.start()
+    return self
+
+  def stop(self):
+    self._server.shutdown()
+    self._server.server_close()
+
+  def __enter__(self):
+    return self.start()
+
+  def __exit__(self, *args):
+    self.stop()
+
+class WebSocketReplayServer(object):
+  """Plays back recorded feed messages over a websocket on localhost.
+
+  Each subscribe message received is answered with the next list of messages
+  in sessions, so a test can script the reply to a resubscription.
+
+  Usage:
+    with WebSocketReplayServer([messages]) as server:
+      feed = feed.Feed(['ETH-USD'], url=server.url).start()
+  """
+
+  def __init__(self, sessions):
+    self.sessions = list(sessions)
+    self.received = []
+    self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    self._sock.bind(('127.0.0.1', 0))
+    self._sock.listen(5)
+    self.url = 'ws://127.0.0.1:%d' % self._sock.getsockname()[1]
+    self._running = False
+
+  def start(self):
+    self._running = True
+    thread = threading.Thread(target=self._accept)
+    thread.daemon = True
+    thread.start()
+    return self
+
+  def stop(self):
+    self._running = False
+    self._sock.close()
+
+  def __enter__(self):
+    return self.start()
+
+  def __exit__(self, *args):
+    self.stop()
+
+  def _accept(self):
+    while self._running:
+      try:
+        conn, _ = self._sock.accept()
+      except (socket.error, OSError):
+        return
+      thread = threading.Thread(target=self._serve, args=(conn,))
+      thread.daemon = True
+      thread.start()
+
+  def _serve(self, conn):
+    try:
+      ws_handshake(conn)
+      while self._running:
+        opcode, payload = ws_recv(conn)
+        if opcode == 0x8:
+          ws_send(conn, b'', opcode=0x8)
+          return
+        if opcode != 0x1:
+          continue
+        message = json.loads(payload.decode('utf-8'))
+        self.received.append(message)
+        if message.get('type') == 'subscribe' and self.sessions:
+          for reply in self.sessions.pop(0):
+            ws_send(conn, json.dumps(reply))
+    except (EOFError, socket.error, OSError):
+      pass
+    finally:
+      conn.close()
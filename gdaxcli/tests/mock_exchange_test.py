@@ -0,0 +1,185 @@
+"""Tests running Client against the mock exchange."""
+
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import unittest
+try:
+  from StringIO import StringIO
+except ImportError:
+  from io import StringIO
+
+import mock
+
+from .. import cache
+from .. import candles
+from .. import feedlog
+from .. import gdax_utils
+from . import mock_exchange
+
+class TestMockExchange(unittest.TestCase):
+
+  def setUp(self):
+    self.exchange = mock_exchange.Exchange(
+        num_products=3, num_accounts=2, history_items=250, num_fills=30,
+        num_orders=5)
+    self.server = mock_exchange.MockExchangeServer(self.exchange).start()
+    self.tmp_dir = tempfile.mkdtemp()
+    self.c = gdax_utils.Client(
+        config=mock_exchange.CONFIG, api_url=self.server.url, rate_limit=None,
+        product_cache=cache.ProductCache(
+            path=os.path.join(self.tmp_dir, 'products.json')))
+
+  def tearDown(self):
+    self.server.stop()
+    shutil.rmtree(self.tmp_dir)
+
+  def testPagination(self):
+    items = list(self.c._iter_paginated('/accounts/account-usd/ledger'))
+    self.assertEqual(len(items), 250)
+    self.assertEqual(self.exchange.request_count, 3)
+    fills = list(self.c._iter_paginated('/fills', {'product_id': 'C001-USD'}))
+    self.assertEqual(len(fills), 10)
+
+  def testHistoryInRequestedOrder(self):
+    with mock.patch('sys.stdout', new_callable=StringIO) as stdout:
+      self.c.history(['C000', 'USD'], limit=3)
+    lines = stdout.getvalue().splitlines()
+    self.assertEqual(lines[0], 'Account: C000')
+    self.assertIn('Account: USD', lines)
+
+  def testHistoryStreamIsLazy(self):
+    with mock.patch.object(self.c, '_print_rows') as mock_print:
+      self.c.history(['USD', 'C000'], stream=True)
+    count = self.exchange.request_count
+    for call in mock_print.call_args_list:
+      self.assertEqual(len(list(itertools.islice(call[0][0], 100))), 100)
+    # One page of each account, read as the rows were.
+    self.assertEqual(self.exchange.request_count, count + 2)
+
+  def testMergedHistory(self):
+    with mock.patch.object(self.c, '_print_rows') as mock_print:
+      self.c.history(['USD', 'C000'], merge=True)
+    items, parse = mock_print.call_args[0][:2]
+    rows = [parse(item) for item in items]
+    self.assertEqual(len(rows), 500)
+    times = [values[-1] for values, _ in rows]
+    self.assertListEqual(times, sorted(times, reverse=True))
+    self.assertEqual(set(values[0] for values, _ in rows),
+                     set(['USD', 'C000']))
+
+  def testMergedHistoryRecords(self):
+    self.c.output_format = 'jsonl'
+    with mock.patch('sys.stdout', new_callable=StringIO) as stdout:
+      self.c.history(['USD', 'C000'], merge=True, limit=4)
+    records = [json.loads(line) for line in stdout.getvalue().splitlines()]
+    self.assertEqual(len(records), 4)
+    self.assertIn(records[0]['account'], ['USD', 'C000'])
+    # Values are the exchange's strings, not reformatted.
+    self.assertIsInstance(records[0]['amount'], str)
+
+  def testCandles(self):
+    store = candles.CandleStore(os.path.join(self.tmp_dir, 'candles'))
+    self.c._candle_store = store
+    with mock.patch('sys.stdout', new_callable=StringIO) as stdout:
+      self.c.candles('c000-usd', 3600, start='2017-08-01', end='2017-09-01')
+    self.assertEqual(self.exchange.candle_requests, 4)
+    lines = stdout.getvalue().splitlines()
+    self.assertEqual(len(lines), 2 + 31 * 24)
+    self.assertTrue(lines[2].startswith('2017-08-01T00:00:00Z'))
+
+    with mock.patch('sys.stdout', new_callable=StringIO):
+      self.c.candles('C000-USD', 3600, start='2017-07-31', end='2017-09-01',
+                     summary=True)
+    # Only the new day was fetched.
+    self.assertEqual(self.exchange.candle_requests, 5)
+    self.assertEqual(len(store.read('C000-USD', 3600)), 32 * 24)
+
+  def testRecord(self):
+    path = os.path.join(self.tmp_dir, 'feed.log')
+    messages = mock_exchange.feed_session(['C000-USD'], updates=20)
+    with mock_exchange.WebSocketReplayServer([messages]) as server:
+      self.c._ws_url = server.url
+      with mock.patch('sys.stdout', new_callable=StringIO) as stdout:
+        self.c.record(path, ['c000-usd'], duration=0.5)
+    self.assertIn('Recorded 21 messages of C000-USD', stdout.getvalue())
+    with feedlog.LogReader(path) as reader:
+      self.assertListEqual([json.loads(m.decode('utf-8'))
+                            for _, m in reader.messages()], messages)
+
+  def _profiles(self):
+    profiles = [('main', mock_exchange.CONFIG),
+                ('sub', dict(mock_exchange.CONFIG, key='KEY2'))]
+    with mock.patch('gdaxcli.utils.read_profiles', return_value=profiles):
+      return self.c.profile_clients()
+
+  def testProfileOrders(self):
+    profiles = self._profiles()
+    with mock.patch('sys.stdout', new_callable=StringIO) as stdout:
+      self.c.orders(profiles=profiles)
+    lines = stdout.getvalue().splitlines()
+    # Header, 5 orders and a subtotal per profile, and the total.
+    self.assertEqual(len(lines), 2 + 2 * 6 + 1)
+    self.assertTrue(lines[7].startswith('main     subtotal'))
+    self.assertTrue(lines[-1].startswith('all      total'))
+    self.assertIn('92.0000', lines[-1])
+    # Each profile has its own connections; none went through this client.
+    for _, client in profiles:
+      self.assertEqual(client.request_counters()['requests'], 1)
+    self.assertNotIn('requests', self.c.request_counters())
+    self.assertIs(self._profiles()[0][1], profiles[0][1])
+
+  def testProfileBalance(self):
+    profiles = self._profiles()
+    with mock.patch('sys.stdout', new_callable=StringIO) as stdout:
+      self.c.balance(profiles=profiles)
+    lines = stdout.getvalue().splitlines()
+    subtotals = [line for line in lines if 'subtotal' in line]
+    self.assertEqual(len(subtotals), 2)
+    self.assertTrue(subtotals[0].startswith('main'))
+    self.assertEqual(subtotals[0].split()[2], subtotals[1].split()[2])
+    # The catalog and the one price needed are fetched once for both
+    # profiles, by this client.
+    self.assertEqual(self.c.request_counters()['requests'], 2)
+    for _, client in profiles:
+      self.assertEqual(client.request_counters()['requests'], 1)
+
+  def testProfileFillsRecords(self):
+    self.c.output_format = 'jsonl'
+    with mock.patch('sys.stdout', new_callable=StringIO) as stdout:
+      self.c.fills(limit=2, profiles=self._profiles())
+    records = [json.loads(line) for line in stdout.getvalue().splitlines()]
+    self.assertListEqual([record['profile'] for record in records],
+                         ['main', 'main', 'sub', 'sub'])
+
+  def testOrderCancel(self):
+    order_ids = [order['id'] for order in self.exchange.orders[:2]]
+    with mock.patch('sys.stdout', new_callable=StringIO):
+      self.c.order_cancel(order_ids, skip_confirmation=True)
+    self.assertEqual(len(self.exchange.orders), 3)
+
+  def testPlaceOrder(self):
+    with mock.patch('sys.stdout', new_callable=StringIO):
+      self.c.order('limit', 'buy', 'C000-USD', '0.5', '-1',
+                   skip_confirmation=True)
+    order = self.exchange.orders[0]
+    self.assertEqual((order['product_id'], order['price'], order['size']),
+                     ('C000-USD', '99.00', '0.5'))
+
+  def testPlaceFastOrder(self):
+    with mock.patch('sys.stdout', new_callable=StringIO) as stdout:
+      self.c.order('limit', 'sell', 'c000-usd', '0.5', '120.456',
+                   skip_confirmation=True, fast=True)
+    order = self.exchange.orders[0]
+    self.assertEqual((order['product_id'], order['side'], order['price'],
+                      order['size']), ('C000-USD', 'sell', '120.45', '0.5'))
+    self.assertIn('Acked in', stdout.getvalue())
+    # No ticker request for an absolute price; the catalog, the warm up and
+    # the order.
+    self.assertEqual(self.exchange.request_count, 3)
+    self.assertEqual(len(self.c._fast_orders.latency), 1)
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,44 @@
+"""Unit tests for numeric."""
+
+from decimal import Decimal
+import unittest
+
+from .. import numeric
+
+class TestNumeric(unittest.TestCase):
+
+  def testToDecimal(self):
+    self.assertEqual(numeric.to_decimal('0.00000001'), Decimal('1E-8'))
+    self.assertEqual(numeric.to_decimal(0.1), Decimal('0.1'))
+    self.assertEqual(numeric.to_decimal(3), Decimal(3))
+
+  def testIsZero(self):
+    for s in ['0', '0.0000000000000000', '-0.0', '']:
+      self.assertTrue(numeric.is_zero(s), s)
+    for s in ['0.00000001', '10', '-0.5']:
+      self.assertFalse(numeric.is_zero(s), s)
+
+  def testTruncate(self):
+    self.assertEqual(numeric.truncate('1234.5678', 2), '1234.56')
+    self.assertEqual(numeric.truncate('180', 2), '180')
+
+  def testRoundDown(self):
+    test_values = [
+      (('122.459', '0.01'), '122.45'),
+      (('122.4', '0.01000000'), '122.40'),
+      (('122.47', '0.05'), '122.45'),
+      (('7.99', '1'), '7'),
+      (('0.123456789', '0.00000001'), '0.12345678'),
+    ]
+    for args, expected in test_values:
+      self.assertEqual(numeric.to_str(numeric.round_down(*args)), expected)
+
+  def testNotional(self):
+    # 0.1 * 3 three times is not 0.9 in floats.
+    self.assertEqual(numeric.notional(['0.1'] * 3, ['3'] * 3), Decimal('0.9'))
+    self.assertEqual(
+        numeric.notional(['0.00000001', '1.5'], ['4000.00', '0.1']),
+        Decimal('0.15004'))
+
+if __name__ == '__main__':
+  unittest.main()
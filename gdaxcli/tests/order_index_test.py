@@ -0,0 +1,30 @@
+"""Unit tests for order_index."""
+
+import unittest
+
+from .. import order_index
+
+class TestOpenOrderIndex(unittest.TestCase):
+
+  def setUp(self):
+    self.index = order_index.OpenOrderIndex(
+        [{'id': order_id} for order_id in ['b2', 'a1x', 'a1y', 'c3', 'a2']])
+
+  def testMatch(self):
+    ids = lambda orders: [order['id'] for order in orders]
+    self.assertListEqual(ids(self.index.match('a1')), ['a1x', 'a1y'])
+    self.assertListEqual(ids(self.index.match('a1y')), ['a1y'])
+    self.assertListEqual(ids(self.index.match('a')), ['a1x', 'a1y', 'a2'])
+    self.assertListEqual(ids(self.index.match('d')), [])
+    self.assertEqual(len(self.index.match('')), 5)
+
+  def testAddRemove(self):
+    self.index.add({'id': 'a1z'})
+    self.index.add({'id': 'a1z'})
+    self.index.remove('a1x')
+    self.index.remove('missing')
+    self.assertListEqual(self.index.ids(), ['a1y', 'a1z', 'a2', 'b2', 'c3'])
+    self.assertEqual(len(self.index), 5)
+
+if __name__ == '__main__':
+  unittest.main()
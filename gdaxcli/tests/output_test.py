@@ -0,0 +1,65 @@
+"""Unit tests for output."""
+
+from decimal import Decimal
+import io
+import json
+import unittest
+try:
+  from StringIO import StringIO
+except ImportError:
+  from io import StringIO
+
+from .. import exceptions
+from .. import output
+
+HISTORY = [
+  {'id': 1, 'amount': '-0.0100000000', 'type': 'match',
+   'details': {'product_id': 'ETH-USD'}},
+  {'id': 2, 'amount': '25.0000000000', 'type': 'transfer',
+   'details': {'transfer_type': 'deposit'}, 'extra': 'dropped in csv'},
+]
+
+class TestOutput(unittest.TestCase):
+
+  def testJsonLines(self):
+    out = StringIO()
+    self.assertEqual(output.write_records(HISTORY, 'jsonl', out), 2)
+    lines = out.getvalue().splitlines()
+    self.assertEqual([json.loads(line) for line in lines], HISTORY)
+    self.assertIn('"-0.0100000000"', lines[0])
+
+  def testDecimals(self):
+    out = StringIO()
+    output.write_records([{'total': Decimal('1E-8')}], 'jsonl', out)
+    self.assertEqual(out.getvalue(), '{"total":"0.00000001"}\n')
+
+  def testCsv(self):
+    out = StringIO()
+    output.write_records(HISTORY, 'csv', out)
+    self.assertListEqual(out.getvalue().splitlines(), [
+      'id,amount,type,details',
+      '1,-0.0100000000,match,"{""product_id"": ""ETH-USD""}"',
+      '2,25.0000000000,transfer,"{""transfer_type"": ""deposit""}"',
+    ])
+
+  def testTsv(self):
+    out = StringIO()
+    output.write_records([{'a': '1', 'b': None}], 'tsv', out)
+    self.assertEqual(out.getvalue(), 'a\tb\n1\t\n')
+
+  def testMsgpack(self):
+    try:
+      import msgpack
+    except ImportError:
+      self.skipTest('msgpack is not installed')
+    out = io.BytesIO()
+    output.write_records(HISTORY, 'msgpack', out)
+    self.assertEqual(list(msgpack.Unpacker(io.BytesIO(out.getvalue()),
+                                           raw=False)), HISTORY)
+
+  def testUnknownFormat(self):
+    with self.assertRaises(exceptions.Error):
+      output.writer('xml')
+
+if __name__ == '__main__':
+  unittest.main()
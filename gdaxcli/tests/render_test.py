@@ -0,0 +1,151 @@
+"""Unit tests for render."""
+
+import unittest
+import mock
+try:
+  from StringIO import StringIO
+except ImportError:
+  from io import StringIO
+
+from .. import render
+
+class TestTable(unittest.TestCase):
+
+  def testRender(self):
+    out = StringIO()
+    table = render.Table(['side', 'price', 'size'], accuracy=2)
+    table.add_row(['buy', 1.5, '10'], (render.GREEN, None, None))
+    table.add_row(['sell', 123.25, '0.5'])
+    table.render(out, color=False)
+    self.assertListEqual(out.getvalue().splitlines(), [
+      'side   price  size',
+      '----  ------  ----',
+      'buy     1.50    10',
+      'sell  123.25   0.5',
+    ])
+
+  def testColors(self):
+    out = StringIO()
+    table = render.Table(['side', 'price'])
+    table.add_row(['sell', 1.0])
+    table.add_row(['buy', 2.0], (render.GREEN, None))
+    self.assertIsNone(table.color('side', 0))
+    self.assertEqual(table.color('side', 1), render.GREEN)
+    self.assertIsNone(table.color('price', 1))
+    table.render(out)
+    lines = out.getvalue().splitlines()
+    self.assertEqual(lines[2], 'sell  1.0000')
+    self.assertNotEqual(lines[3], 'buy   2.0000')
+    self.assertEqual(render.visible_len(lines[3]), len(lines[2]))
+
+  def testToDicts(self):
+    table = render.Table(['side', 'price'])
+    table.add_row(['sell', 1.0], (render.RED, None))
+    rows = table.to_dicts()
+    self.assertListEqual(list(rows[0].keys()), ['side', 'price'])
+    self.assertIn('sell', rows[0]['side'])
+    self.assertNotEqual(rows[0]['side'], 'sell')
+    self.assertEqual(rows[0]['price'], 1.0)
+
+class TestStreamingTable(unittest.TestCase):
+
+  def testColumnsLineUp(self):
+    out = StringIO()
+    table = render.StreamingTable([('side', 5), ('price', 8)], out=out)
+    table.write_row(['buy', 1.5], (render.GREEN, None))
+    table.write_row(['sell', 123.25])
+    lines = out.getvalue().splitlines()
+    self.assertListEqual(lines[:2], ['side   price', '-----  --------'])
+    self.assertEqual(render.visible_len(lines[2]), len(lines[3]))
+    self.assertEqual(lines[3], 'sell   123.2500')
+    self.assertEqual(table.row_count, 2)
+
+class TestColorsOnStdout(unittest.TestCase):
+  """First output to stdout that's not a terminal, before colorama's set up."""
+
+  def _check_plain(self, write):
+    import colorama
+    with mock.patch('sys.stdout', new_callable=StringIO) as stdout, \
+        mock.patch.object(render, '_colorama', None):
+      try:
+        write()
+      finally:
+        # Puts back the StringIO; the patch then puts back the real stdout.
+        colorama.deinit()
+    self.assertIn('x', stdout.getvalue())
+    self.assertNotIn('\x1b', stdout.getvalue())
+
+  def testTable(self):
+    table = render.Table(['a', 'b'])
+    table.add_row(['x', 1.0], (render.RED, None))
+    self._check_plain(table.render)
+
+  def testStreamingTable(self):
+    table = render.StreamingTable([('a', 3), ('b', 6)])
+    self._check_plain(lambda: table.write_row(['x', 1.0], (render.RED, None)))
+
+  def testScreen(self):
+    table = render.Table(['a', 'b'])
+    table.add_row(['x', 1.0], (render.RED, None))
+    self._check_plain(
+        lambda: render.Screen(lines=50).draw(table, 'total\n'))
+
+class TestScreen(unittest.TestCase):
+
+  def _table(self, prices):
+    table = render.Table(['product_id', 'price'], accuracy=2)
+    for product_id, price in zip(['BTC-USD', 'ETH-USD'], prices):
+      table.add_row([product_id, price])
+    return table
+
+  def testRedrawsOnlyChangedCells(self):
+    out = StringIO()
+    screen = render.Screen(out)
+    screen.draw(self._table([100.0, 200.0]), 'total: 300\n')
+    self.assertTrue(out.getvalue().startswith(render.CLEAR_SCREEN))
+    self.assertIn('total: 300', out.getvalue())
+
+    out.seek(0)
+    out.truncate()
+    screen.draw(self._table([100.0, 150.0]), 'total: 250\n')
+    changes = out.getvalue()
+    self.assertNotIn(render.CLEAR_SCREEN, changes)
+    self.assertNotIn('100.00', changes)
+    self.assertNotIn('ETH-USD', changes)
+    # Row 2 of the table is line 4 of the screen, after the header lines.
+    self.assertIn('\x1b[4;13H', changes)
+    self.assertIn(render.get_colorama().Fore.RED + '150.00', changes)
+    self.assertIn('total: 250', changes)
+
+    # Unchanged, but drawn again without the flash.
+    out.seek(0)
+    out.truncate()
+    screen.draw(self._table([100.0, 150.0]), 'total: 250\n')
+    self.assertEqual(out.getvalue(), '\x1b[4;13H150.00\x1b[6;1H')
+
+    out.seek(0)
+    out.truncate()
+    screen.draw(self._table([100.0, 150.0]), 'total: 250\n')
+    self.assertEqual(out.getvalue(), '')
+
+  def testRedrawsAllWhenWidthsChange(self):
+    out = StringIO()
+    screen = render.Screen(out)
+    screen.draw(self._table([100.0, 200.0]))
+    out.seek(0)
+    out.truncate()
+    screen.draw(self._table([100.0, 2000.0]))
+    self.assertTrue(out.getvalue().startswith(render.CLEAR_SCREEN))
+
+  def testRedrawsAllWhenTallerThanTerminal(self):
+    out = StringIO()
+    screen = render.Screen(out, lines=5)
+    for price in (200.0, 150.0):
+      out.seek(0)
+      out.truncate()
+      screen.draw(self._table([100.0, price]), 'total\n')
+      self.assertTrue(out.getvalue().startswith(render.CLEAR_SCREEN))
+      self.assertIn('BTC-USD', out.getvalue())
+
+if __name__ == '__main__':
+  unittest.main()
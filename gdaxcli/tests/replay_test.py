@@ -0,0 +1,131 @@
+"""Unit tests for replay."""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from .. import feed
+from .. import feedlog
+from .. import replay
+from . import mock_exchange
+from .feed_test import wait_for
+
+class TestPacing(unittest.TestCase):
+
+  def testParseSpeed(self):
+    self.assertIsNone(replay.parse_speed('max'))
+    self.assertEqual(replay.parse_speed('2.5'), 2.5)
+    with self.assertRaises(ValueError):
+      replay.parse_speed('0')
+
+  def testPaced(self):
+    now = [100.0]
+    messages = [(10.0, b'a'), (12.0, b'b'), (11.0, b'c')]
+    waits = [wait for _, _, wait in
+             replay.paced(messages, 2, clock=lambda: now[0])]
+    self.assertListEqual(waits, [0, 1.0, 0.5])
+    waits = [wait for _, _, wait in replay.paced(messages, None)]
+    self.assertListEqual(waits, [0, 0, 0])
+
+  def testProductId(self):
+    self.assertEqual(replay._product_id(b'{"type": "ticker", '
+                                        b'"product_id": "ETH-USD"}'),
+                     'ETH-USD')
+    self.assertIsNone(replay._product_id(b'{"type": "heartbeat"}'))
+
+class TestRecordAndReplay(unittest.TestCase):
+
+  def setUp(self):
+    self.tmp_dir = tempfile.mkdtemp()
+    self.path = os.path.join(self.tmp_dir, 'feed.log')
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp_dir)
+
+  def testRoundTrip(self):
+    messages = mock_exchange.feed_session(['ETH-USD', 'BTC-USD'], updates=50)
+    writer = feedlog.LogWriter(self.path, block_messages=10)
+    with mock_exchange.WebSocketReplayServer([messages]) as server:
+      f = feed.Feed(['ETH-USD', 'BTC-USD'], url=server.url,
+                    on_message=writer.write).start()
+      try:
+        self.assertTrue(wait_for(lambda: writer.message_count == len(messages)))
+      finally:
+        f.stop()
+    writer.close()
+
+    with feedlog.LogReader(self.path) as reader:
+      self.assertListEqual([json.loads(m.decode('utf-8'))
+                            for _, m in reader.messages()], messages)
+
+    with replay.ReplayServer(self.path, speed=None) as server:
+      eth = feed.Feed(['ETH-USD'], url=server.url).start()
+      try:
+        self.assertTrue(wait_for(lambda: eth.book('ETH-USD') is not None and
+                                 eth.book('ETH-USD').sequence == 50))
+        self.assertTrue(wait_for(lambda: server.sent == 51))
+        self.assertEqual(eth.resync_count, 0)
+      finally:
+        eth.stop()
+
+  def testResyncGetsSnapshot(self):
+    messages = mock_exchange.feed_session(['ETH-USD'], updates=50)
+    # Sequence 20 was lost while recording.
+    del messages[20]
+    with feedlog.LogWriter(self.path) as log:
+      for message in messages:
+        log.write(json.dumps(message))
+    expected = feed.OrderBook('ETH-USD')
+    expected.load_snapshot(messages[0]['bids'], messages[0]['asks'])
+    for message in messages[1:]:
+      for side, price, size in message['changes']:
+        expected.update(side, price, size)
+
+    with replay.ReplayServer(self.path, speed=None) as server:
+      f = feed.Feed(['ETH-USD'], url=server.url).start()
+      try:
+        self.assertTrue(wait_for(lambda: f.book('ETH-USD') is not None and
+                                 f.book('ETH-USD').sequence == 50))
+        self.assertEqual(f.resync_count, 1)
+        for side in ('buy', 'sell'):
+          self.assertListEqual(f.levels('ETH-USD', side, 20),
+                               expected.levels(side, 20))
+      finally:
+        f.stop()
+
+  def testBooksFoldUpdates(self):
+    books = replay._Books()
+    self.assertIsNone(books.snapshot('ETH-USD'))
+    books.add('ETH-USD', b'{"type": "l2update", "sequence": 1, '
+                         b'"changes": [["buy", "1.00", "1"]]}')
+    self.assertIsNone(books.snapshot('ETH-USD'))
+    for message in mock_exchange.feed_session(['ETH-USD'], levels=2,
+                                              updates=2):
+      books.add('ETH-USD', json.dumps(message).encode('utf-8'))
+    snapshot = json.loads(books.snapshot('ETH-USD'))
+    self.assertEqual(snapshot['sequence'], 2)
+    # Update 1 removed 99.99; update 2 set 100.02 to 1.
+    self.assertListEqual(snapshot['bids'], [['99.98', '1.0']])
+    self.assertListEqual(snapshot['asks'], [['100.01', '1.0'],
+                                            ['100.02', '1.0']])
+
+  def testPacedReplay(self):
+    with feedlog.LogWriter(self.path) as log:
+      for i, message in enumerate(mock_exchange.feed_session(['ETH-USD'],
+                                                             updates=4)):
+        log.write(json.dumps(message), received_at=1000 + i)
+    # Four seconds of messages at 20x.
+    with replay.ReplayServer(self.path, speed=20) as server:
+      start = time.time()
+      f = feed.Feed(['ETH-USD'], url=server.url).start()
+      try:
+        self.assertTrue(wait_for(lambda: server.sent == 5))
+        self.assertGreaterEqual(time.time() - start, 0.2)
+      finally:
+        f.stop()
+
+if __name__ == '__main__':
+  unittest.main()
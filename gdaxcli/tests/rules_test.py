@@ -0,0 +1,61 @@
+"""Unit tests for rules."""
+
+import unittest
+
+from .. import exceptions
+from .. import rules
+
+PRODUCTS = [
+  {'id': 'BTC-USD', 'base_min_size': '0.001', 'base_max_size': '70',
+   'base_increment': '0.00000001', 'quote_increment': '0.01',
+   'status': 'online'},
+  {'id': 'ETH-BTC', 'base_min_size': '0.01', 'base_max_size': '1000000',
+   'quote_increment': '0.00001', 'status': 'online', 'limit_only': True},
+  {'id': 'BCH-USD', 'status': 'delisted', 'trading_disabled': True},
+]
+
+class TestRulesIndex(unittest.TestCase):
+
+  def setUp(self):
+    self.index = rules.RulesIndex(PRODUCTS)
+
+  def assertReason(self, reason, *order):
+    with self.assertRaises(exceptions.InvalidOrderError) as context:
+      self.index.check(*order)
+    self.assertEqual(context.exception.reason, reason)
+
+  def testValid(self):
+    self.assertEqual(
+        self.index.check('limit', 'buy', 'BTC-USD', '0.5', '-10'),
+        '0.50000000')
+    self.assertEqual(
+        self.index.check('limit', 'sell', 'ETH-BTC', '.25', '0.07'), '.25')
+
+  def testRoundsSizeDown(self):
+    self.assertEqual(
+        self.index.check('market', 'sell', 'BTC-USD', '0.123456789'),
+        '0.12345678')
+
+  def testReasons(self):
+    self.assertReason('order_type', 'fok', 'buy', 'BTC-USD', '1', '1')
+    self.assertReason('side', 'limit', 'hold', 'BTC-USD', '1', '1')
+    self.assertReason('product', 'limit', 'buy', 'LTC-USD', '1', '1')
+    self.assertReason('trading', 'limit', 'buy', 'BCH-USD', '1', '1')
+    self.assertReason('market_orders', 'market', 'buy', 'ETH-BTC', '1')
+    self.assertReason('size', 'limit', 'buy', 'BTC-USD', 'lots', '1')
+    self.assertReason('size', 'limit', 'buy', 'BTC-USD', '-1', '1')
+    self.assertReason('min_size', 'limit', 'buy', 'BTC-USD', '0.0009', '1')
+    self.assertReason('max_size', 'limit', 'buy', 'BTC-USD', '71', '1')
+    self.assertReason('price', 'limit', 'buy', 'BTC-USD', '1', '')
+    self.assertReason('price', 'limit', 'buy', 'BTC-USD', '1', 'ten')
+    self.assertReason('price', 'limit', 'buy', 'BTC-USD', '1', '0')
+
+  def testRules(self):
+    btc = self.index.get('BTC-USD')
+    self.assertEqual(str(btc.quote_increment), '0.01')
+    self.assertIsNone(self.index.get('BCH-USD').min_size)
+    self.assertIn('ETH-BTC', self.index)
+    self.assertNotIn('LTC-USD', self.index)
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,79 @@
+"""Unit tests for shell."""
+
+import threading
+import unittest
+
+import mock
+
+from .. import exceptions
+from .. import shell
+
+class TestShell(unittest.TestCase):
+
+  def setUp(self):
+    self.client = mock.Mock()
+    self.client.product_ids.return_value = ['BTC-USD', 'ETH-BTC', 'ETH-USD']
+    self.client.open_order_ids.return_value = ['d50ec984-77a8', 'd5b3a1ff-10c2']
+    self.shell = shell.Shell(self.client)
+
+  def testCompleteCommands(self):
+    self.assertEqual(self.shell.completenames('or'), ['orders', 'order'])
+
+  def testCompleteProducts(self):
+    self.assertEqual(self.shell.completedefault('ETH', 'ticker ETH', 7, 10),
+                     ['ETH-BTC', 'ETH-USD'])
+    self.assertEqual(self.shell.completedefault('eth-u', 'ticker eth-u', 7, 12),
+                     ['eth-usd'])
+
+  def testCompleteOrderIds(self):
+    line = 'order cancel d5b'
+    self.assertEqual(self.shell.completedefault('d5b', line, 13, len(line)),
+                     ['d5b3a1ff-10c2'])
+    self.assertIn('cancel', self.shell.completedefault('', 'order ', 6, 6))
+
+  @mock.patch('gdaxcli.__main__.run')
+  def testRunsOnSameClient(self, run):
+    self.assertFalse(self.shell.onecmd('ticker eth-usd'))
+    self.assertFalse(self.shell.onecmd('balance --quote BTC'))
+    run.assert_has_calls([
+        mock.call(self.client, ['ticker', 'eth-usd']),
+        mock.call(self.client, ['balance', '--quote', 'BTC'])])
+    self.assertEqual(self.shell.refresher.product_ids, ['ETH-USD'])
+
+  @mock.patch('gdaxcli.__main__.run')
+  def testErrorsDontExit(self, run):
+    run.side_effect = [SystemExit(1), exceptions.ApiError('boom'),
+                       ValueError('bad')]
+    with mock.patch('sys.stdout'), mock.patch('sys.stderr'):
+      for _ in range(3):
+        self.assertFalse(self.shell.onecmd('bogus'))
+    self.assertTrue(self.shell.onecmd('exit'))
+
+class TestRefresher(unittest.TestCase):
+
+  def setUp(self):
+    self.client = mock.Mock()
+    self.busy = threading.Lock()
+    self.refresher = shell.Refresher(self.client, self.busy)
+
+  def testRefresh(self):
+    self.refresher.watch(['ETH-USD', 'BTC-USD'])
+    self.refresher.refresh()
+    self.client.refresh_open_orders.assert_called_once_with()
+    self.client.refresh_prices.assert_called_once_with(['BTC-USD', 'ETH-USD'])
+
+  def testSkipsWhileBusy(self):
+    with self.busy:
+      self.refresher.refresh()
+    self.assertFalse(self.client.refresh_open_orders.called)
+
+  def testWatchKeepsRecentProducts(self):
+    for i in range(shell.MAX_WATCHED_PRODUCTS + 2):
+      self.refresher.watch(['P%d' % i])
+    self.assertEqual(len(self.refresher.product_ids),
+                     shell.MAX_WATCHED_PRODUCTS)
+    self.assertEqual(self.refresher.product_ids[0],
+                     'P%d' % (shell.MAX_WATCHED_PRODUCTS + 1))
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,73 @@
+"""Startup cost tests.
+
+Runs the cli in a subprocess with python -X importtime to check that help
+doesn't import heavy libraries or build a client, and that importing
+gdax_utils stays cheap. Catches regressions from module level imports.
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+# Libraries that must only be imported by the commands that use them.
+HEAVY_MODULES = ['gdax', 'requests', 'tabulate', 'colorama', 'websocket',
+                 'sqlite3', 'multiprocessing', 'numpy']
+
+# Budget in microseconds for the cumulative import time of gdaxcli modules.
+# Generous compared to what it takes (~30ms), to avoid flakiness on slow
+# machines; it catches a heavy library sneaking back in (~200ms).
+IMPORT_BUDGET_US = 100000
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+
+def _parse_importtime(stderr):
+  """Returns a dict of module name -> cumulative import time in us."""
+  times = {}
+  for line in stderr.splitlines():
+    if not line.startswith('import time:') or 'cumulative' in line:
+      continue
+    _, cumulative, name = line[len('import time:'):].split('|')
+    times[name.strip()] = int(cumulative)
+  return times
+
+@unittest.skipIf(sys.version_info < (3, 7), 'needs python -X importtime')
+class TestStartup(unittest.TestCase):
+
+  def setUp(self):
+    # An empty home: no config file, so building a client would fail.
+    self.home = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.home)
+
+  def _run(self, args):
+    env = dict(os.environ, HOME=self.home, PYTHONPATH=ROOT_DIR)
+    process = subprocess.Popen(
+        [sys.executable, '-X', 'importtime'] + args, cwd=self.home, env=env,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True)
+    stdout, stderr = process.communicate()
+    self.assertEqual(process.returncode, 0, stderr)
+    return stdout, _parse_importtime(stderr)
+
+  def assertNoHeavyImports(self, times):
+    for module in HEAVY_MODULES:
+      self.assertNotIn(module, times)
+
+  def testHelp(self):
+    for args in (['help'], []):
+      stdout, times = self._run(['-m', 'gdaxcli'] + args)
+      self.assertIn('Usage: gdaxcli', stdout)
+      self.assertNoHeavyImports(times)
+
+  def testImportGdaxUtils(self):
+    _, times = self._run(['-c', 'import gdaxcli.gdax_utils'])
+    self.assertNoHeavyImports(times)
+    self.assertLess(times['gdaxcli.gdax_utils'], IMPORT_BUDGET_US)
+
+if __name__ == '__main__':
+  unittest.main()
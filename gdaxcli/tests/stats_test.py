@@ -0,0 +1,87 @@
+"""Unit tests for stats."""
+
+import random
+import unittest
+
+from .. import stats
+
+def _fill(trade_id, side, price, size, fee='0', created_at=None):
+  return {
+    'product_id': 'ETH-USD', 'trade_id': trade_id, 'side': side,
+    'price': price, 'size': size, 'fee': fee,
+    'created_at': created_at or '2017-09-%02dT12:00:00.000000Z' % (
+        trade_id // 10 + 1),
+  }
+
+def _fifo_loop(fills):
+  """Reference FIFO realized P&L, one fill at a time."""
+  lots, realized = [], 0.0
+  for fill in sorted(fills, key=lambda f: (f['created_at'], f['trade_id'])):
+    size, price = float(fill['size']), float(fill['price'])
+    if fill['side'] == 'buy':
+      lots.append([size, price])
+      continue
+    while size > 1e-12 and lots:
+      used = min(size, lots[0][0])
+      realized += used * (price - lots[0][1])
+      size -= used
+      lots[0][0] -= used
+      if lots[0][0] <= 1e-12:
+        lots.pop(0)
+  return realized, lots
+
+class TestStats(unittest.TestCase):
+
+  def testSummarize(self):
+    fills = [
+      _fill(1, 'buy', '100', '1', fee='0.25'),
+      _fill(2, 'buy', '200', '1', fee='0.5'),
+      _fill(3, 'sell', '300', '1.5'),
+    ]
+    by_product = stats.load(reversed(fills))
+    summary = stats.summarize(by_product['ETH-USD'], current_price=400)
+    self.assertEqual(summary.fills, 3)
+    self.assertEqual(summary.buy_vwap, 150)
+    self.assertEqual(summary.sell_vwap, 300)
+    self.assertEqual(summary.position, 0.5)
+    # 1 @ 100 and 0.5 @ 200 sold at 300.
+    self.assertAlmostEqual(summary.realized_pnl, 200 + 50)
+    self.assertAlmostEqual(summary.unrealized_pnl, 0.5 * (400 - 200))
+    self.assertEqual(summary.fees, 0.75)
+
+  def testSellsWithoutBuysAreLeftOut(self):
+    fills = [
+      _fill(1, 'sell', '300', '2'),
+      _fill(2, 'buy', '100', '1'),
+      _fill(3, 'sell', '150', '0.5'),
+    ]
+    fills = stats.load(fills)['ETH-USD']
+    self.assertAlmostEqual(stats.fifo_pnl(fills)[0], 25)
+    self.assertIsNone(stats.fifo_pnl(fills)[1])
+
+  def testFifoMatchesLoop(self):
+    rand = random.Random(7)
+    fills = [_fill(index, rand.choice(['buy', 'sell']),
+                   '%.2f' % rand.uniform(100, 200),
+                   '%.4f' % rand.uniform(0.01, 3))
+             for index in range(500)]
+    expected, lots = _fifo_loop(fills)
+    realized, unrealized = stats.fifo_pnl(stats.load(fills)['ETH-USD'], 150)
+    self.assertAlmostEqual(realized, expected, places=6)
+    self.assertAlmostEqual(
+        unrealized, sum(size * (150 - price) for size, price in lots),
+        places=6)
+
+  def testDailyVolume(self):
+    fills = stats.load([
+      _fill(1, 'buy', '100', '1'),
+      _fill(2, 'sell', '200', '2'),
+      _fill(11, 'buy', '100', '0.5'),
+    ])['ETH-USD']
+    self.assertListEqual(stats.daily_volume(fills), [
+      stats.DailyVolume('ETH-USD', '2017-09-01', 2, 3.0, 500.0),
+      stats.DailyVolume('ETH-USD', '2017-09-02', 1, 0.5, 50.0),
+    ])
+
+if __name__ == '__main__':
+  unittest.main()
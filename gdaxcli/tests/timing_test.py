@@ -0,0 +1,84 @@
+"""Unit tests for timing."""
+
+import json
+import unittest
+try:
+  from StringIO import StringIO
+except ImportError:
+  from io import StringIO
+
+from .. import timing
+
+class TestRecorder(unittest.TestCase):
+
+  def setUp(self):
+    self.recorder = timing.Recorder()
+    url = 'https://api.gdax.com/orders/0428b97b-bec1-429e-a94c-59232926778d'
+    # Two overlapping requests, 1.5s in flight, then 1s waiting on the
+    # limiter and a third request.
+    self.recorder.add_request('GET', url, 200, 100, 10.0, 1.0)
+    self.recorder.add_request('GET', url + '?a=1', 404, 50, 10.5, 1.0)
+    self.recorder.add_wait(11.5, 1.0)
+    self.recorder.add_request('GET', 'https://api.gdax.com/time', 200, 10,
+                              12.5, 0.5)
+    self.recorder.add_phase('command', 4.0)
+    self.recorder.add_phase('render', 0.25)
+    self.recorder.add_phase('render', 0.25)
+
+  def testEndpoint(self):
+    self.assertEqual(
+        timing.endpoint('DELETE', 'https://api.gdax.com/orders/'
+                        '0428b97b-bec1-429e-a94c-59232926778d?x=1'),
+        'DELETE /orders/:id')
+    self.assertEqual(timing.endpoint('GET', 'http://localhost:80'), 'GET /')
+
+  def testDerivedPhases(self):
+    self.assertListEqual(self.recorder.derived_phases(), [
+      ('command', 4.0), ('fetch', 2.0), ('throttle', 1.0),
+      ('transform', 0.5), ('render', 0.5)])
+
+  def testEndpointTable(self):
+    table = self.recorder.endpoint_table()
+    self.assertListEqual(table.column('endpoint'),
+                         ['GET /orders/:id', 'GET /time'])
+    self.assertListEqual(table.column('calls'), [2, 1])
+    self.assertListEqual(table.column('errors'), [1, 0])
+    self.assertListEqual(table.column('bytes'), [150, 10])
+
+  def testJsonLines(self):
+    lines = [json.loads(line) for line in
+             self.recorder.json_lines('orders', {'retried': 1})]
+    self.assertEqual(lines[0], {'type': 'phase', 'command': 'orders',
+                                'name': 'command', 'seconds': 4.0})
+    self.assertEqual(len([l for l in lines if l['type'] == 'request']), 3)
+    self.assertEqual(lines[-1], {'type': 'counters', 'command': 'orders',
+                                 'retried': 1})
+
+  def testPrintSummary(self):
+    out = StringIO()
+    self.recorder.print_summary(out, {'requests': 3})
+    self.assertIn('throttle', out.getvalue())
+    self.assertIn('GET /orders/:id', out.getvalue())
+    self.assertTrue(out.getvalue().endswith('requests: 3\n'))
+
+class TestLatencyHistogram(unittest.TestCase):
+
+  def testPercentilesAndBuckets(self):
+    histogram = timing.LatencyHistogram()
+    self.assertIsNone(histogram.percentile(50))
+    for ms in [3, 3.5, 5, 7, 30]:
+      histogram.add(ms / 1000.0)
+    self.assertEqual(histogram.percentile(50), 0.005)
+    self.assertEqual(histogram.percentile(100), 0.03)
+    self.assertListEqual(histogram.buckets(), [
+        ('<= 4ms', 2), ('<= 8ms', 2), ('<= 16ms', 0), ('<= 32ms', 1)])
+    out = StringIO()
+    histogram.print_summary(out, width=4)
+    lines = out.getvalue().splitlines()
+    self.assertEqual(lines[0], '    <= 4ms #### 2')
+    self.assertEqual(lines[2], '   <= 16ms      0')
+    self.assertEqual(lines[-1], 'n=5  p50=5.0ms  p90=30.0ms  p99=30.0ms  '
+                                'max=30.0ms')
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,87 @@
+"""Unit tests for transport."""
+
+import unittest
+
+import mock
+import requests
+
+from .. import exceptions
+from .. import timing
+from .. import transport
+from .. import utils
+
+def _response(status, headers=None):
+  response = mock.Mock()
+  response.status_code = status
+  response.headers = headers or {}
+  return response
+
+class TestTransport(unittest.TestCase):
+
+  def setUp(self):
+    self.transport = transport.Transport(max_retries=2, backoff=0)
+    self.transport.session = mock.Mock()
+    self.request = self.transport.session.request
+
+  def testRetriesGet(self):
+    ok = _response(200)
+    self.request.side_effect = [
+        _response(429, {'Retry-After': '0'}), requests.ConnectionError(), ok]
+    self.assertIs(self.transport.get('https://api.gdax.com/time'), ok)
+    self.assertEqual(self.request.call_count, 3)
+    self.assertEqual(self.transport.counters['retried'], 2)
+    self.assertEqual(self.transport.counters['rate_limited'], 1)
+    self.assertEqual(self.transport.counters['requests'], 3)
+
+  def testGivesUp(self):
+    self.request.return_value = _response(503)
+    with self.assertRaises(exceptions.ApiError):
+      self.transport.get('https://api.gdax.com/time')
+    self.assertEqual(self.request.call_count, 3)
+
+  def testDoesNotRetryPost(self):
+    response = _response(503)
+    self.request.return_value = response
+    self.assertIs(self.transport.post('https://api.gdax.com/orders'), response)
+    self.assertEqual(self.request.call_count, 1)
+
+  def testLimiterByAuth(self):
+    self.transport._public_limiter = mock.Mock(spec=utils.RateLimiter)
+    self.transport._private_limiter = mock.Mock(spec=utils.RateLimiter)
+    self.transport._public_limiter.acquire.return_value = False
+    self.transport._private_limiter.acquire.return_value = True
+    self.request.return_value = _response(200)
+    self.transport.get('https://api.gdax.com/products')
+    self.transport.get('https://api.gdax.com/fills', auth=object())
+    self.assertEqual(self.transport._public_limiter.acquire.call_count, 1)
+    self.assertEqual(self.transport._private_limiter.acquire.call_count, 1)
+    self.assertEqual(self.transport.counters['throttled'], 1)
+
+  def testRecordsRequests(self):
+    self.transport.recorder = timing.Recorder()
+    response = _response(200)
+    response.content = b'[]'
+    self.request.return_value = response
+    self.transport.get('https://api.gdax.com/products')
+    request, = self.transport.recorder.requests
+    self.assertEqual(request['endpoint'], 'GET /products')
+    self.assertEqual(request['status'], 200)
+    self.assertEqual(request['bytes'], 2)
+
+class TestRouter(unittest.TestCase):
+
+  def testRoutesByAuth(self):
+    router = transport._Router()
+    first, second = mock.Mock(), mock.Mock()
+    auth = object.__new__(type('Auth', (object,), {}))
+    router.add(auth, first)
+    router.default = second
+    router.get('https://api.gdax.com/accounts', auth=auth)
+    router.get('https://api.gdax.com/products')
+    first.request.assert_called_once_with(
+        'GET', 'https://api.gdax.com/accounts', auth=auth)
+    second.request.assert_called_once_with(
+        'GET', 'https://api.gdax.com/products')
+
+if __name__ == '__main__':
+  unittest.main()
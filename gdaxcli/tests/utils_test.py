@@ -0,0 +1,136 @@
+"""Unit tests for utils."""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from .. import exceptions
+from .. import utils
+
+class TestParallelMap(unittest.TestCase):
+
+  def testKeepsOrder(self):
+    def slow_square(x):
+      time.sleep(0.01 * (5 - x))
+      return x * x
+    self.assertListEqual(utils.parallel_map(slow_square, range(5), 5),
+                         [0, 1, 4, 9, 16])
+
+  def testBoundsWorkers(self):
+    lock = threading.Lock()
+    state = {'running': 0, 'max': 0}
+    def track(_):
+      with lock:
+        state['running'] += 1
+        state['max'] = max(state['max'], state['running'])
+      time.sleep(0.01)
+      with lock:
+        state['running'] -= 1
+    utils.parallel_map(track, range(12), 3)
+    self.assertLessEqual(state['max'], 3)
+
+  def testRaises(self):
+    def fail(x):
+      raise ValueError(x)
+    with self.assertRaises(ValueError):
+      utils.parallel_map(fail, range(3), 3)
+
+  def testImapKeepsOrder(self):
+    def slow_first(x):
+      time.sleep(0.05 if x == 0 else 0)
+      return x * 2
+    self.assertListEqual(list(utils.parallel_imap(slow_first, range(5), 3)),
+                         [0, 2, 4, 6, 8])
+
+  def testPrefetchStartsRightAway(self):
+    started = threading.Event()
+    def call(x):
+      started.set()
+      return x * 2
+    results = utils.parallel_prefetch(call, range(3), 2)
+    self.assertTrue(started.wait(1))
+    self.assertListEqual(list(results), [0, 2, 4])
+
+class TestMergeSorted(unittest.TestCase):
+
+  def testMerge(self):
+    merged = utils.merge_sorted([[1, 4, 9], [], [2, 3, 10]], key=lambda x: x)
+    self.assertListEqual(list(merged), [1, 2, 3, 4, 9, 10])
+
+  def testReverseIsLazyAndStable(self):
+    pulled = []
+    def items(name, keys):
+      for k in keys:
+        pulled.append((name, k))
+        yield name, k
+    merged = utils.merge_sorted(
+        [items('a', 'zyb'), items('b', 'yx')], key=lambda item: item[1],
+        reverse=True)
+    self.assertListEqual([next(merged) for _ in range(3)],
+                         [('a', 'z'), ('a', 'y'), ('b', 'y')])
+    self.assertNotIn(('b', 'x'), pulled)
+
+class TestTime(unittest.TestCase):
+
+  def testParseAndFormat(self):
+    self.assertEqual(utils.parse_time('1970-01-02'), 86400)
+    self.assertEqual(utils.parse_time('1970-01-01T00:01'), 60)
+    self.assertEqual(utils.format_time(60), '1970-01-01T00:01:00Z')
+    with self.assertRaises(ValueError):
+      utils.parse_time('yesterday')
+
+class TestRateLimiter(unittest.TestCase):
+
+  def testBurstThenThrottle(self):
+    limiter = utils.RateLimiter(rate=50, burst=5)
+    start = time.time()
+    for _ in range(5):
+      limiter.acquire()
+    self.assertLess(time.time() - start, 0.05)
+    for _ in range(5):
+      limiter.acquire()
+    self.assertGreaterEqual(time.time() - start, 0.08)
+
+class TestConfig(unittest.TestCase):
+
+  def setUp(self):
+    self.tmp_dir = tempfile.mkdtemp()
+    self.path = os.path.join(self.tmp_dir, 'config')
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp_dir)
+
+  def _write(self, data):
+    with open(self.path, 'w') as f:
+      f.write(data)
+
+  def testLegacyFormat(self):
+    self._write('PASS\nKEY\nU0VDUkVU\n')
+    self.assertListEqual(utils.read_profiles(self.path), [
+        ('default', {'passphrase': 'PASS', 'key': 'KEY', 'secret': 'U0VDUkVU'})])
+    self.assertEqual(utils.read_config(self.path)['key'], 'KEY')
+
+  def testProfiles(self):
+    self._write('[main]\npassphrase = P1\nkey = K1\nsecret = S1==\n\n'
+                '[sub]\npassphrase = P%2\nkey = K2\nsecret = S2\n')
+    profiles = utils.read_profiles(self.path)
+    self.assertListEqual([name for name, _ in profiles], ['main', 'sub'])
+    self.assertEqual(profiles[0][1]['secret'], 'S1==')
+    self.assertEqual(utils.read_config(self.path)['key'], 'K1')
+    self.assertEqual(utils.read_config(self.path, 'sub')['passphrase'], 'P%2')
+    self.assertListEqual(
+        [name for name, _ in utils.select_profiles(profiles, ['sub', 'main'])],
+        ['sub', 'main'])
+    with self.assertRaises(exceptions.Error):
+      utils.select_profiles(profiles, ['main', 'other'])
+
+  def testMissingKey(self):
+    self._write('[main]\npassphrase = P1\nkey = K1\n')
+    with self.assertRaises(exceptions.Error):
+      utils.read_profiles(self.path)
+
+if __name__ == '__main__':
+  unittest.main()
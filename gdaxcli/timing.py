@@ -0,0 +1,234 @@
+"""Timing of a command: HTTP requests and phases.
+
+A Recorder is handed to the Client and its Transport when --profile or
+--profile-jsonl is given. Every request is recorded with its endpoint, status,
+size and latency, and named phases (import, config, command, render) with
+their wall clock time. From those, fetch is the time at least one request was
+in flight, throttle the time spent only waiting for the rate limiter, and
+transform is what's left of the command after those and render.
+
+LatencyHistogram keeps the submit to ack latency of orders placed with
+--fast.
+"""
+
+import bisect
+import json
+import math
+import re
+import threading
+import time
+
+from gdaxcli import render
+
+# Phases printed first, in this order.
+PHASES = ['import', 'config', 'command', 'fetch', 'throttle', 'transform',
+          'render']
+
+# Ids in paths, e.g. /orders/<uuid>, grouped into one endpoint.
+_ID = re.compile(r'/[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-'
+                 r'[0-9a-f]{12}')
+
+def endpoint(method, url):
+  """Returns e.g. 'GET /products/ETH-USD/ticker' for a request url."""
+  path = url.split('://', 1)[-1]
+  path = '/' + path.split('/', 1)[1] if '/' in path else '/'
+  return '%s %s' % (method, _ID.sub('/:id', path.split('?', 1)[0]))
+
+def _union(intervals):
+  """Total length covered by (start, seconds) intervals."""
+  total, end = 0, None
+  for start, stop in sorted((start, start + seconds)
+                            for start, seconds in intervals):
+    if end is None or start > end:
+      total += stop - start
+      end = stop
+    elif stop > end:
+      total += stop - end
+      end = stop
+  return total
+
+class _Phase(object):
+
+  def __init__(self, recorder, name):
+    self._recorder = recorder
+    self._name = name
+
+  def __enter__(self):
+    self._start = time.time()
+
+  def __exit__(self, *exc_info):
+    self._recorder.add_phase(self._name, time.time() - self._start)
+
+class _NoPhase(object):
+
+  def __enter__(self):
+    pass
+
+  def __exit__(self, *exc_info):
+    pass
+
+NO_PHASE = _NoPhase()
+
+class Recorder(object):
+  """Collects request timings and phase durations. Thread-safe."""
+
+  def __init__(self):
+    self.requests = []
+    self.waits = []
+    self.phases = {}
+    self._lock = threading.Lock()
+
+  def phase(self, name):
+    """Context manager adding the time spent in it to phase name."""
+    return _Phase(self, name)
+
+  def add_phase(self, name, seconds):
+    with self._lock:
+      self.phases[name] = self.phases.get(name, 0) + seconds
+
+  def add_request(self, method, url, status, size, start, seconds):
+    """Records a request.
+
+    Args:
+      method, url: Of the request.
+      status: HTTP status, or None if no response came back.
+      size: Bytes in the response body.
+      start: Time the request was sent.
+      seconds: Latency until the whole response was read.
+    """
+    with self._lock:
+      self.requests.append({
+          'endpoint': endpoint(method, url),
+          'status': status,
+          'bytes': size,
+          'start': start,
+          'seconds': seconds,
+      })
+
+  def add_wait(self, start, seconds):
+    """Records time spent waiting for a rate limiter token."""
+    with self._lock:
+      self.waits.append((start, seconds))
+
+  def derived_phases(self):
+    """Returns phases including fetch, throttle and transform, in PHASES
+    order."""
+    phases = dict(self.phases)
+    requests = [(r['start'], r['seconds']) for r in self.requests]
+    if requests:
+      phases['fetch'] = _union(requests)
+    if self.waits:
+      phases['throttle'] = _union(requests + self.waits) - _union(requests)
+    if 'command' in phases:
+      phases['transform'] = max(
+          phases['command'] - phases.get('fetch', 0) -
+          phases.get('throttle', 0) - phases.get('render', 0), 0)
+    names = [name for name in PHASES if name in phases]
+    names += sorted(set(phases) - set(PHASES))
+    return [(name, phases[name]) for name in names]
+
+  def endpoint_table(self):
+    """Returns a render.Table of request counts and latency per endpoint."""
+    by_endpoint = {}
+    for request in self.requests:
+      by_endpoint.setdefault(request['endpoint'], []).append(request)
+    table = render.Table(['endpoint', 'calls', 'errors', 'bytes', 'total_s',
+                          'mean_ms', 'max_ms'], accuracy=3)
+    for name, requests in sorted(by_endpoint.items(),
+                                 key=lambda item: -sum(
+                                     r['seconds'] for r in item[1])):
+      seconds = [r['seconds'] for r in requests]
+      table.add_row([
+          name,
+          len(requests),
+          sum(1 for r in requests
+              if r['status'] is None or r['status'] >= 400),
+          sum(r['bytes'] for r in requests),
+          sum(seconds),
+          sum(seconds) / len(seconds) * 1000,
+          max(seconds) * 1000,
+      ])
+    return table
+
+  def print_summary(self, out, counters=None):
+    """Writes the phase and endpoint tables to out."""
+    table = render.Table(['phase', 'seconds'], accuracy=3)
+    for name, seconds in self.derived_phases():
+      table.add_row([name, seconds])
+    table.render(out)
+    if self.requests:
+      out.write('\n')
+      self.endpoint_table().render(out)
+    if counters:
+      out.write('\n' + ', '.join('%s: %d' % item
+                                 for item in sorted(counters.items())) + '\n')
+
+  def json_lines(self, command, counters=None):
+    """Yields the timings as JSON strings, one per phase and request."""
+    for name, seconds in self.derived_phases():
+      yield json.dumps({'type': 'phase', 'command': command, 'name': name,
+                        'seconds': seconds}, sort_keys=True)
+    for request in self.requests:
+      line = dict(request, type='request', command=command)
+      yield json.dumps(line, sort_keys=True)
+    if counters:
+      yield json.dumps(dict(counters, type='counters', command=command),
+                       sort_keys=True)
+
+class LatencyHistogram(object):
+  """Latencies in buckets doubling from 1ms, with exact percentiles.
+
+  Every sample is kept; this is for order acks, not every request.
+  Thread-safe.
+  """
+
+  # Upper bounds of the buckets, in milliseconds; the last one is open.
+  BOUNDS_MS = [2 ** i for i in range(14)]
+
+  def __init__(self):
+    self.samples = []
+    self._lock = threading.Lock()
+
+  def add(self, seconds):
+    with self._lock:
+      self.samples.append(seconds)
+
+  def __len__(self):
+    return len(self.samples)
+
+  def percentile(self, p):
+    """Returns the nearest-rank p-th percentile in seconds, or None."""
+    with self._lock:
+      samples = sorted(self.samples)
+    if not samples:
+      return None
+    rank = max(int(math.ceil(p / 100.0 * len(samples))), 1)
+    return samples[rank - 1]
+
+  def buckets(self):
+    """Returns a list of (label, count) of the buckets from the first to the
+    last one with samples."""
+    counts = [0] * (len(self.BOUNDS_MS) + 1)
+    with self._lock:
+      for seconds in self.samples:
+        counts[bisect.bisect_left(self.BOUNDS_MS, seconds * 1000)] += 1
+    used = [i for i, count in enumerate(counts) if count]
+    if not used:
+      return []
+    labels = ['<= %dms' % bound for bound in self.BOUNDS_MS]
+    labels.append('> %dms' % self.BOUNDS_MS[-1])
+    return [(labels[i], counts[i]) for i in range(used[0], used[-1] + 1)]
+
+  def print_summary(self, out, width=40):
+    """Writes the buckets as bars and the percentiles to out."""
+    buckets = self.buckets()
+    if not buckets:
+      out.write('No latencies recorded\n')
+      return
+    most = max(count for _, count in buckets)
+    for label, count in buckets:
+      bar = '#' * int(math.ceil(count * width / float(most)))
+      out.write('%10s %-*s %d\n' % (label, width, bar, count))
+    out.write('n=%d  p50=%.1fms  p90=%.1fms  p99=%.1fms  max=%.1fms\n' % (
+        len(self), self.percentile(50) * 1000, self.percentile(90) * 1000,
+        self.percentile(99) * 1000, self.percentile(100) * 1000))
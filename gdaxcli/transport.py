@@ -0,0 +1,202 @@
+"""HTTP transport shared by all gdax requests.
+
+gdax-python calls requests.get/post/delete directly, which opens a new
+TCP/TLS connection for every request. Transport exposes the same functions on
+top of a requests.Session so connections are kept alive and reused.
+
+Every request also takes a token from the public or private rate limiter, and
+GETs that fail with a rate limit, a transient server error or a dropped
+connection are retried with jittered exponential backoff.
+"""
+
+import collections
+import logging
+import random
+import threading
+import time
+import weakref
+
+import requests
+from requests import adapters
+
+import gdax.authenticated_client
+import gdax.public_client
+
+from gdaxcli import exceptions
+
+# Connections kept open per host. Should be at least the number of workers
+# making concurrent requests.
+DEFAULT_POOL_SIZE = 10
+
+# Number of times a GET is retried before giving up.
+DEFAULT_MAX_RETRIES = 4
+
+# Seconds to wait before the first retry; doubled for each retry after it.
+DEFAULT_BACKOFF = 0.25
+
+# Longest wait between retries, in seconds.
+MAX_BACKOFF = 8
+
+# Too many requests, and server errors worth trying again.
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+class Transport(object):
+  """Drop-in replacement for the requests module functions used by gdax.
+
+  Counters of the requests made are kept in `counters`:
+    requests: Requests sent, including retries.
+    throttled: Requests that waited for a rate limiter token.
+    rate_limited: Responses with status 429.
+    retried: Requests sent again after a failure.
+  """
+
+  def __init__(self, pool_size=DEFAULT_POOL_SIZE, public_limiter=None,
+               private_limiter=None, max_retries=DEFAULT_MAX_RETRIES,
+               backoff=DEFAULT_BACKOFF, recorder=None):
+    """Initializer.
+
+    Args:
+      pool_size: Connections kept open per host.
+      public_limiter: utils.RateLimiter for requests without auth.
+      private_limiter: utils.RateLimiter for authenticated requests.
+      max_retries: Times a GET is retried. 0 to disable retries.
+      backoff: Seconds to wait before the first retry.
+      recorder: timing.Recorder to record every request sent to.
+    """
+    self.session = requests.Session()
+    adapter = adapters.HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size)
+    self.session.mount('https://', adapter)
+    self.session.mount('http://', adapter)
+    self._public_limiter = public_limiter
+    self._private_limiter = private_limiter
+    self._max_retries = max_retries
+    self._backoff = backoff
+    self.counters = collections.Counter()
+    self.recorder = recorder
+    self._lock = threading.Lock()
+
+  def _count(self, name):
+    with self._lock:
+      self.counters[name] += 1
+
+  def _delay(self, attempt, response=None):
+    """Seconds to wait before retry number attempt + 1."""
+    if response is not None:
+      retry_after = response.headers.get('Retry-After')
+      if retry_after:
+        try:
+          return min(float(retry_after), MAX_BACKOFF)
+        except ValueError:
+          pass
+    # Full jitter, so concurrent workers don't retry in lockstep.
+    return random.uniform(0, min(self._backoff * 2 ** attempt, MAX_BACKOFF))
+
+  def request(self, method, url, **kwargs):
+    """Sends a request, throttled and retried as needed.
+
+    Raises:
+      ApiError: if a GET is still failing after all retries.
+    """
+    if kwargs.get('auth') is not None:
+      limiter = self._private_limiter
+    else:
+      limiter = self._public_limiter
+    retries = self._max_retries if method == 'GET' else 0
+    attempt = 0
+    while True:
+      if limiter is not None:
+        start = time.time()
+        if limiter.acquire():
+          self._count('throttled')
+          if self.recorder is not None:
+            self.recorder.add_wait(start, time.time() - start)
+      self._count('requests')
+      start = time.time()
+      try:
+        response = self.session.request(method, url, **kwargs)
+      except (requests.ConnectionError, requests.Timeout) as e:
+        if self.recorder is not None:
+          self.recorder.add_request(method, url, None, 0, start,
+                                    time.time() - start)
+        if attempt >= retries:
+          raise
+        response, reason = None, str(e)
+      else:
+        if self.recorder is not None:
+          self.recorder.add_request(method, url, response.status_code,
+                                    len(response.content), start,
+                                    time.time() - start)
+        if response.status_code == 429:
+          self._count('rate_limited')
+        if response.status_code not in RETRY_STATUSES:
+          return response
+        if attempt >= retries:
+          if retries:
+            raise exceptions.ApiError('%s %s failed with status %d after %d '
+                                      'retries' % (method, url,
+                                                   response.status_code,
+                                                   retries))
+          return response
+        reason = 'status %d' % response.status_code
+      delay = self._delay(attempt, response)
+      logging.info('Retrying %s %s in %.2fs: %s', method, url, delay, reason)
+      self._count('retried')
+      time.sleep(delay)
+      attempt += 1
+
+  def get(self, url, **kwargs):
+    return self.request('GET', url, **kwargs)
+
+  def post(self, url, **kwargs):
+    return self.request('POST', url, **kwargs)
+
+  def delete(self, url, **kwargs):
+    return self.request('DELETE', url, **kwargs)
+
+class _Router(object):
+  """Sends each gdax-python request through the transport of the client that
+  signed it.
+
+  gdax-python calls module functions, so every client in the process goes
+  through the same object; requests are matched to their client's transport
+  by auth object, and unsigned ones go through the default transport.
+  """
+
+  def __init__(self):
+    self.default = None
+    self._routes = weakref.WeakKeyDictionary()
+
+  def add(self, auth, transport):
+    self._routes[auth] = transport
+
+  def request(self, method, url, **kwargs):
+    auth = kwargs.get('auth')
+    transport = self._routes.get(auth) if auth is not None else None
+    return (transport or self.default).request(method, url, **kwargs)
+
+  def get(self, url, **kwargs):
+    return self.request('GET', url, **kwargs)
+
+  def post(self, url, **kwargs):
+    return self.request('POST', url, **kwargs)
+
+  def delete(self, url, **kwargs):
+    return self.request('DELETE', url, **kwargs)
+
+_router = _Router()
+
+def install(transport, auth=None):
+  """Routes gdax-python requests through transport.
+
+  Args:
+    transport: Transport for requests signed with auth, and for all other
+        requests without a transport of their own.
+    auth: The auth object of a gdax AuthenticatedClient. Its requests keep
+        going through transport when other transports are installed.
+  """
+  if auth is not None:
+    _router.add(auth, transport)
+  _router.default = transport
+  gdax.public_client.requests = _router
+  gdax.authenticated_client.requests = _router
@@ -1,7 +1,14 @@
 """Utilities."""
 
+import calendar
+import datetime
+import heapq
 import logging
 import os
+import threading
+import time
+
+from gdaxcli import exceptions
 
 def configure_logging(to_stderr=True, to_file=True, file_name='main.log'):
   """Configure logging destinations."""
@@ -21,12 +28,228 @@ def configure_logging(to_stderr=True, to_file=True, file_name='main.log'):
     file_handler.setFormatter(formatter)
     root_logger.addHandler(file_handler)
 
-def read_config(path='~/.gdaxcli_config'):
+CONFIG_PATH = '~/.gdaxcli_config'
+
+CONFIG_KEYS = ('passphrase', 'key', 'secret')
+
+def read_profiles(path=CONFIG_PATH):
+  """Returns a list of (name, config) of the accounts in the config file.
+
+  The file is either the passphrase, key and secret on three lines, read as a
+  profile named default, or one section per named profile:
+
+    [main]
+    passphrase = ...
+    key = ...
+    secret = ...
+
+  Raises:
+    Error: if a section misses one of the keys.
+  """
   with open(os.path.expanduser(path)) as f:
     data = f.read()
-  lines = data.split('\n')
-  return {
-      'passphrase': lines[0],
-      'key': lines[1],
-      'secret': lines[2],
-  }
+  if not data.lstrip().startswith('['):
+    lines = data.split('\n')
+    return [('default', dict(zip(CONFIG_KEYS, lines[:3])))]
+
+  try:
+    from configparser import RawConfigParser
+  except ImportError:
+    from ConfigParser import RawConfigParser
+  parser = RawConfigParser()
+  if hasattr(parser, 'read_string'):
+    parser.read_string(data)
+  else:
+    import io
+    parser.readfp(io.BytesIO(data))
+  profiles = []
+  for name in parser.sections():
+    missing = [key for key in CONFIG_KEYS if not parser.has_option(name, key)]
+    if missing:
+      raise exceptions.Error('Profile %s in %s is missing %s' % (
+          name, path, ', '.join(missing)))
+    profiles.append((name, dict((key, parser.get(name, key))
+                                for key in CONFIG_KEYS)))
+  return profiles
+
+def read_config(path=CONFIG_PATH, profile=None):
+  """Returns the config of a profile in the config file, or of the first.
+
+  Raises:
+    Error: if there's no such profile.
+  """
+  profiles = read_profiles(path)
+  if profile is None:
+    if not profiles:
+      raise exceptions.Error('No profiles in %s' % path)
+    return profiles[0][1]
+  return select_profiles(profiles, [profile])[0][1]
+
+def select_profiles(profiles, names=None):
+  """Returns the (name, config) of profiles with the given names, in that
+  order, or all of them if names is None.
+
+  Raises:
+    Error: if a name isn't a profile.
+  """
+  if names is None:
+    return list(profiles)
+  configs = dict(profiles)
+  unknown = [name for name in names if name not in configs]
+  if unknown:
+    raise exceptions.Error('Unknown profile: %s; profiles are %s' % (
+        ', '.join(unknown), ', '.join(name for name, _ in profiles)))
+  return [(name, configs[name]) for name in names]
+
+_TIME_FORMATS = ('%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M', '%Y-%m-%d')
+
+def parse_time(value):
+  """Returns seconds since the epoch of a UTC time such as 2017-08-01T12:00.
+
+  Raises:
+    ValueError: if value isn't in a known format.
+  """
+  value = value.rstrip('Z')
+  for time_format in _TIME_FORMATS:
+    try:
+      parsed = datetime.datetime.strptime(value, time_format)
+    except ValueError:
+      continue
+    return calendar.timegm(parsed.timetuple())
+  raise ValueError('Invalid time: %s' % value)
+
+def format_time(seconds):
+  """ISO 8601 UTC time of seconds since the epoch, as the API takes it."""
+  return datetime.datetime.utcfromtimestamp(seconds).strftime(
+      '%Y-%m-%dT%H:%M:%SZ')
+
+class RateLimiter(object):
+  """Thread-safe token bucket.
+
+  Allows bursts of up to `burst` calls, refilled at `rate` calls per second.
+  """
+
+  def __init__(self, rate, burst=None):
+    self._rate = float(rate)
+    self._capacity = float(burst if burst is not None else rate)
+    self._tokens = self._capacity
+    self._last = time.time()
+    self._lock = threading.Lock()
+
+  def acquire(self):
+    """Blocks until a token is available, then consumes it.
+
+    Returns:
+      True if it had to wait for the token.
+    """
+    waited = False
+    while True:
+      with self._lock:
+        now = time.time()
+        self._tokens = min(
+            self._capacity, self._tokens + (now - self._last) * self._rate)
+        self._last = now
+        if self._tokens >= 1:
+          self._tokens -= 1
+          return waited
+        wait = (1 - self._tokens) / self._rate
+      time.sleep(wait)
+      waited = True
+
+def parallel_map(func, items, workers):
+  """Like map(func, items) but runs up to `workers` calls concurrently.
+
+  Results are returned in the same order as items. The first exception raised
+  by func is re-raised here.
+  """
+  items = list(items)
+  if workers <= 1 or len(items) <= 1:
+    return [func(item) for item in items]
+
+  # Imported here since it's slow to import and most commands don't need it.
+  from multiprocessing.pool import ThreadPool
+  pool = ThreadPool(min(workers, len(items)))
+  try:
+    return pool.map(func, items)
+  finally:
+    pool.close()
+    pool.join()
+
+def parallel_imap(func, items, workers):
+  """Like parallel_map, but yields each result as soon as it and all the ones
+  before it are ready.
+
+  Lets callers print results in order while later calls are still running.
+  Calls still running are abandoned if the caller stops early.
+  """
+  items = list(items)
+  if workers <= 1 or len(items) <= 1:
+    for item in items:
+      yield func(item)
+    return
+
+  from multiprocessing.pool import ThreadPool
+  pool = ThreadPool(min(workers, len(items)))
+  try:
+    for result in pool.imap(func, items):
+      yield result
+  finally:
+    pool.terminate()
+
+def parallel_prefetch(func, items, workers):
+  """Starts func(item) for items on up to `workers` threads right away, and
+  returns an iterator of the results in order, each waited for when reached.
+
+  Unlike parallel_imap, the calls run while the caller does something else
+  before iterating. An exception raised by func is re-raised when its result
+  is reached.
+  """
+  items = list(items)
+  if not items:
+    return iter([])
+  from multiprocessing.pool import ThreadPool
+  pool = ThreadPool(min(max(workers, 1), len(items)))
+  results = [pool.apply_async(func, (item,)) for item in items]
+  # Its threads exit once the calls are done.
+  pool.close()
+  return (result.get() for result in results)
+
+class _HeapKey(object):
+  """Sort key ordered the other way round when reverse is set."""
+
+  __slots__ = ('value', 'reverse')
+
+  def __init__(self, value, reverse):
+    self.value = value
+    self.reverse = reverse
+
+  def __lt__(self, other):
+    if self.reverse:
+      return other.value < self.value
+    return self.value < other.value
+
+  def __eq__(self, other):
+    return self.value == other.value
+
+def merge_sorted(iterables, key, reverse=False):
+  """Lazily merges iterables, each sorted by key, into one sorted iterator.
+
+  Like heapq.merge(*iterables, key=key, reverse=reverse), which Python 2
+  doesn't have. Items with equal keys come in the order of their iterables.
+  """
+  heap = []
+  for index, iterable in enumerate(iterables):
+    iterator = iter(iterable)
+    for item in iterator:
+      heap.append((_HeapKey(key(item), reverse), index, item, iterator))
+      break
+  heapq.heapify(heap)
+  while heap:
+    _, index, item, iterator = heap[0]
+    yield item
+    for item in iterator:
+      heapq.heapreplace(
+          heap, (_HeapKey(key(item), reverse), index, item, iterator))
+      break
+    else:
+      heapq.heappop(heap)
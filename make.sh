@@ -40,7 +40,7 @@ test() {
 unit_test() {
   # For unittesting.
   configure PASSPHRASE KEY SECRET
-  pipenv run python -m gdaxcli.tests.gdax_utils_test
+  pipenv run python -m unittest discover -s gdaxcli/tests -t . -p '*_test.py'
 }
 
 pip_test() {
@@ -51,6 +51,12 @@ pip_test() {
   python -m gdaxcli
 }
 
+benchmark() {
+  pipenv run python -m benchmarks.ticker_benchmark
+  pipenv run python -m benchmarks.render_benchmark
+  pipenv run python -m benchmarks.suite "$@"
+}
+
 gdaxcli() {
   pipenv run python -m gdaxcli "$@"
 }
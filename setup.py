@@ -24,6 +24,7 @@ setup(
       "gdax",
       "tabulate",
       "colorama",
+      "numpy",
     ],
     classifiers=[
       # How mature is this project? Common values are